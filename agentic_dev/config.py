@@ -17,6 +17,26 @@ class Config:
         "database": "medicalcare"
     }
     
+    # Pool de conexiones MySQL (tools/mysql_pool.py)
+    DB_POOL = {
+        "tamano": int(os.getenv("DB_POOL_SIZE", "5")),
+        "timeout_espera": 10,      # segundos esperando una conexión libre
+        "verificar_despues": 30    # segundos de inactividad antes de hacer ping
+    }
+    
+    # Catálogo tipoServicio en memoria con índice de trigramas
+    # (tools/catalogo_servicios.py). Desactivado: las herramientas consultan MySQL
+    CATALOGO = {
+        "habilitado": os.getenv("USAR_CATALOGO_SERVICIOS", "0") == "1",
+        "ttl_segundos": 300,        # tras este tiempo se verifica la versión de la tabla
+        "max_edad_segundos": 3600   # recarga completa forzada
+    }
+    
+    # Mapeo por lotes (mapear_servicios_desde_lista)
+    MAPEO = {
+        "tamano_lote": 200  # servicios resueltos por cada par de consultas
+    }
+    
     # Rutas
     PROJECT_ROOT = "C:/xampp/htdocs/turnosMedical"
     
@@ -109,7 +109,7 @@ def ejecutar_mapeo_directo():
     print("⚡ MAPEO DIRECTO - SIN AGENTE")
     print("=" * 60)
     
-    from tools.mysql_tool import buscar_servicios_fuzzy
+    from tools.mysql_tool import buscar_servicios_multiples
     from tools.price_analyzer import (
         analizar_patron_descuento, 
         calcular_precio_club_medical,
@@ -128,24 +128,16 @@ def ejecutar_mapeo_directo():
         servicios_archivo = procesar_archivo_odontologia("servicios_odontologia.txt")
         print(f"✅ Servicios procesados: {len(servicios_archivo)}")
         
-        # 2. Buscar en BD
+        # 2. Buscar en BD (términos en paralelo, sin duplicados)
         print("🔎 Buscando servicios en BD...")
-        servicios_bd = []
+        servicios_bd_unicos = []
         terminos = ["dental", "odonto", "muela", "ortodoncia", "endodoncia", "blanqueamiento"]
         
-        for termino in terminos:
-            resultado = buscar_servicios_fuzzy(termino)
-            data = json.loads(resultado)
-            if data["success"]:
-                servicios_bd.extend(data["resultados"])
-        
-        # Eliminar duplicados
-        servicios_bd_unicos = []
-        ids_vistos = set()
-        for servicio in servicios_bd:
-            if servicio["idTipoServicio"] not in ids_vistos:
-                servicios_bd_unicos.append(servicio)
-                ids_vistos.add(servicio["idTipoServicio"])
+        data = json.loads(buscar_servicios_multiples(terminos))
+        if data["success"]:
+            servicios_bd_unicos = data["resultados"]
+            for termino, error in data["errores"].items():
+                print(f"⚠️  Error buscando '{termino}': {error}")
         
         print(f"✅ Servicios únicos en BD: {len(servicios_bd_unicos)}")
         
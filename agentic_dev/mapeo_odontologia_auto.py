@@ -19,7 +19,7 @@ from autogen_agentchat.teams import RoundRobinGroupChat
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 
 from config import Config
-from tools.mysql_tool import buscar_servicios_fuzzy, buscar_con_similitud
+from tools.mysql_tool import buscar_servicios_multiples, buscar_con_similitud
 from tools.price_analyzer import (
     analizar_patron_descuento, 
     calcular_precio_club_medical,
@@ -61,31 +61,20 @@ async def ejecutar_mapeo_automatico():
     
     # 3. Buscar servicios en base de datos
     print("\n🔎 Buscando servicios en base de datos...")
-    servicios_bd = []
+    servicios_bd_unicos = []
     
-    # Obtener todos los servicios de odontología de la BD
-    resultado_busqueda = buscar_servicios_fuzzy("dental")
-    data_busqueda = json.loads(resultado_busqueda)
+    # Servicios de odontología: todos los términos se consultan en paralelo
+    # y se combinan sin duplicados
+    terminos_odontologia = ["dental", "odonto", "diente", "muela", "ortodoncia", "endodoncia", "blanqueamiento"]
+    data_busqueda = json.loads(buscar_servicios_multiples(terminos_odontologia))
     
     if data_busqueda["success"]:
-        servicios_bd.extend(data_busqueda["resultados"])
-        print(f"✅ Servicios dentales encontrados: {len(servicios_bd)}")
-    
-    # Buscar también servicios relacionados con odontología
-    terminos_odontologia = ["odonto", "diente", "muela", "ortodoncia", "endodoncia", "blanqueamiento"]
-    for termino in terminos_odontologia:
-        resultado = buscar_servicios_fuzzy(termino)
-        data = json.loads(resultado)
-        if data["success"]:
-            servicios_bd.extend(data["resultados"])
-    
-    # Eliminar duplicados
-    servicios_bd_unicos = []
-    ids_vistos = set()
-    for servicio in servicios_bd:
-        if servicio["idTipoServicio"] not in ids_vistos:
-            servicios_bd_unicos.append(servicio)
-            ids_vistos.add(servicio["idTipoServicio"])
+        servicios_bd_unicos = data_busqueda["resultados"]
+        print(f"✅ Búsqueda de {len(terminos_odontologia)} términos en {data_busqueda['tiempo_ms']} ms")
+        for termino, error in data_busqueda["errores"].items():
+            print(f"⚠️  Error buscando '{termino}': {error}")
+    else:
+        print(f"❌ Error en búsqueda: {data_busqueda['error']}")
     
     print(f"✅ Total servicios únicos en BD: {len(servicios_bd_unicos)}")
     
@@ -0,0 +1,327 @@
+# agentic_dev/tools/catalogo_servicios.py
+"""
+Snapshot en memoria del catálogo tipoServicio con índice de trigramas.
+
+Las búsquedas `LIKE '%termino%'` no pueden usar índices en MySQL y recorren
+la tabla completa en cada llamada. Este módulo carga una sola vez
+idTipoServicio, descripcion y precioReferencial, normaliza las descripciones
+(sin tildes, minúsculas, igual que la collation *_ci de MySQL) y construye un
+índice invertido de trigramas: un patrón LIKE se resuelve recorriendo solo
+la lista más corta de los trigramas de sus fragmentos literales y verificando
+esos candidatos.
+"""
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+import sys
+import os
+
+from mysql.connector import Error
+
+# Importar config
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from config import Config
+from tools.mysql_pool import conexion_pool
+
+
+def normalizar(texto: str) -> str:
+    """Quita tildes y pasa a minúsculas ('Extracción' -> 'extraccion')"""
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_tildes.casefold()
+
+
+def trigramas(texto: str) -> set:
+    """Conjunto de trigramas de caracteres de un texto ya normalizado"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _partes_like(patron: str) -> List[Tuple[bool, str]]:
+    """
+    Divide un patrón LIKE en (es_comodin, texto): los comodines % y _
+    sueltos y los fragmentos literales entre ellos.
+
+    Como en MySQL (ESCAPE por defecto), "\\" hace literal al carácter
+    siguiente ("\\%", "\\_", "\\\\"); una "\\" al final es literal.
+    """
+    partes: List[Tuple[bool, str]] = []
+    literal: List[str] = []
+    i = 0
+    while i < len(patron):
+        c = patron[i]
+        if c == "\\" and i + 1 < len(patron):
+            literal.append(patron[i + 1])
+            i += 2
+            continue
+        if c in "%_":
+            if literal:
+                partes.append((False, "".join(literal)))
+                literal = []
+            partes.append((True, c))
+        else:
+            literal.append(c)
+        i += 1
+    if literal:
+        partes.append((False, "".join(literal)))
+    return partes
+
+
+def _like_a_regex(patron: str):
+    """Traduce un patrón LIKE (% y _, con escapes) a una regex equivalente"""
+    regex = []
+    for es_comodin, texto in _partes_like(patron):
+        if not es_comodin:
+            regex.append(re.escape(texto))
+        elif texto == "%":
+            regex.append(".*")
+        else:
+            regex.append(".")
+    return re.compile("".join(regex), re.DOTALL)
+
+
+# Datos de un snapshot; se reemplaza completo para que las consultas
+# concurrentes nunca mezclen listas de dos cargas distintas
+_Snapshot = namedtuple("_Snapshot", "ids descripciones precios normalizadas indice")
+_SNAPSHOT_VACIO = _Snapshot([], [], [], [], {})
+
+
+class CatalogoServicios:
+    """
+    Catálogo compacto de tipoServicio con índice de trigramas.
+
+    - ttl_segundos: tras este tiempo se consulta la versión de la tabla
+      (COUNT, MAX(id), SUM(precio)) y solo se recarga si cambió
+    - max_edad_segundos: recarga completa forzada aunque la versión no cambie
+      (detecta ediciones de descripciones que no alteran la versión)
+    """
+
+    def __init__(self, ttl_segundos: float = 300, max_edad_segundos: float = 3600):
+        self.ttl_segundos = ttl_segundos
+        self.max_edad_segundos = max_edad_segundos
+
+        self._snapshot = _SNAPSHOT_VACIO
+        self._version = None
+        self._cargado_en = 0.0
+        self._verificado_en = 0.0
+        # Serializa cargas y verificaciones: con varios hilos, una sola
+        # consulta a MySQL y los demás reutilizan su resultado
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Carga y refresco
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _consultar_version(cursor):
+        cursor.execute("""
+            SELECT COUNT(*) AS total,
+                   MAX(idTipoServicio) AS max_id,
+                   SUM(precioReferencial) AS suma_precios
+            FROM tipoServicio
+        """)
+        fila = cursor.fetchone()
+        return (fila["total"], fila["max_id"], str(fila["suma_precios"]))
+
+    def cargar(self):
+        """Carga (o recarga) el snapshot completo y reconstruye el índice"""
+        with self._lock:
+            self._cargar()
+
+    def _cargar(self):
+        with conexion_pool() as conn:
+            if not conn:
+                raise Error("No se pudo conectar a la base de datos")
+
+            cursor = conn.cursor(dictionary=True)
+            version = self._consultar_version(cursor)
+            cursor.execute("""
+                SELECT idTipoServicio, descripcion, precioReferencial
+                FROM tipoServicio
+                ORDER BY idTipoServicio
+            """)
+            filas = cursor.fetchall()
+            cursor.close()
+
+        ids, descripciones, precios, normalizadas = [], [], [], []
+        indice: Dict[str, array] = {}
+
+        for posicion, fila in enumerate(filas):
+            descripcion = fila["descripcion"] or ""
+            normalizada = normalizar(descripcion)
+
+            ids.append(fila["idTipoServicio"])
+            descripciones.append(descripcion)
+            precios.append(fila["precioReferencial"])
+            normalizadas.append(normalizada)
+
+            for trigrama in trigramas(normalizada):
+                lista = indice.get(trigrama)
+                if lista is None:
+                    lista = indice[trigrama] = array("I")
+                lista.append(posicion)
+
+        ahora = time.monotonic()
+        self._snapshot = _Snapshot(ids, descripciones, precios, normalizadas, indice)
+        self._version = version
+        self._cargado_en = ahora
+        self._verificado_en = ahora
+
+    def _vencido(self, ahora: float) -> bool:
+        return not self._cargado_en or ahora - self._cargado_en >= self.max_edad_segundos
+
+    def asegurar_vigente(self):
+        """
+        Carga el snapshot si no existe o refresca si venció el TTL.
+
+        Si varios hilos lo encuentran vencido a la vez, solo uno consulta
+        MySQL; los demás esperan y usan lo que cargó.
+        """
+        ahora = time.monotonic()
+        if not self._vencido(ahora) and ahora - self._verificado_en < self.ttl_segundos:
+            return
+
+        with self._lock:
+            # Otro hilo pudo cargar o verificar mientras se esperaba el lock
+            ahora = time.monotonic()
+            if self._vencido(ahora):
+                self._cargar()
+                return
+
+            if ahora - self._verificado_en < self.ttl_segundos:
+                return
+
+            with conexion_pool() as conn:
+                if not conn:
+                    # Sin conexión se sigue sirviendo el snapshot anterior
+                    return
+                cursor = conn.cursor(dictionary=True)
+                version = self._consultar_version(cursor)
+                cursor.close()
+
+            if version != self._version:
+                self._cargar()
+            else:
+                self._verificado_en = ahora
+
+    def invalidar(self):
+        """Fuerza la recarga en la próxima consulta"""
+        self._cargado_en = 0.0
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _candidatos(snapshot: _Snapshot, patron_normalizado: str):
+        """
+        Posiciones candidatas para un patrón normalizado, en orden.
+
+        Toda coincidencia contiene todos los trigramas de los fragmentos
+        literales del patrón, así que basta recorrer la lista más corta de
+        esos trigramas (la regex verifica el resto). Si ningún fragmento
+        tiene 3+ caracteres no hay poda posible y se recorren todas.
+        """
+        requeridos = set()
+        for es_comodin, texto in _partes_like(patron_normalizado):
+            if not es_comodin:
+                requeridos |= trigramas(texto)
+
+        if not requeridos:
+            return range(len(snapshot.ids))
+
+        mas_corta = None
+        for trigrama in requeridos:
+            lista = snapshot.indice.get(trigrama)
+            if lista is None:
+                return ()
+            if mas_corta is None or len(lista) < len(mas_corta):
+                mas_corta = lista
+        return mas_corta
+
+    @staticmethod
+    def _fila(snapshot: _Snapshot, posicion: int) -> Dict:
+        return {
+            "idTipoServicio": snapshot.ids[posicion],
+            "descripcion": snapshot.descripciones[posicion],
+            "precioReferencial": snapshot.precios[posicion]
+        }
+
+    def buscar_like(self, patrones: List[str], limite: Optional[int] = None) -> List[Dict]:
+        """
+        Equivalente en memoria de `WHERE descripcion LIKE p1 OR LIKE p2 ...`.
+
+        Args:
+            patrones: Patrones LIKE (con % y _) sin normalizar
+            limite: Máximo de filas (None = todas)
+
+        Returns:
+            Filas en orden de idTipoServicio, como las devolvería MySQL
+        """
+        self.asegurar_vigente()
+        snapshot = self._snapshot
+
+        posiciones = set()
+        for patron in patrones:
+            patron_normalizado = normalizar(patron)
+            regex = _like_a_regex(patron_normalizado)
+            coincidencias = 0
+            # Los candidatos vienen ordenados: con límite basta con las
+            # primeras `limite` coincidencias de cada patrón
+            for posicion in self._candidatos(snapshot, patron_normalizado):
+                if regex.fullmatch(snapshot.normalizadas[posicion]):
+                    posiciones.add(posicion)
+                    coincidencias += 1
+                    if limite is not None and coincidencias >= limite:
+                        break
+
+        ordenadas = sorted(posiciones)
+        if limite is not None:
+            ordenadas = ordenadas[:limite]
+        return [self._fila(snapshot, p) for p in ordenadas]
+
+    def estadisticas(self) -> Dict:
+        """Tamaño del snapshot e índice"""
+        return {
+            "servicios": len(self._snapshot.ids),
+            "trigramas": len(self._snapshot.indice),
+            "version": self._version,
+            "edad_segundos": round(time.monotonic() - self._cargado_en, 1) if self._cargado_en else None
+        }
+
+
+# Catálogo global del proceso
+_catalogo: Optional[CatalogoServicios] = None
+_catalogo_lock = threading.Lock()
+
+
+def obtener_catalogo() -> Optional[CatalogoServicios]:
+    """
+    Catálogo global si está habilitado en Config.CATALOGO.
+
+    Returns:
+        El catálogo vigente, o None si está deshabilitado o no se pudo
+        cargar (las herramientas vuelven entonces a consultar MySQL)
+    """
+    global _catalogo
+    if not Config.CATALOGO["habilitado"]:
+        return None
+
+    with _catalogo_lock:
+        if _catalogo is None:
+            _catalogo = CatalogoServicios(
+                ttl_segundos=Config.CATALOGO["ttl_segundos"],
+                max_edad_segundos=Config.CATALOGO["max_edad_segundos"]
+            )
+        catalogo = _catalogo
+
+    # Fuera del lock del módulo: la carga ya es de a una por catálogo
+    try:
+        catalogo.asegurar_vigente()
+    except Error as e:
+        print(f"Error cargando catálogo de servicios: {e}")
+        return None
+    return catalogo
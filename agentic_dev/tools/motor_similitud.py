@@ -0,0 +1,265 @@
+# agentic_dev/tools/motor_similitud.py
+"""
+Motor de similitud: puntúa una consulta contra un conjunto completo de
+candidatos en una sola pasada.
+
+La escala es la misma de difflib.SequenceMatcher(...).ratio() (0-1), así que
+los umbrales existentes (0.6) siguen significando lo mismo. En lugar de
+calcular ratio() par a par, cada consulta pasa por tres etapas:
+
+1. Bloqueo por longitud: ratio() <= 2*min(la, lb) / (la + lb), así que con
+   los candidatos ordenados por longitud una búsqueda binaria descarta los
+   que son demasiado cortos o largos para alcanzar el umbral.
+2. Sobre los que quedan se calcula, en una operación vectorizada (NumPy si
+   está instalado), la cota quick_ratio() a partir de una matriz de conteo
+   de caracteres precalculada.
+3. Solo los candidatos cuya cota alcanza el umbral se puntúan con ratio()
+   exacto, reutilizando un SequenceMatcher por candidato (su índice interno
+   se construye una sola vez aunque se hagan muchas consultas).
+
+Las tres cotas son exactas: el resultado es idéntico a comparar todos los
+pares por fuerza bruta.
+"""
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+
+# NumPy es opcional: sin él las cotas se calculan con Counter
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+def similitud(a: str, b: str) -> float:
+    """Similitud de referencia entre dos strings (0-1)"""
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+def _supera(valor: float, umbral: float, estricto: bool) -> bool:
+    return valor > umbral if estricto else valor >= umbral
+
+
+class MotorSimilitud:
+    """
+    Puntúa consultas contra un conjunto fijo de candidatos.
+
+    Los puntajes son idénticos a similitud(consulta, candidato). No es
+    thread-safe: usar una instancia por hilo.
+    """
+
+    def __init__(self, candidatos: List[str]):
+        self.candidatos = list(candidatos)
+        self._textos = [str(c).lower() for c in self.candidatos]
+        self._longitudes = [len(t) for t in self._textos]
+
+        # Índices ordenados por longitud para el bloqueo por longitud
+        self._por_longitud = sorted(range(len(self._textos)), key=self._longitudes.__getitem__)
+        self._longitudes_ordenadas = [self._longitudes[i] for i in self._por_longitud]
+
+        # SequenceMatcher por candidato, creado al primer uso
+        self._matchers: List[Optional[SequenceMatcher]] = [None] * len(self._textos)
+
+        # Conteo de caracteres por candidato (para la cota quick_ratio)
+        self._alfabeto = {}
+        for texto in self._textos:
+            for c in texto:
+                self._alfabeto.setdefault(c, len(self._alfabeto))
+
+        if HAS_NUMPY:
+            self._conteos = np.zeros((len(self._textos), len(self._alfabeto)), dtype=np.int32)
+            for fila, texto in enumerate(self._textos):
+                for c, n in Counter(texto).items():
+                    self._conteos[fila, self._alfabeto[c]] = n
+            self._longitudes_np = np.array(self._longitudes, dtype=np.float64)
+        else:
+            self._conteos = [Counter(t) for t in self._textos]
+
+        self.estadisticas = {
+            "consultas": 0,
+            "pares_totales": 0,
+            "descartados_longitud": 0,
+            "descartados_caracteres": 0,
+            "pares_evaluados": 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._textos)
+
+    def bloque_por_longitud(
+        self,
+        consulta: str,
+        umbral: float = 0.0,
+        estricto: bool = False
+    ) -> List[int]:
+        """
+        Índices cuya longitud permite alcanzar el umbral, en orden original.
+
+        Usa la cota real_quick_ratio() = 2 * min(la, lb) / (la + lb).
+        """
+        la = len(consulta)
+        if umbral > 1:
+            return []
+        if umbral <= 0 or la == 0:
+            # Sin umbral, o consulta vacía (solo otra vacía puede puntuar > 0)
+            inicio, fin = 0, len(self._por_longitud)
+        else:
+            # Ventana aproximada con búsqueda binaria y ajuste exacto en bordes
+            minimo = la * umbral / (2.0 - umbral)
+            maximo = la * (2.0 - umbral) / umbral
+            inicio = bisect_left(self._longitudes_ordenadas, int(minimo) - 1)
+            fin = bisect_right(self._longitudes_ordenadas, int(maximo) + 1)
+
+        indices = []
+        for posicion in range(inicio, fin):
+            lb = self._longitudes_ordenadas[posicion]
+            total = la + lb
+            cota = 2.0 * min(la, lb) / total if total else 1.0
+            if _supera(cota, umbral, estricto):
+                indices.append(self._por_longitud[posicion])
+        indices.sort()
+        return indices
+
+    def cotas_superiores(self, consulta: str, indices: Optional[List[int]] = None):
+        """
+        quick_ratio() de la consulta contra los candidatos dados (todos por
+        defecto).
+
+        Es una cota superior de ratio(): 2 * |intersección de multiconjuntos
+        de caracteres| / (len(a) + len(b)).
+        """
+        consulta = consulta.lower()
+        conteo_consulta = Counter(consulta)
+        if indices is None:
+            indices = range(len(self._textos))
+
+        if HAS_NUMPY:
+            filas = np.asarray(indices, dtype=np.intp)
+            vector = np.zeros(len(self._alfabeto), dtype=np.int32)
+            for c, n in conteo_consulta.items():
+                columna = self._alfabeto.get(c)
+                if columna is not None:
+                    vector[columna] = n
+            coincidencias = np.minimum(self._conteos[filas], vector).sum(axis=1)
+            totales = self._longitudes_np[filas] + len(consulta)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                cotas = np.where(totales > 0, 2.0 * coincidencias / totales, 1.0)
+            return cotas.tolist()
+
+        cotas = []
+        for indice in indices:
+            total = self._longitudes[indice] + len(consulta)
+            if not total:
+                cotas.append(1.0)
+                continue
+            conteo = self._conteos[indice]
+            coincidencias = sum(min(n, conteo.get(c, 0)) for c, n in conteo_consulta.items())
+            cotas.append(2.0 * coincidencias / total)
+        return cotas
+
+    def _ratio(self, consulta: str, indice: int) -> float:
+        matcher = self._matchers[indice]
+        if matcher is None:
+            matcher = self._matchers[indice] = SequenceMatcher(None, "", self._textos[indice])
+        matcher.set_seq1(consulta)
+        return matcher.ratio()
+
+    def puntuar(
+        self,
+        consulta: str,
+        umbral: float = 0.0,
+        estricto: bool = False
+    ) -> List[Tuple[int, float]]:
+        """
+        Candidatos que alcanzan el umbral, en el orden original.
+
+        Args:
+            consulta: Texto a comparar
+            umbral: Similitud mínima (0-1)
+            estricto: True para exigir > umbral en lugar de >= umbral
+
+        Returns:
+            Lista de (índice del candidato, similitud 0-1)
+        """
+        consulta_lower = consulta.lower()
+        bloque = self.bloque_por_longitud(consulta_lower, umbral, estricto)
+        cotas = self.cotas_superiores(consulta_lower, bloque) if bloque else []
+
+        resultados = []
+        evaluados = 0
+        for indice, cota in zip(bloque, cotas):
+            if not _supera(cota, umbral, estricto):
+                continue
+            evaluados += 1
+            sim = self._ratio(consulta_lower, indice)
+            if _supera(sim, umbral, estricto):
+                resultados.append((indice, sim))
+
+        self.estadisticas["consultas"] += 1
+        self.estadisticas["pares_totales"] += len(self._textos)
+        self.estadisticas["descartados_longitud"] += len(self._textos) - len(bloque)
+        self.estadisticas["descartados_caracteres"] += len(bloque) - evaluados
+        self.estadisticas["pares_evaluados"] += evaluados
+        return resultados
+
+    def top_k(
+        self,
+        consulta: str,
+        k: int = 5,
+        umbral: float = 0.0,
+        estricto: bool = False
+    ) -> List[Tuple[int, float]]:
+        """Los k mejores (índice, similitud), de mayor a menor similitud"""
+        resultados = self.puntuar(consulta, umbral, estricto)
+        resultados.sort(key=lambda r: r[1], reverse=True)
+        return resultados[:k]
+
+
+# Benchmark del módulo
+if __name__ == "__main__":
+    import random
+    import time
+
+    print("🧪 Benchmark: fuerza bruta vs. motor de similitud\n")
+
+    random.seed(42)
+    palabras = [
+        "consulta", "extraccion", "dental", "simple", "compleja", "limpieza",
+        "resina", "corona", "endodoncia", "ortodoncia", "control", "rayos",
+        "x", "torax", "ecografia", "abdominal", "hemograma", "completo",
+        "terapia", "fisica", "pediatria", "medicina", "general", "glucosa"
+    ]
+    catalogo = [
+        " ".join(random.choice(palabras) for _ in range(random.randint(1, 6)))
+        for _ in range(3000)
+    ]
+    consultas = [
+        " ".join(random.choice(palabras) for _ in range(random.randint(1, 3)))
+        for _ in range(100)
+    ]
+    umbral = 0.6
+
+    inicio = time.perf_counter()
+    fuerza_bruta = [
+        [(i, sim) for i, candidato in enumerate(catalogo)
+         if (sim := similitud(consulta, candidato)) > umbral]
+        for consulta in consultas
+    ]
+    tiempo_bruta = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    motor = MotorSimilitud(catalogo)
+    con_motor = [motor.puntuar(consulta, umbral, estricto=True) for consulta in consultas]
+    tiempo_motor = time.perf_counter() - inicio
+
+    stats = motor.estadisticas
+    print(f"Resultados idénticos: {'✅' if fuerza_bruta == con_motor else '❌'}")
+    print(f"NumPy: {'sí' if HAS_NUMPY else 'no'}")
+    print(f"Pares posibles:          {stats['pares_totales']}")
+    print(f"Descartados (longitud):  {stats['descartados_longitud']}")
+    print(f"Descartados (caracteres): {stats['descartados_caracteres']}")
+    print(f"Pares evaluados:         {stats['pares_evaluados']} "
+          f"({stats['pares_evaluados'] / stats['pares_totales'] * 100:.1f}%)")
+    print(f"Tiempo fuerza bruta: {tiempo_bruta:.2f}s | motor: {tiempo_motor:.2f}s")
@@ -0,0 +1,226 @@
+# agentic_dev/tools/mysql_pool.py
+"""
+Pool de conexiones MySQL compartido por las herramientas de Medical&Care.
+
+Evita abrir una conexión nueva (handshake TCP + autenticación) en cada
+llamada a las herramientas: las conexiones se reutilizan entre llamadas,
+se verifican antes de entregarse y se reconectan si quedaron obsoletas.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from queue import LifoQueue, Empty, Full
+from typing import Dict, Optional
+import sys
+import os
+
+import mysql.connector
+from mysql.connector import Error
+
+# Importar config
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from config import Config
+
+
+class PoolConexionesMySQL:
+    """
+    Pool de conexiones con checkout/devolución por llamada.
+
+    - tamano: máximo de conexiones abiertas simultáneamente
+    - timeout_espera: segundos a esperar por una conexión libre
+    - verificar_despues: segundos de inactividad tras los que se hace ping
+      antes de entregar la conexión
+    """
+
+    def __init__(
+        self,
+        db_config: Dict,
+        tamano: int = 5,
+        timeout_espera: float = 10,
+        verificar_despues: float = 30
+    ):
+        # autocommit evita que una conexión reutilizada lea una instantánea
+        # vieja de una transacción abierta en una llamada anterior
+        self._db_config = {"autocommit": True, **db_config}
+        self.tamano = tamano
+        self.timeout_espera = timeout_espera
+        self.verificar_despues = verificar_despues
+
+        # LIFO: se reutiliza primero la conexión usada más recientemente
+        self._libres: LifoQueue = LifoQueue(maxsize=tamano)
+        self._cupos = threading.BoundedSemaphore(tamano)
+        self._lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "hits": 0,
+            "misses": 0,
+            "reconexiones": 0,
+            "descartadas": 0,
+            "errores_conexion": 0,
+            "agotado": 0,
+            "espera_total_ms": 0.0
+        }
+
+    def _contar(self, clave: str, valor: float = 1):
+        with self._lock:
+            self._stats[clave] += valor
+
+    def _nueva_conexion(self):
+        """Abre una conexión nueva (miss del pool)"""
+        self._contar("misses")
+        return mysql.connector.connect(**self._db_config)
+
+    def _verificar(self, conn, ultimo_uso: float):
+        """
+        Health check de una conexión libre.
+
+        Solo hace ping si estuvo inactiva más de `verificar_despues`
+        segundos; si el servidor la cerró, intenta reconectar.
+        """
+        if time.monotonic() - ultimo_uso < self.verificar_despues:
+            return conn
+
+        try:
+            conn.ping(reconnect=False)
+            return conn
+        except Error:
+            pass
+
+        try:
+            conn.reconnect(attempts=1, delay=0)
+            self._contar("reconexiones")
+            return conn
+        except Error:
+            self._cerrar(conn)
+            return None
+
+    def _cerrar(self, conn):
+        self._contar("descartadas")
+        try:
+            conn.close()
+        except Error:
+            pass
+
+    def obtener(self):
+        """
+        Obtiene una conexión del pool.
+
+        Returns:
+            Conexión lista para usar, o None si no se pudo conectar
+            o el pool está agotado
+        """
+        inicio = time.monotonic()
+        if not self._cupos.acquire(timeout=self.timeout_espera):
+            self._contar("agotado")
+            print(f"Error conectando a MySQL: pool agotado ({self.tamano} conexiones en uso)")
+            return None
+
+        self._contar("checkouts")
+        self._contar("espera_total_ms", (time.monotonic() - inicio) * 1000)
+
+        try:
+            while True:
+                try:
+                    conn, ultimo_uso = self._libres.get_nowait()
+                except Empty:
+                    return self._nueva_conexion()
+
+                conn = self._verificar(conn, ultimo_uso)
+                if conn is not None:
+                    self._contar("hits")
+                    return conn
+        except Error as e:
+            self._contar("errores_conexion")
+            self._cupos.release()
+            print(f"Error conectando a MySQL: {e}")
+            return None
+
+    def devolver(self, conn, descartar: bool = False):
+        """Devuelve una conexión al pool (o la descarta si quedó inservible)"""
+        try:
+            if descartar or getattr(conn, "unread_result", False):
+                self._cerrar(conn)
+                return
+
+            try:
+                self._libres.put_nowait((conn, time.monotonic()))
+            except Full:
+                self._cerrar(conn)
+        finally:
+            self._cupos.release()
+
+    @contextmanager
+    def conexion(self):
+        """
+        Context manager: checkout al entrar y devolución al salir.
+
+        Entrega None si no hay conexión disponible, igual que get_connection().
+        """
+        conn = self.obtener()
+        if conn is None:
+            yield None
+            return
+
+        descartar = False
+        try:
+            yield conn
+        except Error:
+            # Error de MySQL: la conexión puede haber quedado en mal estado
+            descartar = True
+            raise
+        finally:
+            self.devolver(conn, descartar=descartar)
+
+    def estadisticas(self) -> Dict:
+        """Estadísticas de uso del pool (hits/misses, reconexiones, etc.)"""
+        with self._lock:
+            stats = dict(self._stats)
+
+        stats["tamano"] = self.tamano
+        stats["libres"] = self._libres.qsize()
+        stats["espera_total_ms"] = round(stats["espera_total_ms"], 2)
+        stats["tasa_hits"] = round(stats["hits"] / stats["checkouts"] * 100, 2) if stats["checkouts"] else 0.0
+        return stats
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres del pool"""
+        while True:
+            try:
+                conn, _ = self._libres.get_nowait()
+            except Empty:
+                break
+            self._cerrar(conn)
+
+
+# Pool global del proceso
+_pool: Optional[PoolConexionesMySQL] = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool() -> PoolConexionesMySQL:
+    """Obtiene (o crea) el pool global configurado en Config.DB_POOL"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexionesMySQL(Config.DB_CONFIG, **Config.DB_POOL)
+    return _pool
+
+
+def conexion_pool():
+    """Atajo: context manager de una conexión del pool global"""
+    return obtener_pool().conexion()
+
+
+def estadisticas_pool() -> Dict:
+    """Estadísticas del pool global"""
+    return obtener_pool().estadisticas()
+
+
+def cerrar_pool():
+    """Cierra el pool global (las siguientes llamadas crean uno nuevo)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.cerrar()
+            _pool = None
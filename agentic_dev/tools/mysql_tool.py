@@ -5,17 +5,28 @@ Herramientas para interactuar con MySQL de Medical&Care
 import mysql.connector
 from mysql.connector import Error
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from typing import Annotated
-from difflib import SequenceMatcher
 import sys
 import os
 
 # Importar config
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from config import Config
+from tools.mysql_pool import conexion_pool, estadisticas_pool
+from tools.catalogo_servicios import obtener_catalogo
+from tools.motor_similitud import MotorSimilitud, similitud
+
+# Patrones que identifican servicios de odontología en tipoServicio
+PATRONES_ODONTOLOGIA = [
+    "%dental%", "%odonto%", "%diente%", "%muela%", "%ortodoncia%",
+    "%endodoncia%", "%blanqueamiento%", "%limpieza%", "%extraccion%", "%resina%"
+]
 
 def get_connection():
-    """Obtiene conexión a MySQL"""
+    """Obtiene una conexión directa a MySQL (fuera del pool)"""
     try:
         conn = mysql.connector.connect(**Config.DB_CONFIG)
         return conn
@@ -23,31 +34,26 @@ def get_connection():
         print(f"Error conectando a MySQL: {e}")
         return None
 
-def similitud(a: str, b: str) -> float:
-    """Calcula similitud entre dos strings (0-1)"""
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-
-def buscar_servicios_fuzzy(
-    termino_busqueda: Annotated[str, "Término a buscar (ej: 'extracción dental')"]
-) -> str:
+def _buscar_fuzzy_filas(termino_busqueda: str) -> list:
     """
-    Busca servicios en tipoServicio con búsqueda difusa.
-    Útil cuando los nombres no coinciden exactamente.
+    Filas de tipoServicio que coinciden con el término (máximo 20).
     
-    Args:
-        termino_busqueda: Término a buscar
-        
-    Returns:
-        JSON con resultados
+    Raises:
+        Error: si no hay conexión disponible o falla la consulta
     """
-    conn = get_connection()
-    if not conn:
-        return json.dumps({
-            "success": False,
-            "error": "No se pudo conectar a la base de datos"
-        })
+    # Patrones de búsqueda
+    patron1 = f"%{termino_busqueda}%"
+    patron2 = f"%{termino_busqueda.replace(' ', '%')}%"
     
-    try:
+    catalogo = obtener_catalogo()
+    if catalogo:
+        # Sondeo del índice de trigramas en memoria (sin ir a MySQL)
+        return catalogo.buscar_like([patron1, patron2], limite=20)
+    
+    with conexion_pool() as conn:
+        if not conn:
+            raise Error("No se pudo conectar a la base de datos")
+        
         cursor = conn.cursor(dictionary=True)
         
         # Búsqueda difusa: busca en descripción con LIKE
@@ -62,15 +68,28 @@ def buscar_servicios_fuzzy(
             LIMIT 20
         """
         
-        # Patrones de búsqueda
-        patron1 = f"%{termino_busqueda}%"
-        patron2 = f"%{termino_busqueda.replace(' ', '%')}%"
-        
         cursor.execute(query, (patron1, patron2))
         resultados = cursor.fetchall()
         
         cursor.close()
-        conn.close()
+    
+    return resultados
+
+def buscar_servicios_fuzzy(
+    termino_busqueda: Annotated[str, "Término a buscar (ej: 'extracción dental')"]
+) -> str:
+    """
+    Busca servicios en tipoServicio con búsqueda difusa.
+    Útil cuando los nombres no coinciden exactamente.
+    
+    Args:
+        termino_busqueda: Término a buscar
+        
+    Returns:
+        JSON con resultados
+    """
+    try:
+        resultados = _buscar_fuzzy_filas(termino_busqueda)
         
         return json.dumps({
             "success": True,
@@ -85,61 +104,182 @@ def buscar_servicios_fuzzy(
             "error": str(e)
         })
 
+def buscar_servicios_multiples(
+    terminos: Annotated[list, "Lista de términos a buscar (ej: ['dental', 'odonto'])"]
+) -> str:
+    """
+    Búsqueda difusa de varios términos a la vez.
+    
+    Cada término se consulta en un hilo con su propia conexión del pool,
+    así que el tiempo total es el de la consulta más lenta y no la suma.
+    Los resultados se combinan en el orden de los términos, sin repetir
+    idTipoServicio.
+    
+    Args:
+        terminos: Lista de términos a buscar
+        
+    Returns:
+        JSON con resultados únicos y errores por término
+    """
+    inicio = time.perf_counter()
+    hilos = max(1, min(len(terminos), Config.DB_POOL["tamano"]))
+    
+    def buscar(termino):
+        try:
+            return _buscar_fuzzy_filas(termino), None
+        except Exception as e:
+            return [], str(e)
+    
+    resultados = []
+    errores = {}
+    ids_vistos = set()
+    
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        # map() conserva el orden de los términos al combinar
+        for termino, (filas, error) in zip(terminos, executor.map(buscar, terminos)):
+            if error:
+                errores[termino] = error
+                continue
+            for fila in filas:
+                if fila["idTipoServicio"] not in ids_vistos:
+                    ids_vistos.add(fila["idTipoServicio"])
+                    resultados.append(fila)
+    
+    if terminos and len(errores) == len(terminos):
+        return json.dumps({
+            "success": False,
+            "error": next(iter(errores.values()))
+        })
+    
+    return json.dumps({
+        "success": True,
+        "terminos_buscados": terminos,
+        "resultados": resultados,
+        "total": len(resultados),
+        "errores": errores,
+        "tiempo_ms": round((time.perf_counter() - inicio) * 1000, 2)
+    }, default=str, ensure_ascii=False)
+
+def _resolver_lote_sql(cursor, lote: list) -> list:
+    """
+    Resuelve un lote de servicios con dos consultas fijas.
+    
+    1. Un solo recorrido de tipoServicio calcula, para cada término, el menor
+       idTipoServicio cuya descripción coincide (MIN(CASE WHEN ... LIKE ...)).
+    2. Se traen las filas de esos IDs con un IN.
+    
+    Returns:
+        Lista alineada con el lote: fila encontrada o None
+    """
+    columnas = ",\n".join(
+        f"MIN(CASE WHEN descripcion LIKE %s THEN idTipoServicio END) AS t{pos}"
+        for pos in range(len(lote))
+    )
+    cursor.execute(
+        f"SELECT {columnas} FROM tipoServicio",
+        [f"%{servicio}%" for servicio in lote]
+    )
+    minimos = cursor.fetchone() or {}
+    ids_por_pos = [minimos.get(f"t{pos}") for pos in range(len(lote))]
+    
+    ids = sorted({i for i in ids_por_pos if i is not None})
+    filas = {}
+    if ids:
+        marcadores = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"""
+            SELECT idTipoServicio, descripcion, precioReferencial
+            FROM tipoServicio
+            WHERE idTipoServicio IN ({marcadores})
+        """, ids)
+        filas = {fila['idTipoServicio']: fila for fila in cursor.fetchall()}
+    
+    return [filas.get(i) if i is not None else None for i in ids_por_pos]
+
+def _resolver_lote_catalogo(catalogo, lote: list) -> list:
+    """Resuelve un lote de servicios contra el catálogo en memoria"""
+    resultados = []
+    for servicio in lote:
+        filas = catalogo.buscar_like([f"%{servicio}%"], limite=1)
+        resultados.append(filas[0] if filas else None)
+    return resultados
+
 def mapear_servicios_desde_lista(
     lista_servicios: Annotated[list, "Lista de nombres de servicios"]
 ) -> str:
     """
     Recibe lista de servicios y devuelve IDs encontrados.
     
+    La lista se resuelve por lotes (Config.MAPEO["tamano_lote"]): dos
+    consultas por lote en lugar de una por servicio, o el catálogo en
+    memoria si está habilitado. Para cada servicio se toma la coincidencia
+    de menor idTipoServicio.
+    
     Args:
         lista_servicios: Lista de nombres ["Extracción dental", "Limpieza", ...]
         
     Returns:
-        JSON con mapeo
+        JSON con mapeo y tiempos por lote
     """
-    conn = get_connection()
-    if not conn:
-        return json.dumps({
-            "success": False,
-            "error": "No se pudo conectar a la base de datos"
-        })
+    tamano_lote = Config.MAPEO["tamano_lote"]
+    lotes = [
+        lista_servicios[i:i + tamano_lote]
+        for i in range(0, len(lista_servicios), tamano_lote)
+    ]
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        
         mapeo = []
         no_encontrados = []
+        tiempos_lotes = []
         
-        for servicio in lista_servicios:
-            # Búsqueda fuzzy para cada servicio
-            query = """
-                SELECT idTipoServicio, descripcion, precioReferencial
-                FROM tipoServicio
-                WHERE descripcion LIKE %s
-                LIMIT 1
-            """
+        catalogo = obtener_catalogo()
+        contexto = nullcontext(None) if catalogo else conexion_pool()
+        with contexto as conn:
+            if not catalogo and not conn:
+                return json.dumps({
+                    "success": False,
+                    "error": "No se pudo conectar a la base de datos"
+                })
             
-            cursor.execute(query, (f"%{servicio}%",))
-            resultado = cursor.fetchone()
+            cursor = conn.cursor(dictionary=True) if conn else None
             
-            if resultado:
-                mapeo.append({
-                    "servicio_buscado": servicio,
-                    "id": resultado['idTipoServicio'],
-                    "nombre_bd": resultado['descripcion'],
-                    "precio": float(resultado['precioReferencial'])
+            for numero, lote in enumerate(lotes, 1):
+                inicio = time.perf_counter()
+                if catalogo:
+                    resultados = _resolver_lote_catalogo(catalogo, lote)
+                else:
+                    resultados = _resolver_lote_sql(cursor, lote)
+                
+                encontrados_lote = 0
+                for servicio, resultado in zip(lote, resultados):
+                    if resultado:
+                        encontrados_lote += 1
+                        mapeo.append({
+                            "servicio_buscado": servicio,
+                            "id": resultado['idTipoServicio'],
+                            "nombre_bd": resultado['descripcion'],
+                            "precio": float(resultado['precioReferencial'])
+                        })
+                    else:
+                        no_encontrados.append(servicio)
+                
+                tiempos_lotes.append({
+                    "lote": numero,
+                    "servicios": len(lote),
+                    "encontrados": encontrados_lote,
+                    "tiempo_ms": round((time.perf_counter() - inicio) * 1000, 2)
                 })
-            else:
-                no_encontrados.append(servicio)
-        
-        cursor.close()
-        conn.close()
+            
+            if cursor:
+                cursor.close()
         
         return json.dumps({
             "success": True,
             "encontrados": mapeo,
             "no_encontrados": no_encontrados,
-            "total_encontrados": len(mapeo)
+            "total_encontrados": len(mapeo),
+            "origen": "catalogo" if catalogo else "mysql",
+            "lotes": tiempos_lotes,
+            "tiempo_total_ms": round(sum(l["tiempo_ms"] for l in tiempos_lotes), 2)
         }, default=str, ensure_ascii=False)
         
     except Exception as e:
@@ -163,51 +303,45 @@ def buscar_con_similitud(
     Returns:
         JSON con mejores matches ordenados por similitud
     """
-    conn = get_connection()
-    if not conn:
-        return json.dumps({
-            "success": False,
-            "error": "No se pudo conectar a la base de datos"
-        })
-    
     try:
-        cursor = conn.cursor(dictionary=True)
-        
-        # Obtener servicios potencialmente de odontología
-        cursor.execute("""
-            SELECT idTipoServicio, descripcion, precioReferencial 
-            FROM tipoServicio
-            WHERE descripcion LIKE '%dental%'
-               OR descripcion LIKE '%odonto%'
-               OR descripcion LIKE '%diente%'
-               OR descripcion LIKE '%muela%'
-               OR descripcion LIKE '%ortodoncia%'
-               OR descripcion LIKE '%endodoncia%'
-               OR descripcion LIKE '%blanqueamiento%'
-               OR descripcion LIKE '%limpieza%'
-               OR descripcion LIKE '%extraccion%'
-               OR descripcion LIKE '%resina%'
-        """)
-        servicios_odonto = cursor.fetchall()
+        catalogo = obtener_catalogo()
+        if catalogo:
+            servicios_odonto = catalogo.buscar_like(PATRONES_ODONTOLOGIA)
+        else:
+            with conexion_pool() as conn:
+                if not conn:
+                    return json.dumps({
+                        "success": False,
+                        "error": "No se pudo conectar a la base de datos"
+                    })
+                
+                cursor = conn.cursor(dictionary=True)
+                
+                # Obtener servicios potencialmente de odontología
+                condiciones = " OR ".join(["descripcion LIKE %s"] * len(PATRONES_ODONTOLOGIA))
+                cursor.execute(f"""
+                    SELECT idTipoServicio, descripcion, precioReferencial 
+                    FROM tipoServicio
+                    WHERE {condiciones}
+                """, PATRONES_ODONTOLOGIA)
+                servicios_odonto = cursor.fetchall()
+                cursor.close()
         
-        # Calcular similitud para cada uno
+        # Puntuar todos los candidatos en una pasada
+        motor = MotorSimilitud([s['descripcion'] for s in servicios_odonto])
         matches = []
-        for servicio in servicios_odonto:
-            sim = similitud(termino, servicio['descripcion'])
-            if sim >= umbral:
-                matches.append({
-                    "id": servicio['idTipoServicio'],
-                    "descripcion": servicio['descripcion'],
-                    "precio": float(servicio['precioReferencial']),
-                    "similitud": round(sim * 100, 2)
-                })
+        for indice, sim in motor.puntuar(termino, umbral):
+            servicio = servicios_odonto[indice]
+            matches.append({
+                "id": servicio['idTipoServicio'],
+                "descripcion": servicio['descripcion'],
+                "precio": float(servicio['precioReferencial']),
+                "similitud": round(sim * 100, 2)
+            })
         
         # Ordenar por similitud descendente
         matches.sort(key=lambda x: x['similitud'], reverse=True)
         
-        cursor.close()
-        conn.close()
-        
         return json.dumps({
             "success": True,
             "termino": termino,
@@ -226,19 +360,18 @@ def obtener_estructura_tabla(
     tabla: Annotated[str, "Nombre de la tabla"]
 ) -> str:
     """Obtiene estructura de una tabla"""
-    conn = get_connection()
-    if not conn:
-        return json.dumps({
-            "success": False,
-            "error": "No se pudo conectar a la base de datos"
-        })
-    
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(f"DESCRIBE {tabla}")
-        estructura = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        with conexion_pool() as conn:
+            if not conn:
+                return json.dumps({
+                    "success": False,
+                    "error": "No se pudo conectar a la base de datos"
+                })
+            
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"DESCRIBE {tabla}")
+            estructura = cursor.fetchall()
+            cursor.close()
         
         return json.dumps({
             "success": True,
@@ -252,6 +385,18 @@ def obtener_estructura_tabla(
             "error": str(e)
         })
 
+def obtener_estadisticas_conexiones() -> str:
+    """
+    Estadísticas del pool de conexiones MySQL.
+    
+    Returns:
+        JSON con checkouts, hits/misses, reconexiones y conexiones libres
+    """
+    return json.dumps({
+        "success": True,
+        "pool": estadisticas_pool()
+    })
+
 # Test del módulo
 if __name__ == "__main__":
     print("🧪 Test de herramientas MySQL\n")
@@ -275,6 +420,8 @@ if __name__ == "__main__":
     if data['success']:
         print(f"✅ Encontrados: {data['total_encontrados']}")
         print(f"❌ No encontrados: {len(data['no_encontrados'])}")
+        for lote in data['lotes']:
+            print(f"⏱️  Lote {lote['lote']}: {lote['servicios']} servicios en {lote['tiempo_ms']} ms")
     else:
         print(f"❌ Error: {data['error']}")
     
@@ -289,4 +436,11 @@ if __name__ == "__main__":
         for match in data['mejores_matches'][:3]:
             print(f"  - {match['descripcion']} ({match['similitud']}%)")
     else:
-        print(f"❌ Error: {data['error']}")
\ No newline at end of file
+        print(f"❌ Error: {data['error']}")
+    
+    print("\n" + "="*60 + "\n")
+    
+    # Test 4
+    print("Test 4: Estadísticas del pool de conexiones")
+    stats = estadisticas_pool()
+    print(f"✅ Checkouts: {stats['checkouts']} | Hits: {stats['hits']} | Misses: {stats['misses']} ({stats['tasa_hits']}% reutilizadas)")
\ No newline at end of file
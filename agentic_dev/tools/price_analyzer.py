@@ -5,12 +5,17 @@ Herramientas para análisis de patrones de precios y descuentos
 
 import json
 from typing import Dict, List, Tuple, Optional
-from difflib import SequenceMatcher
 from typing import Annotated
+import sys
+import os
+
+# Importar herramientas hermanas
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from tools.motor_similitud import MotorSimilitud, similitud
 
 def similitud_texto(a: str, b: str) -> float:
     """Calcula similitud entre dos strings (0-1)"""
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+    return similitud(a, b)
 
 def analizar_patron_descuento(
     precio_particular: Annotated[float, "Precio particular del archivo"],
@@ -148,21 +153,23 @@ def comparar_precios_servicios(
     """
     resultados = []
     
+    # Las descripciones de BD se preparan una sola vez para todas las consultas
+    motor = MotorSimilitud([servicio_bd["descripcion"] for servicio_bd in servicios_bd])
+    
     for servicio_archivo in servicios_archivo:
         nombre_archivo = servicio_archivo["nombre"]
         precio_archivo_particular = servicio_archivo["precio_particular"]
         
-        # Buscar servicios similares en BD
+        # Buscar servicios similares en BD (umbral de similitud: > 0.6)
         servicios_similares = []
-        for servicio_bd in servicios_bd:
-            similitud = similitud_texto(nombre_archivo, servicio_bd["descripcion"])
-            if similitud > 0.6:  # Umbral de similitud
-                servicios_similares.append({
-                    "id": servicio_bd["idTipoServicio"],
-                    "nombre_bd": servicio_bd["descripcion"],
-                    "precio_bd": float(servicio_bd["precioReferencial"]),
-                    "similitud": round(similitud * 100, 2)
-                })
+        for indice, sim in motor.puntuar(nombre_archivo, 0.6, estricto=True):
+            servicio_bd = servicios_bd[indice]
+            servicios_similares.append({
+                "id": servicio_bd["idTipoServicio"],
+                "nombre_bd": servicio_bd["descripcion"],
+                "precio_bd": float(servicio_bd["precioReferencial"]),
+                "similitud": round(sim * 100, 2)
+            })
         
         # Ordenar por similitud
         servicios_similares.sort(key=lambda x: x["similitud"], reverse=True)
@@ -7,6 +7,9 @@ from typing import Dict, Any
 
 load_dotenv()
 
+# Directorio del paquete (multi_agent_system/), base de los archivos de datos
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 class Settings:
     """Configuración centralizada del sistema"""
 
@@ -67,6 +70,21 @@ class Settings:
         "gemini-pro": 30000
     }
 
+    # Gestión de contexto (core/context_manager.py), en fracción del límite
+    CONTEXT = {
+        "trigger_ratio": 0.8,       # Recortar al superar este uso
+        "target_ratio": 0.6,        # ...hasta bajar a este
+        "max_message_ratio": 0.25,  # Tope de un solo mensaje (se trunca)
+        "summarize": True,          # Resumir en segundo plano lo recortado
+        "summary_max_tokens": 1000
+    }
+
+    # Historial persistente de conversaciones (ConversationHistory)
+    HISTORY = {
+        "path": os.getenv("HISTORY_PATH", os.path.join(PACKAGE_DIR, "history", "conversations.sqlite")),
+        "page_size": 200  # mensajes por lectura al restaurar
+    }
+
     # Configuración de agentes
     AGENT_CONFIG = {
         "orchestrator": {
@@ -91,6 +109,109 @@ class Settings:
         }
     }
 
+    # Caché de prompts del proveedor (system prompt, tools y prefijo de la
+    # conversación se marcan como cacheables en Anthropic)
+    PROMPT_CACHING = os.getenv("PROMPT_CACHING", "1") == "1"
+
+    # Caché en disco de respuestas (core/response_cache.py). Desactivada:
+    # útil para re-ejecutar pasos deterministas de un pipeline
+    RESPONSE_CACHE = {
+        "enabled": os.getenv("RESPONSE_CACHE", "0") == "1",
+        "path": os.getenv("RESPONSE_CACHE_PATH", os.path.join(PACKAGE_DIR, "cache", "responses.sqlite")),
+        "max_entries": 5000,
+        "ttl_seconds": 7 * 24 * 3600
+    }
+
+    # Ejecución de herramientas (core/tool_scheduler.py)
+    TOOL_EXECUTION = {
+        "max_workers": int(os.getenv("TOOL_MAX_WORKERS", "4")),
+        "default_timeout": 120  # segundos por llamada
+    }
+
+    # Delegación en paralelo (delegate_parallel)
+    DELEGATION = {
+        "max_concurrency": int(os.getenv("DELEGATION_MAX_CONCURRENCY", "4"))
+    }
+
+    # Búsqueda de código (tools/search_index.py)
+    SEARCH = {
+        "index": os.getenv("SEARCH_INDEX", "1") == "1",  # Índice de trigramas
+        "workspace_root": os.getenv("WORKSPACE_ROOT", ""),  # Único árbol indexado ("" = directorio actual)
+        "use_ripgrep": True,               # Usar rg mientras se construye el índice
+        "max_indexed_file_size": 2_000_000,  # Más grandes: siempre se escanean
+        "exclude_dirs": [
+            ".git", "node_modules", "__pycache__", ".venv", "venv", "vendor", "images"
+        ],
+        "respect_gitignore": True,         # Omitir lo que ignoren los .gitignore
+        "workers": int(os.getenv("SEARCH_WORKERS", "8")),  # Hilos para escanear archivos
+        "mmap_threshold": 1_000_000        # Archivos más grandes se leen con mmap
+    }
+
+    # Lectura de archivos (tools/file_tools.py: ReadFileTool)
+    FILE_READ = {
+        "max_bytes": int(os.getenv("READ_MAX_BYTES", "100000")),  # Máximo por lectura
+        "mmap_threshold": 1_000_000,       # Archivos más grandes se indexan con mmap
+        "index_cache_size": 64             # Índices de líneas cacheados
+    }
+
+    # Edición de archivos (tools/file_tools.py: EditFileTool)
+    FILE_EDIT = {
+        "chunk_size": 1_000_000            # Caracteres por bloque al reescribir
+    }
+
+    # Ejecución de comandos (tools/bash_tool.py)
+    BASH = {
+        "persistent": os.getenv("BASH_PERSISTENT", "1") == "1",  # Sesión de shell por agente
+        "max_output_bytes": 30000,         # Se conserva el final de cada stream
+        "max_sessions": 8,                 # Sesiones abiertas a la vez (pool global)
+        "idle_timeout": 600                # Segundos sin uso antes de cerrar una sesión
+    }
+
+    # Caché de resultados de herramientas de solo lectura (tools/result_cache.py)
+    TOOL_CACHE = {
+        "enabled": os.getenv("TOOL_CACHE", "1") == "1",
+        "max_entries": 256,
+        "ttl_seconds": 300                 # Por cambios que conservan mtime y tamaño
+    }
+
+    # Límites de tasa y reintentos de las llamadas a los proveedores
+    # (core/rate_limiter.py). Los límites se comparten entre todos los
+    # agentes del proceso; 0 = sin límite (solo reintentos)
+    RATE_LIMITS = {
+        "enabled": os.getenv("RATE_LIMITS", "1") == "1",
+        "max_retries": int(os.getenv("API_MAX_RETRIES", "5")),
+        "base_delay": 1.0,                 # Segundos del primer backoff
+        "max_delay": 60.0,                 # Tope del backoff exponencial
+        "max_retry_after": 300.0,          # Un retry-after mayor no se espera
+        "providers": {
+            "anthropic": {
+                "requests_per_minute": int(os.getenv("ANTHROPIC_RPM", "0")),
+                "tokens_per_minute": int(os.getenv("ANTHROPIC_TPM", "0"))
+            },
+            "openai": {
+                "requests_per_minute": int(os.getenv("OPENAI_RPM", "0")),
+                "tokens_per_minute": int(os.getenv("OPENAI_TPM", "0"))
+            },
+            "deepseek": {
+                "requests_per_minute": int(os.getenv("DEEPSEEK_RPM", "0")),
+                "tokens_per_minute": int(os.getenv("DEEPSEEK_TPM", "0"))
+            },
+            "google": {
+                "requests_per_minute": int(os.getenv("GOOGLE_RPM", "0")),
+                "tokens_per_minute": int(os.getenv("GOOGLE_TPM", "0"))
+            }
+        }
+    }
+
+    # Trazas de llamadas al modelo, herramientas y delegaciones (core/tracing.py)
+    TRACING = {
+        "enabled": os.getenv("TRACING", "1") == "1",     # Spans e histogramas en memoria
+        "export_path": os.getenv("TRACE_EXPORT_PATH", ""),  # Archivo de spans ("" = no exportar)
+        "export_format": os.getenv("TRACE_EXPORT_FORMAT", "jsonl"),  # "jsonl" u "otlp"
+        "flush_every": 20,                 # Spans acumulados antes de escribir
+        "keep_recent": 1000                # Spans terminados conservados en memoria
+    }
+
     # Sistema de logging
     LOGGING = {
         "level": "INFO",
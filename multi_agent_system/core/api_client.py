@@ -1,18 +1,26 @@
 """
 Cliente Multi-API que soporta Claude, OpenAI, DeepSeek, Gemini
 """
+import asyncio
 import json
-from typing import List, Dict, Any, Optional
+import weakref
+from typing import List, Dict, Any, Iterator, Optional, TYPE_CHECKING
+
+from .rate_limiter import RateLimiter, RetryPolicy, acall_with_retry, call_with_retry, iter_with_retry
+from .tracing import MODEL, get_tracer
+
+if TYPE_CHECKING:
+    from .response_cache import ResponseCache
 
 # Imports opcionales - solo importar si están disponibles
 try:
-    from anthropic import Anthropic
+    from anthropic import Anthropic, AsyncAnthropic
     HAS_ANTHROPIC = True
 except ImportError:
     HAS_ANTHROPIC = False
 
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
     HAS_OPENAI = True
 except ImportError:
     HAS_OPENAI = False
@@ -34,25 +42,59 @@ class Message:
         return {"role": self.role, "content": self.content}
 
 
+# Clientes async compartidos: uno por (provider, api_key, base_url) y por
+# event loop. Las conexiones keep-alive de httpx quedan atadas al loop que
+# las abrió, así que cada loop tiene su propio pool y se libera con él.
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
 class MultiAPIClient:
     """Cliente unificado para múltiples APIs de LLMs"""
 
-    def __init__(self, provider: str, model: str, api_key: str, base_url: Optional[str] = None):
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        api_key: str,
+        base_url: Optional[str] = None,
+        prompt_caching: bool = True,
+        response_cache: Optional["ResponseCache"] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
         self.provider = provider
         self.model = model
         self.api_key = api_key
         self.base_url = base_url
 
+        # Marcar system prompt, tools y prefijo de la conversación como
+        # cacheables (Anthropic; OpenAI y DeepSeek cachean solos)
+        self.prompt_caching = prompt_caching
+
+        # Caché en disco de respuestas completas (opcional)
+        self.response_cache = response_cache
+
+        # Presupuesto compartido del proveedor y reintentos de errores
+        # transitorios (core/rate_limiter.py). Con retry_policy los SDKs no
+        # reintentan por su cuenta: lo haría sin respetar el presupuesto
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self._sdk_options = {"max_retries": 0} if retry_policy is not None else {}
+
+        # Última conversión de tools a formato OpenAI (ver _convert_tools_to_openai)
+        self._openai_tools_source = None
+        self._openai_tools = None
+
         # Inicializar el cliente apropiado
         if provider == "anthropic":
             if not HAS_ANTHROPIC:
                 raise ImportError("anthropic package not installed. Run: pip install anthropic")
-            self.client = Anthropic(api_key=api_key)
+            self.client = Anthropic(api_key=api_key, **self._sdk_options)
         elif provider == "openai" or provider == "deepseek":
             if not HAS_OPENAI:
                 raise ImportError("openai package not installed. Run: pip install openai")
             # DeepSeek usa API compatible con OpenAI
-            self.client = OpenAI(api_key=api_key, base_url=base_url)
+            self.client = OpenAI(api_key=api_key, base_url=base_url, **self._sdk_options)
         elif provider == "google":
             if not HAS_GOOGLE:
                 raise ImportError("google-generativeai package not installed. Run: pip install google-generativeai")
@@ -82,82 +124,323 @@ class MultiAPIClient:
         Returns:
             Respuesta del modelo normalizada
         """
-        if self.provider == "anthropic":
-            return self._chat_anthropic(messages, temperature, max_tokens, tools, **kwargs)
-        elif self.provider == "openai" or self.provider == "deepseek":
-            return self._chat_openai(messages, temperature, max_tokens, tools, **kwargs)
-        elif self.provider == "google":
-            return self._chat_google(messages, temperature, max_tokens, **kwargs)
-        else:
-            raise ValueError(f"Provider no soportado: {self.provider}")
+        attributes = self._request_attributes(messages, tools, max_tokens)
+        with get_tracer().span(f"chat {self.model}", MODEL, **attributes) as span:
+            cache_key = self._response_cache_key(messages, temperature, max_tokens, tools, **kwargs)
+            if cache_key:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    span.set_attributes(self._response_attributes(cached))
+                    return cached
+
+            if self.provider == "anthropic":
+                call = lambda: self._chat_anthropic(messages, temperature, max_tokens, tools, **kwargs)
+            elif self.provider == "openai" or self.provider == "deepseek":
+                call = lambda: self._chat_openai(messages, temperature, max_tokens, tools, **kwargs)
+            elif self.provider == "google":
+                call = lambda: self._chat_google(messages, temperature, max_tokens, **kwargs)
+            else:
+                raise ValueError(f"Provider no soportado: {self.provider}")
 
-    def _chat_anthropic(self, messages, temperature, max_tokens, tools, **kwargs):
-        """Llamada a Claude (Anthropic)"""
-        # Separar system message si existe
-        system_message = ""
-        chat_messages = []
+            response = call_with_retry(
+                call, self.rate_limiter, self._estimate_tokens(attributes), self._retry_policy(),
+                *self._retry_callbacks(span), usage=self._used_tokens
+            )
+
+            span.set_attributes(self._response_attributes(response))
+            self._store_cached_response(cache_key, response)
+            return response
+
+    def _retry_policy(self) -> RetryPolicy:
+        """Política de reintentos (sin reintentos si no se configuró)"""
+        return self.retry_policy or RetryPolicy(max_retries=0)
 
+    def _retry_callbacks(self, span):
+        """Callbacks (on_retry, on_wait) que registran reintentos y esperas en el span"""
+        def on_retry(attempt: int, delay: float, error: BaseException):
+            span.set_attribute("retries", attempt)
+            print(f"⚠️ {self.provider}: {type(error).__name__} ({str(error)[:200]}); reintento {attempt} en {delay:.1f}s")
+
+        def on_wait(seconds: float):
+            span.set_attribute("rate_limit_wait_ms", round(seconds * 1000, 3))
+
+        return on_retry, on_wait
+
+    def _estimate_tokens(self, attributes: Dict[str, Any]) -> int:
+        """
+        Tokens a reservar en el limiter: prompt estimado (~4 caracteres por
+        token) más max_tokens, que es lo que cuentan los proveedores al
+        admitir la petición. Se ajusta con el uso real al terminar.
+        """
+        if self.rate_limiter is None or self.rate_limiter.tokens is None:
+            return 0
+        return attributes["request_chars"] // 4 + attributes["max_tokens"]
+
+    @staticmethod
+    def _used_tokens(response: Dict[str, Any]) -> Optional[int]:
+        """Tokens que informa una respuesta normalizada (para ajustar la reserva del limiter)"""
+        usage = response.get("usage")
+        if not usage:
+            return None
+        return usage["input_tokens"] + usage["output_tokens"] + usage.get("cache_creation_input_tokens", 0)
+
+    @classmethod
+    def _stream_used_tokens(cls, event: Dict[str, Any]) -> Optional[int]:
+        """Como _used_tokens(), para el evento final de un stream"""
+        if event["type"] != "message_stop":
+            return None
+        return cls._used_tokens(event["response"])
+
+    def _request_attributes(self, messages, tools, max_tokens) -> Dict[str, Any]:
+        """Atributos del span de una llamada: proveedor, modelo y tamaño de la petición"""
+        request_chars = 0
         for msg in messages:
-            if msg["role"] == "system":
-                system_message = msg["content"]
+            content = msg.get("content")
+            if isinstance(content, str):
+                request_chars += len(content)
+            elif content:
+                request_chars += len(json.dumps(content, ensure_ascii=False, default=str))
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "messages": len(messages),
+            "request_chars": request_chars,
+            "tools": len(tools) if tools else 0,
+            "max_tokens": max_tokens
+        }
+
+    @staticmethod
+    def _response_attributes(response: Dict[str, Any]) -> Dict[str, Any]:
+        """Atributos del span de una llamada: tokens, tamaño y llamadas a herramientas"""
+        attributes = {
+            "finish_reason": response.get("finish_reason"),
+            "response_chars": len(response.get("content") or ""),
+            "tool_calls": len(response.get("tool_calls") or []),
+            "cached": bool(response.get("cached"))
+        }
+        attributes.update(response.get("usage") or {})
+        return attributes
+
+    def _response_cache_key(self, messages, temperature, max_tokens, tools, **kwargs) -> Optional[str]:
+        """Clave de la petición en la caché de respuestas (None si no hay caché)"""
+        if self.response_cache is None:
+            return None
+        return self.response_cache.make_key(
+            self.provider, self.model, messages, tools, temperature, max_tokens, **kwargs
+        )
+
+    def _store_cached_response(self, cache_key: Optional[str], response: Dict[str, Any]):
+        """Guarda la respuesta marcándola como proveniente de la caché"""
+        if cache_key:
+            self.response_cache.set(cache_key, {**response, "cached": True})
+
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        tools: Optional[List[Dict]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Versión async de chat().
+
+        Usa los clientes async de cada SDK, compartidos por el event loop,
+        así que varias llamadas concurrentes (asyncio.gather) reutilizan
+        las mismas conexiones keep-alive sin bloquear un hilo cada una.
+
+        Returns:
+            Respuesta del modelo normalizada (mismo formato que chat())
+        """
+        attributes = self._request_attributes(messages, tools, max_tokens)
+        with get_tracer().span(f"chat {self.model}", MODEL, **attributes) as span:
+            cache_key = self._response_cache_key(messages, temperature, max_tokens, tools, **kwargs)
+            if cache_key:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    span.set_attributes(self._response_attributes(cached))
+                    return cached
+
+            if self.provider == "anthropic":
+                params = self._prepare_anthropic_request(messages, temperature, max_tokens, tools, **kwargs)
+                request = lambda: self._get_async_client().messages.create(**params)
+                normalize = self._normalize_anthropic_response
+            elif self.provider == "openai" or self.provider == "deepseek":
+                params = self._prepare_openai_request(messages, temperature, max_tokens, tools, **kwargs)
+                request = lambda: self._get_async_client().chat.completions.create(**params)
+                normalize = self._normalize_openai_response
+            elif self.provider == "google":
+                prompt, generation_config = self._prepare_google_request(messages, temperature, max_tokens)
+                request = lambda: self.client.generate_content_async(
+                    prompt,
+                    generation_config=generation_config
+                )
+                normalize = self._normalize_google_response
             else:
-                chat_messages.append(msg)
+                raise ValueError(f"Provider no soportado: {self.provider}")
+
+            async def call():
+                return normalize(await request())
+
+            normalized = await acall_with_retry(
+                call, self.rate_limiter, self._estimate_tokens(attributes), self._retry_policy(),
+                *self._retry_callbacks(span), usage=self._used_tokens
+            )
+
+            span.set_attributes(self._response_attributes(normalized))
+            self._store_cached_response(cache_key, normalized)
+            return normalized
+
+    def _get_async_client(self):
+        """Cliente async del SDK compartido para el event loop actual"""
+        loop = asyncio.get_running_loop()
+        clients = _ASYNC_CLIENTS.setdefault(loop, {})
+        key = (self.provider, self.api_key, self.base_url, tuple(self._sdk_options.items()))
+
+        client = clients.get(key)
+        if client is None:
+            if self.provider == "anthropic":
+                client = AsyncAnthropic(api_key=self.api_key, **self._sdk_options)
+            else:
+                client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, **self._sdk_options)
+            clients[key] = client
+        return client
+
+    @staticmethod
+    async def aclose_shared_clients():
+        """Cierra los clientes async (y sus conexiones) del event loop actual"""
+        clients = _ASYNC_CLIENTS.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.close()
+
+    def _chat_anthropic(self, messages, temperature, max_tokens, tools, **kwargs):
+        """Llamada a Claude (Anthropic)"""
+        params = self._prepare_anthropic_request(messages, temperature, max_tokens, tools, **kwargs)
+        response = self.client.messages.create(**params)
+
+        # Normalizar respuesta
+        return self._normalize_anthropic_response(response)
+
+    def _prepare_anthropic_request(self, messages, temperature, max_tokens, tools, **kwargs):
+        """Parámetros de messages.create para Claude (Anthropic)"""
+        # Separar system message si existe (normalmente es el primero)
+        system_message = ""
+        chat_messages = messages
+        if messages and messages[0]["role"] == "system":
+            system_message = messages[0]["content"]
+            chat_messages = messages[1:]
+
+        if any(msg["role"] == "system" for msg in chat_messages):
+            rest = []
+            for msg in chat_messages:
+                if msg["role"] == "system":
+                    system_message = msg["content"]
+                else:
+                    rest.append(msg)
+            chat_messages = rest
 
         # Preparar tools si existen
         anthropic_tools = None
         if tools:
             anthropic_tools = self._convert_tools_to_anthropic(tools)
 
-        # Hacer la llamada
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            system=system_message if system_message else None,
-            messages=chat_messages,
-            tools=anthropic_tools if anthropic_tools else [],
+        if self.prompt_caching:
+            system_message, anthropic_tools, chat_messages = self._add_cache_breakpoints(
+                system_message, anthropic_tools, chat_messages
+            )
+
+        params = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": chat_messages,
+            "tools": anthropic_tools if anthropic_tools else [],
             **kwargs
-        )
+        }
+        if system_message:
+            params["system"] = system_message
+        return params
 
-        # Normalizar respuesta
-        return self._normalize_anthropic_response(response)
+    @staticmethod
+    def _add_cache_breakpoints(system_message, tools, messages):
+        """
+        Agrega cache_control de Anthropic al system prompt, a la última tool
+        y al último mensaje.
+
+        El prefijo hasta cada marca (system, tools, conversación) queda en la
+        caché de prompts de Anthropic, así que el turno siguiente solo paga
+        y procesa lo nuevo. Copia los dicts que marca: las listas de entrada
+        son vistas cacheadas de ContextManager y ToolRegistry.
+        """
+        cache_control = {"type": "ephemeral"}
+
+        if system_message:
+            system_message = [{"type": "text", "text": system_message, "cache_control": cache_control}]
+
+        if tools:
+            tools = list(tools)
+            tools[-1] = {**tools[-1], "cache_control": cache_control}
+
+        # Anthropic rechaza bloques de texto vacíos: un mensaje vacío no se marca
+        if messages and messages[-1]["content"]:
+            last = messages[-1]
+            content = last["content"]
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content, "cache_control": cache_control}]
+            else:
+                content = list(content)
+                content[-1] = {**content[-1], "cache_control": cache_control}
+            messages = list(messages)
+            messages[-1] = {**last, "content": content}
+
+        return system_message, tools, messages
 
     def _chat_openai(self, messages, temperature, max_tokens, tools, **kwargs):
         """Llamada a OpenAI/DeepSeek"""
+        params = self._prepare_openai_request(messages, temperature, max_tokens, tools, **kwargs)
+        response = self.client.chat.completions.create(**params)
+
+        # Normalizar respuesta
+        return self._normalize_openai_response(response)
+
+    def _prepare_openai_request(self, messages, temperature, max_tokens, tools, **kwargs):
+        """Parámetros de chat.completions.create para OpenAI/DeepSeek"""
         # Preparar tools si existen
         openai_tools = None
         if tools:
             openai_tools = self._convert_tools_to_openai(tools)
 
-        # Hacer la llamada
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            tools=openai_tools if openai_tools else None,
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "tools": openai_tools if openai_tools else None,
             **kwargs
-        )
-
-        # Normalizar respuesta
-        return self._normalize_openai_response(response)
+        }
 
     def _chat_google(self, messages, temperature, max_tokens, **kwargs):
         """Llamada a Google Gemini"""
+        prompt, generation_config = self._prepare_google_request(messages, temperature, max_tokens)
+        response = self.client.generate_content(prompt, generation_config=generation_config)
+
+        # Normalizar respuesta
+        return self._normalize_google_response(response)
+
+    def _prepare_google_request(self, messages, temperature, max_tokens):
+        """Prompt y configuración de generación para Gemini"""
         # Gemini usa un formato diferente
         prompt = "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
-
-        response = self.client.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=temperature,
-                max_output_tokens=max_tokens
-            )
+        generation_config = genai.types.GenerationConfig(
+            temperature=temperature,
+            max_output_tokens=max_tokens
         )
+        return prompt, generation_config
 
-        # Normalizar respuesta
+    def _normalize_google_response(self, response) -> Dict[str, Any]:
+        """Normaliza la respuesta de Gemini"""
         return {
-            "content": response.text,
+            "content": self._google_text(response),
             "role": "assistant",
             "model": self.model,
             "provider": self.provider,
@@ -165,6 +448,21 @@ class MultiAPIClient:
             "finish_reason": "stop"
         }
 
+    @staticmethod
+    def _google_text(response) -> str:
+        """
+        Texto de una respuesta (o chunk) de Gemini.
+
+        response.text lanza ValueError si el candidato no trae partes de
+        texto (bloqueo de seguridad, chunk final vacío): se leen las partes
+        directamente.
+        """
+        if not response.candidates:
+            return ""
+        content = getattr(response.candidates[0], "content", None)
+        parts = getattr(content, "parts", None) or []
+        return "".join(getattr(part, "text", "") or "" for part in parts)
+
     def _normalize_anthropic_response(self, response) -> Dict[str, Any]:
         """Normaliza la respuesta de Anthropic"""
         content = ""
@@ -187,10 +485,7 @@ class MultiAPIClient:
             "provider": self.provider,
             "tool_calls": tool_calls if tool_calls else None,
             "finish_reason": response.stop_reason,
-            "usage": {
-                "input_tokens": response.usage.input_tokens,
-                "output_tokens": response.usage.output_tokens
-            }
+            "usage": self._normalize_anthropic_usage(response.usage)
         }
 
     def _normalize_openai_response(self, response) -> Dict[str, Any]:
@@ -216,10 +511,43 @@ class MultiAPIClient:
             "provider": self.provider,
             "tool_calls": tool_calls,
             "finish_reason": response.choices[0].finish_reason,
-            "usage": {
-                "input_tokens": response.usage.prompt_tokens,
-                "output_tokens": response.usage.completion_tokens
-            }
+            "usage": self._normalize_openai_usage(response.usage)
+        }
+
+    @staticmethod
+    def _normalize_anthropic_usage(usage) -> Dict[str, int]:
+        """
+        Uso de tokens de Anthropic.
+
+        input_tokens no incluye los tokens leídos o escritos en la caché de
+        prompts; esos vienen aparte.
+        """
+        return {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0,
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0
+        }
+
+    @staticmethod
+    def _normalize_openai_usage(usage) -> Dict[str, int]:
+        """
+        Uso de tokens de OpenAI/DeepSeek con el mismo formato que Anthropic.
+
+        Ambos cachean prefijos automáticamente: OpenAI informa los tokens
+        leídos de caché en prompt_tokens_details.cached_tokens y DeepSeek en
+        prompt_cache_hit_tokens. Aquí input_tokens es el total del prompt.
+        """
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details else None
+        if cached is None:
+            cached = getattr(usage, "prompt_cache_hit_tokens", None)
+
+        return {
+            "input_tokens": usage.prompt_tokens,
+            "output_tokens": usage.completion_tokens,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": cached or 0
         }
 
     def _convert_tools_to_anthropic(self, tools: List[Dict]) -> List[Dict]:
@@ -227,9 +555,22 @@ class MultiAPIClient:
         return tools  # Ya deberían estar en formato compatible
 
     def _convert_tools_to_openai(self, tools: List[Dict]) -> List[Dict]:
-        """Convierte tools a formato OpenAI"""
+        """
+        Convierte tools a formato OpenAI.
+
+        ToolRegistry.get_schemas() devuelve la misma lista mientras no
+        cambien las herramientas, así que la conversión se memoiza por
+        identidad de la lista.
+        """
+        if tools is self._openai_tools_source:
+            return self._openai_tools
+
         openai_tools = []
         for tool in tools:
+            # Ya en formato OpenAI (ToolRegistry.get_schemas(format="openai"))
+            if tool.get("type") == "function":
+                openai_tools.append(tool)
+                continue
             openai_tools.append({
                 "type": "function",
                 "function": {
@@ -238,9 +579,209 @@ class MultiAPIClient:
                     "parameters": tool.get("input_schema", {})
                 }
             })
+
+        self._openai_tools_source = tools
+        self._openai_tools = openai_tools
         return openai_tools
 
-    def stream_chat(self, messages: List[Dict[str, str]], **kwargs):
-        """Streaming de respuestas (para implementar)"""
-        # TODO: Implementar streaming para cada provider
-        raise NotImplementedError("Streaming aún no implementado")
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        tools: Optional[List[Dict]] = None,
+        **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming de respuestas con eventos normalizados.
+
+        Eventos (dicts con "type"):
+            - text_delta: {"text"} fragmento de texto
+            - tool_call_start: {"index", "id", "name"} empieza una llamada
+            - tool_call_delta: {"index", "arguments_delta"} fragmento JSON
+            - tool_call: {"index", "tool_call"} llamada completa (argumentos
+              ya parseados); se emite apenas se cierra su bloque, antes de
+              que termine la respuesta
+            - message_stop: {"response"} respuesta completa, mismo formato
+              que chat()
+
+        Args:
+            messages: Lista de mensajes [{"role": "user", "content": "..."}]
+            temperature: Temperatura del modelo
+            max_tokens: Máximo de tokens a generar
+            tools: Lista de tools disponibles para el modelo
+            **kwargs: Argumentos adicionales
+        """
+        if self.provider == "anthropic":
+            make_events = lambda: self._stream_anthropic(messages, temperature, max_tokens, tools, **kwargs)
+        elif self.provider == "openai" or self.provider == "deepseek":
+            make_events = lambda: self._stream_openai(messages, temperature, max_tokens, tools, **kwargs)
+        elif self.provider == "google":
+            make_events = lambda: self._stream_google(messages, temperature, max_tokens)
+        else:
+            raise ValueError(f"Provider no soportado: {self.provider}")
+
+        # El span se abre ahora (hijo del span activo de quien llama) y se
+        # cierra cuando se termina de consumir el stream
+        attributes = self._request_attributes(messages, tools, max_tokens)
+        span = get_tracer().start_span(f"chat {self.model}", MODEL, {**attributes, "stream": True})
+
+        # Se reintenta solo si el error llega antes del primer evento
+        events = iter_with_retry(
+            make_events, self.rate_limiter, self._estimate_tokens(attributes), self._retry_policy(),
+            *self._retry_callbacks(span), usage=self._stream_used_tokens
+        )
+        return self._traced_stream(events, span)
+
+    def _traced_stream(self, events: Iterator[Dict[str, Any]], span) -> Iterator[Dict[str, Any]]:
+        """
+        Reenvía los eventos registrando el tiempo al primer token y la
+        respuesta final
+        """
+        error = None
+        first_event = True
+        try:
+            for event in events:
+                if first_event and event["type"] != "message_stop":
+                    first_event = False
+                    span.set_attribute("time_to_first_token_ms", span.elapsed_ms())
+                if event["type"] == "message_stop":
+                    span.set_attributes(self._response_attributes(event["response"]))
+                yield event
+        except GeneratorExit:
+            # Quien consumía el stream lo abandonó antes del final
+            span.set_attribute("abandoned", True)
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            get_tracer().end_span(span, error)
+
+    def _stream_anthropic(self, messages, temperature, max_tokens, tools, **kwargs):
+        """Streaming de Claude (Anthropic)"""
+        params = self._prepare_anthropic_request(messages, temperature, max_tokens, tools, **kwargs)
+        stream = self.client.messages.create(stream=True, **params)
+
+        content = ""
+        tool_calls = []
+        blocks: Dict[int, Dict[str, Any]] = {}  # index -> tool_use en curso
+        finish_reason = None
+        usage = {"input_tokens": 0, "output_tokens": 0}
+
+        for event in stream:
+            if event.type == "message_start":
+                usage = self._normalize_anthropic_usage(event.message.usage)
+            elif event.type == "content_block_start":
+                block = event.content_block
+                if block.type == "tool_use":
+                    blocks[event.index] = {"id": block.id, "name": block.name, "json": ""}
+                    yield {"type": "tool_call_start", "index": event.index, "id": block.id, "name": block.name}
+            elif event.type == "content_block_delta":
+                delta = event.delta
+                if delta.type == "text_delta":
+                    content += delta.text
+                    yield {"type": "text_delta", "text": delta.text}
+                elif delta.type == "input_json_delta" and event.index in blocks:
+                    blocks[event.index]["json"] += delta.partial_json
+                    yield {"type": "tool_call_delta", "index": event.index, "arguments_delta": delta.partial_json}
+            elif event.type == "content_block_stop":
+                block = blocks.pop(event.index, None)
+                if block is not None:
+                    tool_call = self._finish_tool_call(block)
+                    tool_calls.append(tool_call)
+                    yield {"type": "tool_call", "index": event.index, "tool_call": tool_call}
+            elif event.type == "message_delta":
+                finish_reason = event.delta.stop_reason
+                if event.usage:
+                    usage["output_tokens"] = event.usage.output_tokens
+
+        yield self._message_stop(content, tool_calls, finish_reason, usage)
+
+    def _stream_openai(self, messages, temperature, max_tokens, tools, **kwargs):
+        """Streaming de OpenAI/DeepSeek"""
+        params = self._prepare_openai_request(messages, temperature, max_tokens, tools, **kwargs)
+        params.setdefault("stream_options", {"include_usage": True})
+        stream = self.client.chat.completions.create(stream=True, **params)
+
+        content = ""
+        tool_calls = []
+        current = None  # {"index", "id", "name", "json"} de la llamada en curso
+        finish_reason = None
+        usage = {"input_tokens": 0, "output_tokens": 0}
+
+        for chunk in stream:
+            if chunk.usage:
+                usage = self._normalize_openai_usage(chunk.usage)
+            if not chunk.choices:
+                continue
+
+            choice = chunk.choices[0]
+            delta = choice.delta
+            if delta.content:
+                content += delta.content
+                yield {"type": "text_delta", "text": delta.content}
+
+            for fragment in delta.tool_calls or []:
+                # Las llamadas llegan en orden: un índice nuevo cierra la anterior
+                if current is None or fragment.index != current["index"]:
+                    if current is not None:
+                        tool_call = self._finish_tool_call(current)
+                        tool_calls.append(tool_call)
+                        yield {"type": "tool_call", "index": current["index"], "tool_call": tool_call}
+                    current = {"index": fragment.index, "id": fragment.id, "name": "", "json": ""}
+
+                function = fragment.function
+                if function and function.name:
+                    current["name"] += function.name
+                    yield {"type": "tool_call_start", "index": fragment.index, "id": current["id"], "name": current["name"]}
+                if function and function.arguments:
+                    current["json"] += function.arguments
+                    yield {"type": "tool_call_delta", "index": fragment.index, "arguments_delta": function.arguments}
+
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+                if current is not None:
+                    tool_call = self._finish_tool_call(current)
+                    tool_calls.append(tool_call)
+                    yield {"type": "tool_call", "index": current["index"], "tool_call": tool_call}
+                    current = None
+
+        yield self._message_stop(content, tool_calls, finish_reason, usage)
+
+    def _stream_google(self, messages, temperature, max_tokens):
+        """Streaming de Google Gemini (solo texto)"""
+        prompt, generation_config = self._prepare_google_request(messages, temperature, max_tokens)
+        stream = self.client.generate_content(prompt, generation_config=generation_config, stream=True)
+
+        content = ""
+        for chunk in stream:
+            text = self._google_text(chunk)
+            if text:
+                content += text
+                yield {"type": "text_delta", "text": text}
+
+        yield self._message_stop(content, [], "stop", None)
+
+    @staticmethod
+    def _finish_tool_call(block: Dict[str, Any]) -> Dict[str, Any]:
+        """Parsea los argumentos acumulados de una llamada a herramienta"""
+        return {
+            "id": block["id"],
+            "name": block["name"],
+            "arguments": json.loads(block["json"]) if block["json"] else {}
+        }
+
+    def _message_stop(self, content, tool_calls, finish_reason, usage) -> Dict[str, Any]:
+        """Evento final con la respuesta completa normalizada"""
+        response = {
+            "content": content,
+            "role": "assistant",
+            "model": self.model,
+            "provider": self.provider,
+            "tool_calls": tool_calls if tool_calls else None,
+            "finish_reason": finish_reason
+        }
+        if usage is not None:
+            response["usage"] = usage
+        return {"type": "message_stop", "response": response}
@@ -1,10 +1,20 @@
 """
 Clase base para todos los agentes
 """
-from typing import List, Dict, Any, Optional
+import asyncio
+import copy
+import queue
+import threading
+from typing import List, Dict, Any, Callable, Iterator, Optional
 from abc import ABC, abstractmethod
 from .api_client import MultiAPIClient
-from .context_manager import ContextManager
+from .context_manager import ContextManager, TOOL_RESULTS_HEADER
+from .tokenizers import get_tokenizer
+from .summarizer import RollingSummarizer
+from .response_cache import get_response_cache
+from .tool_scheduler import ToolScheduler
+from .rate_limiter import RetryPolicy, get_rate_limiter
+from .tracing import AGENT, get_tracer
 from ..tools.base_tool import BaseTool, ToolRegistry
 from ..config.settings import Settings
 
@@ -51,22 +61,65 @@ class BaseAgent(ABC):
         self.tool_registry = ToolRegistry()
         for tool in self.tools:
             self.tool_registry.register(tool)
+        self.tool_scheduler = ToolScheduler(self.tool_registry)
 
-        # Contexto del agente
-        self.context = ContextManager(max_tokens=Settings.get_context_limit(model))
-        self.context.set_system_message(system_message)
+        # Si se activa, no se ejecutan más herramientas (ver fork())
+        self.cancel_event: Optional[threading.Event] = None
+        # Herramientas creadas por fork() para esta copia (ver close_fork())
+        self._forked_tools: List[BaseTool] = []
 
-        # Inicializar cliente API
         model_config = Settings.get_model_config(model)
         if not model_config:
             raise ValueError(f"Modelo '{model}' no configurado")
 
+        # Límites de tasa compartidos por todos los agentes del proveedor
+        # (DeepSeek usa el provider "openai" pero tiene sus propios límites)
+        rate_limiter = retry_policy = None
+        if Settings.RATE_LIMITS["enabled"]:
+            limits_key = "deepseek" if model.startswith("deepseek") else model_config["provider"]
+            rate_limiter = get_rate_limiter(limits_key)
+            retry_policy = RetryPolicy.from_settings()
+
+        # Inicializar cliente API
         self.api_client = MultiAPIClient(
             provider=model_config["provider"],
             model=model,
             api_key=model_config["api_key"],
-            base_url=model_config.get("base_url")
+            base_url=model_config.get("base_url"),
+            prompt_caching=Settings.PROMPT_CACHING,
+            response_cache=get_response_cache(),
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy
+        )
+
+        # Contexto del agente
+        self.context = self._new_context()
+
+    def _new_context(self) -> ContextManager:
+        """
+        Contexto vacío para este agente.
+
+        El límite es el del modelo menos lo reservado para la respuesta;
+        los mensajes recortados se resumen si Settings.CONTEXT lo habilita.
+        """
+        context_limit = Settings.get_context_limit(self.model)
+        tokenizer = get_tokenizer(self.api_client.provider, self.model)
+
+        summarizer = None
+        if Settings.CONTEXT["summarize"]:
+            summarizer = RollingSummarizer(
+                self.api_client,
+                tokenizer,
+                max_summary_tokens=Settings.CONTEXT["summary_max_tokens"]
+            )
+
+        context = ContextManager(
+            max_tokens=max(context_limit - self.max_tokens, context_limit // 2),
+            tokenizer=tokenizer,
+            summarizer=summarizer
         )
+        context.set_system_message(self.system_message)
+        return context
 
     def run(self, user_message: str, **kwargs) -> Dict[str, Any]:
         """
@@ -79,32 +132,175 @@ class BaseAgent(ABC):
         Returns:
             Respuesta del agente
         """
-        # Agregar mensaje del usuario al contexto
-        self.context.add_message("user", user_message)
+        with get_tracer().span(f"agent {self.name}", AGENT, **self._span_attributes(user_message)) as span:
+            # Agregar mensaje del usuario al contexto
+            self.context.add_message("user", user_message)
 
-        # Obtener respuesta del modelo
-        response = self._get_model_response(**kwargs)
+            # Obtener respuesta del modelo
+            response = self._get_model_response(**kwargs)
 
-        # Procesar tool calls si existen
-        while response.get("tool_calls"):
-            response = self._handle_tool_calls(response)
+            # Procesar tool calls si existen
+            rounds = 0
+            while response.get("tool_calls"):
+                response = self._handle_tool_calls(response)
+                rounds += 1
 
-        # Agregar respuesta al contexto
-        self.context.add_message("assistant", response["content"])
+            # Agregar respuesta al contexto
+            self.context.add_message("assistant", response["content"])
 
-        return response
+            span.set_attributes({"tool_rounds": rounds, "response_chars": len(response["content"] or "")})
+            return response
 
-    def _get_model_response(self, **kwargs) -> Dict[str, Any]:
-        """Obtiene respuesta del modelo"""
-        messages = self.context.get_messages(include_system=True)
+    async def arun(self, user_message: str, **kwargs) -> Dict[str, Any]:
+        """
+        Versión async de run().
+
+        Las llamadas al modelo usan el cliente async y las herramientas se
+        ejecutan en hilos (asyncio.to_thread), así que varios agentes pueden
+        trabajar a la vez en el mismo event loop:
+
+            await asyncio.gather(code_agent.achat(...), research_agent.achat(...))
+
+        Un mismo agente no debe ejecutar dos arun() simultáneos: comparten
+        el contexto.
+        """
+        with get_tracer().span(f"agent {self.name}", AGENT, **self._span_attributes(user_message)) as span:
+            self.context.add_message("user", user_message)
 
-        # Obtener schemas de herramientas
+            response = await self._aget_model_response(**kwargs)
+
+            rounds = 0
+            while response.get("tool_calls"):
+                response = await self._ahandle_tool_calls(response)
+                rounds += 1
+
+            self.context.add_message("assistant", response["content"])
+
+            span.set_attributes({"tool_rounds": rounds, "response_chars": len(response["content"] or "")})
+            return response
+
+    def stream(self, user_message: str, **kwargs) -> Iterator[Dict[str, Any]]:
+        """
+        Versión streaming de run().
+
+        Reenvía los eventos de MultiAPIClient.stream_chat() y agrega
+        "tool_result" ({"tool_call_id", "tool_name", "result"}). Cada
+        herramienta empieza a ejecutarse apenas llega su evento "tool_call",
+        mientras el modelo sigue generando el resto de la respuesta, con
+        las mismas reglas de concurrencia que run() (ver ToolScheduler).
+
+        Las herramientas con streams_output (bash) emiten además
+        "tool_output" ({"tool_call_id", "tool_name", "stream", "text"}) por
+        cada línea de salida mientras corren.
+        """
+        # Un generador no puede dejar su span activo entre yields (quedaría
+        # activo en el código de quien lo consume): se activa solo al lanzar
+        # la llamada al modelo y dentro de cada herramienta
+        tracer = get_tracer()
+        span = tracer.start_span(f"agent {self.name}", AGENT, {**self._span_attributes(user_message), "stream": True})
+        error = None
+        try:
+            yield from self._stream(user_message, span, **kwargs)
+        except GeneratorExit:
+            span.set_attribute("abandoned", True)
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            tracer.end_span(span, error)
+
+    def _stream(self, user_message: str, span, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Cuerpo de stream()"""
+        tracer = get_tracer()
+        self.context.add_message("user", user_message)
+        progress: "queue.Queue" = queue.Queue()
+
+        def execute(tool_call: Any) -> Optional[Dict[str, str]]:
+            with tracer.activate(span):
+                return self._execute_tool_call(tool_call, on_output=lambda *event: progress.put(event))
+
+        def drain(timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+            try:
+                event = progress.get(timeout=timeout) if timeout else progress.get_nowait()
+                while True:
+                    tool_call_id, tool_name, stream, text = event
+                    yield {
+                        "type": "tool_output",
+                        "tool_call_id": tool_call_id,
+                        "tool_name": tool_name,
+                        "stream": stream,
+                        "text": text
+                    }
+                    event = progress.get_nowait()
+            except queue.Empty:
+                return
+
+        rounds = 0
+        while True:
+            response = None
+            batch = self.tool_scheduler.batch(execute)
+            messages, tool_schemas = self._build_model_request()
+            with tracer.activate(span):
+                events = self.api_client.stream_chat(
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    tools=tool_schemas,
+                    **kwargs
+                )
+            for event in events:
+                if event["type"] == "tool_call":
+                    batch.submit(event["tool_call"])
+                elif event["type"] == "message_stop":
+                    response = event["response"]
+                yield event
+                yield from drain()
+
+            while not batch.done():
+                yield from drain(timeout=0.1)
+            yield from drain()
+            tool_results = batch.results()
+
+            tool_results = [r for r in tool_results if r is not None]
+            for result in tool_results:
+                yield {"type": "tool_result", **result}
+
+            if not response or not response.get("tool_calls"):
+                break
+            self._add_tool_results(tool_results)
+            rounds += 1
+
+        content = response["content"] if response else ""
+        self.context.add_message("assistant", content)
+        span.set_attributes({"tool_rounds": rounds, "response_chars": len(content or "")})
+
+    def _span_attributes(self, user_message: str) -> Dict[str, Any]:
+        """Atributos del span de un turno del agente"""
+        return {
+            "agent": self.name,
+            "model": self.model,
+            "message_chars": len(user_message),
+            "context_tokens": self.context.used_tokens
+        }
+
+    def _build_model_request(self):
+        """Mensajes y schemas de herramientas para la próxima llamada al modelo"""
+        messages = self.context.get_wire_messages()
+
+        # Obtener schemas de herramientas (memoizados en el registro)
         tool_schemas = None
         if self.tools:
             provider = self.api_client.provider
             format_type = "anthropic" if provider == "anthropic" else "openai"
             tool_schemas = self.tool_registry.get_schemas(format=format_type)
 
+        return messages, tool_schemas
+
+    def _get_model_response(self, **kwargs) -> Dict[str, Any]:
+        """Obtiene respuesta del modelo"""
+        messages, tool_schemas = self._build_model_request()
+
         # Llamar a la API
         response = self.api_client.chat(
             messages=messages,
@@ -116,58 +312,125 @@ class BaseAgent(ABC):
 
         return response
 
+    async def _aget_model_response(self, **kwargs) -> Dict[str, Any]:
+        """Obtiene respuesta del modelo (async)"""
+        messages, tool_schemas = self._build_model_request()
+
+        return await self.api_client.achat(
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            tools=tool_schemas,
+            **kwargs
+        )
+
+    def _execute_tool_call(
+        self,
+        tool_call: Any,
+        on_output: Optional[Callable[..., None]] = None
+    ) -> Optional[Dict[str, str]]:
+        """
+        Ejecuta una llamada a herramienta.
+
+        Args:
+            tool_call: Llamada tal como viene en la respuesta del modelo
+            on_output: Callback (tool_call_id, tool_name, stream, línea) para
+                las herramientas que reportan su salida en vivo
+
+        Returns:
+            Resultado {"tool_call_id", "tool_name", "result"} o None si la
+            llamada es inválida
+        """
+        # Validar que tool_call tenga los campos necesarios
+        if not isinstance(tool_call, dict):
+            print(f"⚠️ Warning: tool_call no es un dict: {tool_call}")
+            return None
+
+        tool_name = tool_call.get("name")
+        tool_args = tool_call.get("arguments", {})
+        tool_id = tool_call.get("id", "unknown")
+
+        if not tool_name:
+            print(f"⚠️ Warning: tool_call sin 'name': {tool_call}")
+            return None
+
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return {
+                "tool_call_id": tool_id,
+                "tool_name": tool_name,
+                "result": "Error: Tarea cancelada, la herramienta no se ejecutó"
+            }
+
+        tool = self.tool_registry.get(tool_name)
+        if on_output is not None and tool is not None and tool.streams_output:
+            tool_args = dict(
+                tool_args,
+                on_output=lambda stream, line: on_output(tool_id, tool_name, stream, line)
+            )
+
+        try:
+            result = self.tool_registry.execute(tool_name, **tool_args)
+            return {
+                "tool_call_id": tool_id,
+                "tool_name": tool_name,
+                "result": str(result)
+            }
+        except Exception as e:
+            return {
+                "tool_call_id": tool_id,
+                "tool_name": tool_name,
+                "result": f"Error: {str(e)}"
+            }
+
+    def _add_tool_results(self, tool_results: List[Dict[str, str]]):
+        """Agrega los resultados de herramientas al contexto"""
+        results_text = "\n\n".join([
+            f"Tool: {tr['tool_name']}\nResult: {tr['result']}"
+            for tr in tool_results
+        ])
+
+        self.context.add_message("user", f"{TOOL_RESULTS_HEADER}\n{results_text}")
+
     def _handle_tool_calls(self, response: Dict[str, Any]) -> Dict[str, Any]:
         """
         Maneja las llamadas a herramientas.
 
         Similar a cómo yo ejecuto herramientas y proceso los resultados.
+        Las llamadas independientes del turno se ejecutan en paralelo
+        (ver ToolScheduler); los resultados conservan el orden.
         """
         tool_calls = response.get("tool_calls", [])
 
         if not tool_calls:
             return response
 
-        # Ejecutar cada herramienta
-        tool_results = []
-        for tool_call in tool_calls:
-            # Validar que tool_call tenga los campos necesarios
-            if not isinstance(tool_call, dict):
-                print(f"⚠️ Warning: tool_call no es un dict: {tool_call}")
-                continue
-            
-            tool_name = tool_call.get("name")
-            tool_args = tool_call.get("arguments", {})
-            tool_id = tool_call.get("id", "unknown")
-
-            if not tool_name:
-                print(f"⚠️ Warning: tool_call sin 'name': {tool_call}")
-                continue
-
-            try:
-                result = self.tool_registry.execute(tool_name, **tool_args)
-                tool_results.append({
-                    "tool_call_id": tool_id,
-                    "tool_name": tool_name,
-                    "result": str(result)
-                })
-            except Exception as e:
-                tool_results.append({
-                    "tool_call_id": tool_id,
-                    "tool_name": tool_name,
-                    "result": f"Error: {str(e)}"
-                })
+        # Ejecutar las herramientas
+        tool_results = [
+            result for result in self.tool_scheduler.run(tool_calls, self._execute_tool_call)
+            if result is not None
+        ]
 
         # Agregar resultados al contexto
-        results_text = "\n\n".join([
-            f"Tool: {tr['tool_name']}\nResult: {tr['result']}"
-            for tr in tool_results
-        ])
-
-        self.context.add_message("user", f"Tool results:\n{results_text}")
+        self._add_tool_results(tool_results)
 
         # Obtener nueva respuesta del modelo con los resultados
         return self._get_model_response()
 
+    async def _ahandle_tool_calls(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Versión async de _handle_tool_calls()"""
+        tool_calls = response.get("tool_calls", [])
+
+        if not tool_calls:
+            return response
+
+        # Las herramientas son síncronas: se ejecutan fuera del event loop
+        results = await asyncio.to_thread(self.tool_scheduler.run, tool_calls, self._execute_tool_call)
+        tool_results = [result for result in results if result is not None]
+
+        self._add_tool_results(tool_results)
+
+        return await self._aget_model_response()
+
     def chat(self, message: str) -> str:
         """
         Interfaz simple de chat.
@@ -181,6 +444,58 @@ class BaseAgent(ABC):
         response = self.run(message)
         return response.get("content", "")
 
+    def chat_stream(self, message: str) -> Iterator[str]:
+        """Como chat(), pero entrega el texto a medida que se genera"""
+        for event in self.stream(message):
+            if event["type"] == "text_delta":
+                yield event["text"]
+
+    async def achat(self, message: str) -> str:
+        """Versión async de chat()"""
+        response = await self.arun(message)
+        return response.get("content", "")
+
+    def fork(self, cancel_event: Optional[threading.Event] = None) -> "BaseAgent":
+        """
+        Copia del agente con contexto propio y vacío.
+
+        Comparte modelo, herramientas y cliente API, así que crearla es
+        barato. Sirve para ejecutar varias tareas del mismo agente en
+        paralelo sin mezclar sus conversaciones. Las herramientas con estado
+        por agente (BaseTool.fork, ej: la sesión de bash) se copian; al
+        terminar con la copia, close_fork() las libera junto con su pool de
+        hilos.
+
+        Args:
+            cancel_event: Al activarse, la copia no empieza más herramientas
+                (las que ya corren terminan). Cancelar la tarea de asyncio
+                solo detiene la llamada al modelo en curso: los hilos de las
+                herramientas siguen.
+        """
+        clone = copy.copy(self)
+        clone.context = self._new_context()
+
+        tools = [tool.fork() for tool in self.tools]
+        clone._forked_tools = [new for new, old in zip(tools, self.tools) if new is not old]
+        if clone._forked_tools:
+            clone.tools = tools
+            clone.tool_registry = ToolRegistry()
+            # La caché de resultados se comparte: las escrituras del fork la invalidan
+            clone.tool_registry.result_cache = self.tool_registry.result_cache
+            for tool in tools:
+                clone.tool_registry.register(tool)
+
+        clone.tool_scheduler = ToolScheduler(clone.tool_registry)
+        clone.cancel_event = cancel_event
+        return clone
+
+    def close_fork(self):
+        """Libera las herramientas y el pool de hilos que fork() creó para esta copia"""
+        for tool in self._forked_tools:
+            tool.close()
+        self._forked_tools = []
+        self.tool_scheduler.shutdown()
+
     def get_context_summary(self) -> Dict[str, Any]:
         """Obtiene resumen del contexto"""
         return self.context.get_summary()
@@ -1,9 +1,25 @@
 """
 Gestión de contexto para agentes
 """
-from typing import List, Dict, Any, Optional
+import json
+import os
+import sqlite3
+import threading
+from typing import List, Dict, Any, Iterator, Optional, Tuple, TYPE_CHECKING
 from dataclasses import dataclass, field
 from datetime import datetime
+from .tokenizers import Tokenizer, HeuristicTokenizer, MESSAGE_OVERHEAD
+from ..config.settings import Settings
+
+if TYPE_CHECKING:
+    from .summarizer import RollingSummarizer
+
+
+# Encabezado del mensaje que lleva el resumen de lo recortado
+SUMMARY_HEADER = "[Resumen de la conversación anterior]"
+
+# Encabezado de los resultados de herramientas (van como mensaje "user")
+TOOL_RESULTS_HEADER = "Tool results:"
 
 
 @dataclass
@@ -13,12 +29,16 @@ class Message:
     content: str
     timestamp: datetime = field(default_factory=datetime.now)
     metadata: Dict[str, Any] = field(default_factory=dict)
-    tokens: int = 0  # Estimación de tokens
+    tokens: int = 0  # Tokens (contados una sola vez al agregarlo)
 
     def to_dict(self) -> Dict[str, str]:
         """Convierte el mensaje a formato dict para APIs"""
         return {"role": self.role, "content": self.content}
 
+    def is_user_turn(self) -> bool:
+        """True si es un mensaje del usuario (no resultados de herramientas)"""
+        return self.role == "user" and not self.content.startswith(TOOL_RESULTS_HEADER)
+
 
 class ContextManager:
     """
@@ -28,13 +48,42 @@ class ContextManager:
     - Historial de mensajes
     - Límite de tokens
     - Estrategias de optimización cuando se llena el contexto
+
+    Los tokens se cuentan con el tokenizer del proveedor (ver
+    core/tokenizers.py) una sola vez por mensaje. Los umbrales están en
+    Settings.CONTEXT.
+
+    Con un summarizer, los mensajes recortados se incorporan en segundo
+    plano a un resumen que se envía como primer mensaje del historial.
     """
 
-    def __init__(self, max_tokens: int = 100000):
+    def __init__(
+        self,
+        max_tokens: int = 100000,
+        tokenizer: Optional[Tokenizer] = None,
+        summarizer: Optional["RollingSummarizer"] = None
+    ):
         self.max_tokens = max_tokens
+        self.tokenizer = tokenizer or HeuristicTokenizer()
         self.messages: List[Message] = []
         self.total_tokens = 0
         self.system_message: Optional[str] = None
+        self.system_tokens = 0
+
+        # Resumen de los mensajes recortados (se actualiza en segundo plano)
+        self.summarizer = summarizer
+        self.summary: Optional[str] = None
+        self.summary_tokens = 0
+        self._summary_version = 0
+
+        # Vista en formato API (system + resumen + mensajes), solo se agrega
+        # al final; None = hay que reconstruirla (tras recortar, etc.)
+        self._wire: Optional[List[Dict[str, str]]] = None
+
+        config = Settings.CONTEXT
+        self.trigger_ratio = config["trigger_ratio"]
+        self.target_ratio = config["target_ratio"]
+        self.max_message_tokens = int(max_tokens * config["max_message_ratio"])
 
     def add_message(self, role: str, content: str, metadata: Optional[Dict] = None) -> Message:
         """
@@ -48,28 +97,94 @@ class ContextManager:
         Returns:
             El mensaje creado
         """
-        # Estimar tokens (aprox 1 token = 4 caracteres)
-        estimated_tokens = len(content) // 4
+        metadata = metadata or {}
+        tokens = self.count_tokens(content)
+
+        # Un mensaje enorme (ej: read_file de un archivo grande) se recorta
+        # para que nunca ocupe más de max_message_ratio del contexto
+        if tokens > self.max_message_tokens:
+            content = self.tokenizer.truncate(content, self.max_message_tokens - MESSAGE_OVERHEAD)
+            metadata["truncated_from_tokens"] = tokens
+            tokens = self.count_tokens(content)
 
         message = Message(
             role=role,
             content=content,
-            metadata=metadata or {},
-            tokens=estimated_tokens
+            metadata=metadata,
+            tokens=tokens
         )
 
         self.messages.append(message)
-        self.total_tokens += estimated_tokens
+        self.total_tokens += tokens
+        if self._wire is not None:
+            self._wire.append(message.to_dict())
+        self._sync_summary()
 
         # Verificar si necesitamos optimizar
-        if self.total_tokens > self.max_tokens * 0.8:  # 80% del límite
+        if self.used_tokens > self.max_tokens * self.trigger_ratio:
             self._optimize_context()
 
         return message
 
+    def count_tokens(self, content: str) -> int:
+        """Tokens de un mensaje, incluyendo el overhead del formato de chat"""
+        return self.tokenizer.count(content) + MESSAGE_OVERHEAD
+
+    @property
+    def used_tokens(self) -> int:
+        """Tokens de todo lo que se envía: system message + resumen + mensajes"""
+        return self.system_tokens + self.summary_tokens + self.total_tokens
+
+    def _sync_summary(self):
+        """Toma la última versión del resumen si el summarizer la actualizó"""
+        if self.summarizer is None or self.summarizer.version == self._summary_version:
+            return
+
+        self._summary_version = self.summarizer.version
+        self._set_summary(self.summarizer.summary)
+
+    def _set_summary(self, text: str):
+        self._wire = None
+        if text:
+            self.summary = f"{SUMMARY_HEADER}\n{text}"
+            self.summary_tokens = self.count_tokens(self.summary)
+        else:
+            self.summary = None
+            self.summary_tokens = 0
+
+    @property
+    def summary_text(self) -> str:
+        """Texto del resumen de lo recortado, sin encabezado ("" si no hay)"""
+        self._sync_summary()
+        return self.summary[len(SUMMARY_HEADER) + 1:] if self.summary else ""
+
+    def restore_summary(self, text: str):
+        """Carga el resumen de una conversación guardada (reemplaza el actual)"""
+        if self.summarizer is not None:
+            self.summarizer.restore(text)
+            self._sync_summary()
+        else:
+            self._set_summary(text)
+
     def set_system_message(self, content: str):
         """Establece el mensaje del sistema"""
         self.system_message = content
+        self.system_tokens = self.count_tokens(content) if content else 0
+        self._wire = None
+
+    def get_wire_messages(self) -> List[Dict[str, str]]:
+        """
+        Mensajes en formato API (con system message), sin copiar.
+
+        Devuelve siempre la misma lista, que crece con cada add_message() y
+        solo se reconstruye al recortar el contexto o cambiar el system
+        message o el resumen: cada turno no vuelve a convertir todo el
+        historial. Es de solo lectura; para modificarla usar get_messages().
+        """
+        self._sync_summary()
+        if self._wire is None:
+            self._wire = self.get_messages(include_system=True)
+        return self._wire
 
     def get_messages(self, include_system: bool = True) -> List[Dict[str, str]]:
         """
@@ -86,6 +201,10 @@ class ContextManager:
         if include_system and self.system_message:
             messages.append({"role": "system", "content": self.system_message})
 
+        self._sync_summary()
+        if self.summary:
+            messages.append({"role": "user", "content": self.summary})
+
         messages.extend([msg.to_dict() for msg in self.messages])
         return messages
 
@@ -97,34 +216,92 @@ class ContextManager:
         """Limpia el contexto"""
         self.messages = []
         self.total_tokens = 0
+        self._wire = None
+        if self.summarizer is not None:
+            self.summarizer.reset()
+            self._sync_summary()
+        else:
+            self._set_summary("")
+
+    def restore_messages(self, messages: List[Message], recount: bool = False):
+        """
+        Carga mensajes en bloque (al final del historial).
+
+        A diferencia de llamar add_message() por cada uno, reutiliza los
+        tokens ya contados de cada mensaje y verifica el límite una sola vez
+        al final.
+
+        Args:
+            messages: Mensajes a restaurar, en orden
+            recount: Volver a contar tokens (si se guardaron con otro tokenizer)
+        """
+        for msg in messages:
+            if recount or not msg.tokens:
+                msg.tokens = self.count_tokens(msg.content)
+
+        self.messages.extend(messages)
+        self.total_tokens += sum(msg.tokens for msg in messages)
+        self._wire = None
+
+        if self.used_tokens > self.max_tokens * self.trigger_ratio:
+            self._optimize_context()
 
     def _optimize_context(self):
         """
         Optimiza el contexto cuando se está llenando.
 
+        Elimina los mensajes más antiguos hasta que el contexto baje a
+        target_ratio del límite, dejando margen para varios turnos antes de
+        volver a recortar. El último mensaje nunca se elimina, y el
+        historial siempre empieza con un mensaje del usuario (no con
+        resultados de herramientas sin su llamada).
+
         Estrategias:
         1. Eliminar mensajes antiguos (mantener los más recientes)
-        2. Resumir partes de la conversación (TODO: implementar)
+        2. Resumir los mensajes eliminados (si hay summarizer), en segundo
+           plano: este turno no espera al resumen
         """
-        # Por ahora, simplemente mantenemos los últimos N mensajes
-        if len(self.messages) > 50:
-            # Mantener los últimos 30 mensajes
-            removed_messages = self.messages[:-30]
-            self.messages = self.messages[-30:]
-
-            # Recalcular tokens
-            self.total_tokens = sum(msg.tokens for msg in self.messages)
+        target = self.max_tokens * self.target_ratio
+        tokens = self.used_tokens
+        cut = 0
+
+        while cut < len(self.messages) - 1 and tokens > target:
+            tokens -= self.messages[cut].tokens
+            cut += 1
+
+        # No dejar una respuesta del asistente ni resultados huérfanos como primer mensaje
+        while cut < len(self.messages) - 1 and not self.messages[cut].is_user_turn():
+            tokens -= self.messages[cut].tokens
+            cut += 1
+
+        if not cut:
+            return
+
+        removed_messages = self.messages[:cut]
+        self.messages = self.messages[cut:]
+        self._wire = None
+        removed_tokens = sum(msg.tokens for msg in removed_messages)
+        self.total_tokens -= removed_tokens
+
+        print(
+            f"⚠️ Contexto optimizado: {len(removed_messages)} mensajes antiguos removidos "
+            f"({removed_tokens} tokens)"
+        )
 
-            print(f"⚠️ Contexto optimizado: {len(removed_messages)} mensajes antiguos removidos")
+        if self.summarizer is not None:
+            self.summarizer.add(removed_messages)
 
     def get_summary(self) -> Dict[str, Any]:
         """Obtiene un resumen del contexto actual"""
         return {
             "total_messages": len(self.messages),
-            "total_tokens": self.total_tokens,
+            "total_tokens": self.used_tokens,
+            "system_tokens": self.system_tokens,
+            "summary_tokens": self.summary_tokens,
             "max_tokens": self.max_tokens,
-            "usage_percentage": (self.total_tokens / self.max_tokens) * 100,
-            "has_system_message": self.system_message is not None
+            "usage_percentage": (self.used_tokens / self.max_tokens) * 100,
+            "has_system_message": self.system_message is not None,
+            "tokenizer": self.tokenizer.name
         }
 
     def __repr__(self) -> str:
@@ -142,54 +319,239 @@ class ConversationHistory:
     """
     Almacena el historial completo de conversaciones (persistente).
     Útil para mantener contexto entre sesiones.
+
+    Las conversaciones se guardan en SQLite (Settings.HISTORY), no en
+    memoria: listar conversaciones no carga mensajes, y al restaurar solo
+    se leen, por páginas desde el final, los mensajes que caben en el
+    contexto.
     """
 
-    def __init__(self):
-        self.conversations: List[Dict[str, Any]] = []
-
-    def save_conversation(self, context: ContextManager, name: str = None):
-        """Guarda una conversación"""
-        conversation = {
-            "name": name or f"conversation_{datetime.now().isoformat()}",
-            "timestamp": datetime.now().isoformat(),
-            "messages": [
-                {
-                    "role": msg.role,
-                    "content": msg.content,
-                    "timestamp": msg.timestamp.isoformat(),
-                    "metadata": msg.metadata
-                }
-                for msg in context.messages
-            ],
-            "summary": context.get_summary()
-        }
-        self.conversations.append(conversation)
+    def __init__(self, path: Optional[str] = None, page_size: Optional[int] = None):
+        self.path = path or Settings.HISTORY["path"]
+        self.page_size = page_size or Settings.HISTORY["page_size"]
+
+        directory = os.path.dirname(self.path)
+        if directory and self.path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS conversations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    message_count INTEGER NOT NULL,
+                    tokenizer TEXT,
+                    summary TEXT
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    conversation_id INTEGER NOT NULL,
+                    seq INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    PRIMARY KEY (conversation_id, seq)
+                )
+            """)
+
+    def save_conversation(self, context: ContextManager, name: str = None) -> int:
+        """
+        Guarda una conversación: sus mensajes y el resumen de lo que ya se
+        había recortado.
 
-    def load_conversation(self, index: int) -> ContextManager:
-        """Carga una conversación guardada"""
-        if index >= len(self.conversations):
-            raise ValueError(f"Conversación {index} no existe")
+        Returns:
+            Id de la conversación guardada
+        """
+        if context.summarizer is not None:
+            # Que el resumen incluya lo recortado que aún se estaba resumiendo
+            context.summarizer.wait()
+        summary = context.summary_text
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO conversations (name, timestamp, message_count, tokenizer, summary) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    name or f"conversation_{datetime.now().isoformat()}",
+                    datetime.now().isoformat(),
+                    len(context.messages),
+                    context.tokenizer.name,
+                    summary
+                )
+            )
+            conversation_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO messages (conversation_id, seq, role, content, timestamp, metadata, tokens) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        conversation_id,
+                        seq,
+                        msg.role,
+                        msg.content,
+                        msg.timestamp.isoformat(),
+                        json.dumps(msg.metadata, ensure_ascii=False, default=str),
+                        msg.tokens
+                    )
+                    for seq, msg in enumerate(context.messages)
+                )
+            )
+        return conversation_id
 
-        conversation = self.conversations[index]
-        context = ContextManager()
+    def load_conversation(self, index: int, context: Optional[ContextManager] = None) -> ContextManager:
+        """
+        Carga una conversación guardada.
 
-        for msg_data in conversation["messages"]:
-            context.add_message(
-                role=msg_data["role"],
-                content=msg_data["content"],
-                metadata=msg_data.get("metadata", {})
-            )
+        Lee páginas de mensajes desde el final hasta llenar el contexto
+        (target_ratio del límite); los mensajes más antiguos que no cabrían
+        no se leen. Lo restaurado empieza siempre en un mensaje del usuario:
+        nunca con una respuesta del asistente ni con resultados de
+        herramientas cuya llamada quedó fuera. El resumen guardado de los
+        mensajes recortados antes de guardar también se restaura.
 
+        Args:
+            index: Índice en list_conversations()
+            context: Contexto donde restaurar (ej: agent.context); por
+                defecto uno nuevo
+
+        Returns:
+            El contexto con los mensajes restaurados
+        """
+        conversation = self._get_conversation(index)
+        if conversation is None:
+            raise ValueError(f"Conversación {index} no existe")
+        conversation_id, tokenizer_name, summary = conversation
+
+        context = context if context is not None else ContextManager()
+        # Primero el resumen: los mensajes ocupan lo que queda del presupuesto
+        if summary:
+            context.restore_summary(summary)
+        budget = context.max_tokens * context.target_ratio - context.used_tokens
+        recount = tokenizer_name != context.tokenizer.name
+
+        pages: List[List[Tuple[int, Message]]] = []
+        tokens = 0
+        before = None
+        # Pasado el presupuesto se sigue leyendo hasta tener un turno del usuario
+        while tokens < budget or not any(msg.is_user_turn() for page in pages for _, msg in page):
+            page = self._read_page(conversation_id, before=before, newest_first=True)
+            if not page:
+                break
+            pages.append(page)
+            tokens += sum(msg.tokens for _, msg in page)
+            before = page[-1][0]
+
+        restored = [msg for page in reversed(pages) for _, msg in reversed(page)]
+        context.restore_messages(self._from_user_turn(restored, budget), recount=recount)
         return context
 
+    @staticmethod
+    def _from_user_turn(messages: List[Message], budget: float) -> List[Message]:
+        """
+        Sufijo de messages que empieza en un turno del usuario: el más
+        antiguo que cabe en budget, o el más reciente si ninguno cabe.
+        """
+        remaining = sum(msg.tokens for msg in messages)
+        start = None
+        for i, msg in enumerate(messages):
+            if msg.is_user_turn():
+                start = i
+                if remaining <= budget:
+                    break
+            remaining -= msg.tokens
+        return messages[start:] if start is not None else []
+
+    def iter_messages(self, index: int) -> Iterator[List[Message]]:
+        """Recorre todos los mensajes de una conversación, página a página"""
+        conversation = self._get_conversation(index)
+        if conversation is None:
+            raise ValueError(f"Conversación {index} no existe")
+
+        after = None
+        while True:
+            page = self._read_page(conversation[0], after=after)
+            if not page:
+                return
+            after = page[-1][0]
+            yield [msg for _, msg in page]
+
     def list_conversations(self) -> List[Dict[str, Any]]:
         """Lista todas las conversaciones guardadas"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, name, timestamp, message_count FROM conversations ORDER BY id"
+            ).fetchall()
         return [
             {
                 "index": i,
-                "name": conv["name"],
-                "timestamp": conv["timestamp"],
-                "message_count": len(conv["messages"])
+                "id": row[0],
+                "name": row[1],
+                "timestamp": row[2],
+                "message_count": row[3]
             }
-            for i, conv in enumerate(self.conversations)
+            for i, row in enumerate(rows)
+        ]
+
+    def delete_conversation(self, index: int):
+        """Elimina una conversación y sus mensajes"""
+        conversation = self._get_conversation(index)
+        if conversation is None:
+            raise ValueError(f"Conversación {index} no existe")
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation[0],))
+            self._conn.execute("DELETE FROM conversations WHERE id = ?", (conversation[0],))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _get_conversation(self, index: int):
+        """(id, tokenizer, resumen) de la conversación en la posición index"""
+        if index < 0:
+            return None
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, tokenizer, summary FROM conversations ORDER BY id LIMIT 1 OFFSET ?", (index,)
+            ).fetchone()
+
+    def _read_page(
+        self,
+        conversation_id: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        newest_first: bool = False
+    ) -> List[Tuple[int, Message]]:
+        """Una página de mensajes como (posición, mensaje)"""
+        query = "SELECT seq, role, content, timestamp, metadata, tokens FROM messages WHERE conversation_id = ?"
+        params: List[Any] = [conversation_id]
+        if before is not None:
+            query += " AND seq < ?"
+            params.append(before)
+        if after is not None:
+            query += " AND seq > ?"
+            params.append(after)
+        query += f" ORDER BY seq {'DESC' if newest_first else 'ASC'} LIMIT ?"
+        params.append(self.page_size)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        return [
+            (
+                seq,
+                Message(
+                    role=role,
+                    content=content,
+                    timestamp=datetime.fromisoformat(timestamp),
+                    metadata=json.loads(metadata),
+                    tokens=tokens
+                )
+            )
+            for seq, role, content, timestamp, metadata, tokens in rows
         ]
@@ -4,12 +4,18 @@ Agente Orquestador Principal
 Similar a Claude Code, este agente coordina a todos los demás agentes
 y decide cuándo delegar tareas a agentes especializados.
 """
+import asyncio
+import threading
+import time
 from typing import List, Dict, Any, Optional
 from .base_agent import BaseAgent
+from .api_client import MultiAPIClient
+from .tracing import DELEGATION, get_tracer
 from ..tools.base_tool import BaseTool
 from ..tools.file_tools import ReadFileTool, WriteFileTool, EditFileTool, ListDirectoryTool
 from ..tools.search_tools import GrepTool, GlobTool
 from ..tools.bash_tool import BashTool
+from ..config.settings import Settings
 
 
 class DelegateToAgentTool(BaseTool):
@@ -19,6 +25,15 @@ class DelegateToAgentTool(BaseTool):
     Esto es similar a cómo yo uso el Task tool para lanzar agentes especializados.
     """
 
+    # El agente delegado puede escribir archivos y comparte su contexto
+    # entre llamadas: dos delegaciones del mismo turno no se solapan
+    side_effects = True
+
+    # Sin límite: un timeout dejaría al agente corriendo en su hilo y
+    # liberaría la barrera, y la delegación siguiente usaría el mismo
+    # contexto a la vez
+    timeout = None
+
     def __init__(self, orchestrator):
         super().__init__(
             name="delegate_to_agent",
@@ -42,9 +57,12 @@ class DelegateToAgentTool(BaseTool):
         if not agent:
             return f"Error: Agente '{agent_type}' no disponible"
 
-        print(f"\n🤖 Delegando a {agent.name}: {task}\n")
-        response = agent.chat(task)
-        print(f"\n✅ {agent.name} completó la tarea\n")
+        attributes = {"agent_type": agent_type, "agent": agent.name, "task_chars": len(task)}
+        with get_tracer().span(f"delegate {agent_type}", DELEGATION, **attributes) as span:
+            print(f"\n🤖 Delegando a {agent.name}: {task}\n")
+            response = agent.chat(task)
+            print(f"\n✅ {agent.name} completó la tarea\n")
+            span.set_attribute("response_chars", len(response))
 
         return response
 
@@ -66,6 +84,166 @@ class DelegateToAgentTool(BaseTool):
         }
 
 
+class DelegateParallelTool(BaseTool):
+    """
+    Delega varias subtareas independientes a la vez.
+
+    Cada subtarea se ejecuta en un fork del agente (contexto propio y
+    vacío), así que el tiempo total es el de la subtarea más lenta y no la
+    suma. Los resultados se recogen a medida que terminan.
+
+    Si una falla se cancelan las pendientes: se abortan sus llamadas al
+    modelo en curso y no empiezan herramientas nuevas (BaseAgent.fork con
+    cancel_event). Al cerrar el fork se mata su sesión de bash, con el
+    comando en curso; cualquier otra herramienta que ya está corriendo no
+    se puede interrumpir y termina, o vence su timeout, en segundo plano.
+    """
+
+    # Igual que delegate_to_agent: los agentes pueden escribir archivos y
+    # las subtareas largas no se cortan
+    side_effects = True
+    timeout = None
+
+    def __init__(self, orchestrator, max_concurrency: Optional[int] = None):
+        super().__init__(
+            name="delegate_parallel",
+            description=(
+                "Delega varias subtareas independientes a agentes especializados "
+                "(code o research) y las ejecuta en paralelo. Úsala cuando las "
+                "subtareas no dependen unas de otras."
+            )
+        )
+        self.orchestrator = orchestrator
+        self.max_concurrency = max_concurrency or Settings.DELEGATION["max_concurrency"]
+
+    def execute(self, tasks: List[Dict[str, str]], **kwargs) -> str:
+        """
+        Ejecuta las subtareas en paralelo.
+
+        Args:
+            tasks: Lista de {"agent_type": "code"|"research", "task": "..."}
+            **kwargs: Parámetros adicionales (ignorados, para compatibilidad)
+
+        Returns:
+            Resultados de todas las subtareas, en el orden pedido
+        """
+        if not tasks:
+            return "Error: No se indicaron subtareas"
+
+        for spec in tasks:
+            if not self.orchestrator.get_agent(spec.get("agent_type")):
+                return f"Error: Agente '{spec.get('agent_type')}' no disponible"
+
+        # Las herramientas corren en hilos sin event loop propio
+        results, failed = asyncio.run(self._run_all(tasks))
+
+        sections = []
+        for index, spec in enumerate(tasks):
+            header = f"[{index + 1}] {spec['agent_type']}: {spec['task']}"
+            if index in results:
+                sections.append(f"{header}\n{results[index]}")
+            elif failed and failed[0] == index:
+                sections.append(f"{header}\nError: {failed[1]}")
+            else:
+                sections.append(f"{header}\n(cancelada)")
+
+        output = "\n\n".join(sections)
+        if failed:
+            output = (
+                f"Error: La subtarea {failed[0] + 1} falló; "
+                f"se cancelaron las pendientes\n\n{output}"
+            )
+        return output
+
+    async def _run_all(self, tasks: List[Dict[str, str]]):
+        """Lanza las subtareas y las recoge a medida que terminan"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        cancel_event = threading.Event()
+        pending = [
+            asyncio.create_task(self._run_one(index, spec, semaphore, cancel_event))
+            for index, spec in enumerate(tasks)
+        ]
+
+        results: Dict[int, str] = {}
+        failed = None  # (índice, error) de la primera subtarea que falló
+        try:
+            for next_done in asyncio.as_completed(pending):
+                index, response, error = await next_done
+                if error is not None:
+                    failed = (index, error)
+                    break
+                results[index] = response
+        finally:
+            # Primero el evento: los hilos de herramientas no ven task.cancel()
+            cancel_event.set()
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            await MultiAPIClient.aclose_shared_clients()
+
+        return results, failed
+
+    async def _run_one(
+        self,
+        index: int,
+        spec: Dict[str, str],
+        semaphore: asyncio.Semaphore,
+        cancel_event: threading.Event
+    ):
+        """Ejecuta una subtarea; devuelve (índice, respuesta, error)"""
+        async with semaphore:
+            agent = self.orchestrator.get_agent(spec["agent_type"]).fork(cancel_event)
+            attributes = {
+                "agent_type": spec["agent_type"],
+                "agent": agent.name,
+                "task_chars": len(spec["task"]),
+                "index": index
+            }
+            # Cada tarea de asyncio tiene su copia del contexto: el span
+            # cuelga de delegate_parallel y no se mezcla con los de las otras
+            with get_tracer().span(f"delegate {spec['agent_type']}", DELEGATION, **attributes) as span:
+                print(f"\n🤖 Delegando a {agent.name} [{index + 1}]: {spec['task']}\n")
+                start = time.perf_counter()
+                try:
+                    response = await agent.achat(spec["task"])
+                except Exception as e:
+                    span.set_error(e)
+                    print(f"\n❌ {agent.name} [{index + 1}] falló: {e}\n")
+                    return index, None, str(e)
+                finally:
+                    agent.close_fork()
+                span.set_attribute("response_chars", len(response))
+                print(f"\n✅ {agent.name} [{index + 1}] completó la tarea ({time.perf_counter() - start:.1f}s)\n")
+                return index, response, None
+
+    def get_schema(self) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "tasks": {
+                    "type": "array",
+                    "description": "Subtareas independientes a ejecutar en paralelo",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "agent_type": {
+                                "type": "string",
+                                "enum": ["code", "research"],
+                                "description": "Tipo de agente: 'code' para código, 'research' para análisis"
+                            },
+                            "task": {
+                                "type": "string",
+                                "description": "Descripción detallada de la subtarea"
+                            }
+                        },
+                        "required": ["agent_type", "task"]
+                    }
+                }
+            },
+            "required": ["tasks"]
+        }
+
+
 class Orchestrator(BaseAgent):
     """
     Agente Orquestador Principal.
@@ -114,6 +292,9 @@ Cuándo usar herramientas directamente:
 2. Búsquedas rápidas
 3. Comandos bash simples
 
+Si varias subtareas son independientes entre sí, delégalas juntas con
+delegate_parallel: se ejecutan a la vez en lugar de una tras otra.
+
 Siempre sé eficiente: usa herramientas directas para tareas simples,
 delega a agentes para tareas complejas."""
 
@@ -140,10 +321,10 @@ delega a agentes para tareas complejas."""
         # Agentes especializados
         self.specialized_agents = specialized_agents or {}
 
-        # Agregar herramienta de delegación
-        delegate_tool = DelegateToAgentTool(self)
-        self.tools.append(delegate_tool)
-        self.tool_registry.register(delegate_tool)
+        # Agregar herramientas de delegación
+        for delegate_tool in (DelegateToAgentTool(self), DelegateParallelTool(self)):
+            self.tools.append(delegate_tool)
+            self.tool_registry.register(delegate_tool)
 
     def register_agent(self, agent_type: str, agent: BaseAgent):
         """Registra un agente especializado"""
@@ -188,6 +369,20 @@ delega a agentes para tareas complejas."""
 
         return response
 
+    async def arun(self, user_message: str, **kwargs) -> Dict[str, Any]:
+        """Versión async de run(), con el mismo logging"""
+        print(f"\n{'='*60}")
+        print(f"📝 Usuario: {user_message}")
+        print(f"{'='*60}\n")
+
+        response = await super().arun(user_message, **kwargs)
+
+        print(f"\n{'='*60}")
+        print(f"🤖 Orquestador: {response['content'][:200]}...")
+        print(f"{'='*60}\n")
+
+        return response
+
     def show_status(self):
         """Muestra el estado del sistema"""
         print("\n" + "="*60)
@@ -207,6 +402,12 @@ delega a agentes para tareas complejas."""
             print(f"    - Herramientas: {len(agent.tools)}")
             print(f"    - Contexto: {agent.context}")
 
+        # Latencias registradas (core/tracing.py)
+        tracer = get_tracer()
+        if tracer.enabled:
+            print(f"\n⏱️ Latencias:")
+            print(tracer.format_stats())
+
         print("\n" + "="*60 + "\n")
 
     def __repr__(self) -> str:
@@ -0,0 +1,418 @@
+"""
+Límites de tasa y reintentos de las llamadas a los proveedores
+
+Cada proveedor tiene un RateLimiter compartido por todo el proceso, con dos
+token buckets: peticiones por minuto y tokens por minuto. Antes de cada
+llamada se reserva una petición y una estimación de los tokens (prompt +
+max_tokens); al recibir la respuesta la reserva se ajusta con el uso real.
+Así varios agentes concurrentes (delegate_parallel, forks, hilos) reparten
+el mismo presupuesto en lugar de chocar contra el límite del proveedor.
+
+Los errores transitorios (429, 408, 409, 5xx, 529, errores de conexión y
+timeouts) se reintentan con backoff exponencial con jitter. Si el
+proveedor indica retry-after, se respeta y además se pausa el limiter del
+proveedor: las demás llamadas esperan lo mismo en lugar de provocar otro
+429 cada una.
+
+Se configura en Settings.RATE_LIMITS.
+"""
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+from ..config.settings import Settings
+
+
+T = TypeVar("T")
+
+# Callback de reintento: (intento, espera en segundos, error)
+RetryCallback = Callable[[int, float, BaseException], None]
+
+# Callback de espera por el limiter: segundos esperados
+WaitCallback = Callable[[float], None]
+
+# Tokens realmente usados según una respuesta (o un evento de stream); None
+# si no informa uso
+UsageFunction = Callable[[Any], Optional[int]]
+
+# Códigos HTTP que vale la pena reintentar (529 = Anthropic sobrecargado)
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Excepciones de los SDKs que indican un fallo de red (por nombre, para no
+# depender de qué SDKs están instalados)
+_CONNECTION_ERRORS = {
+    "APIConnectionError", "APITimeoutError", "ConnectError", "ConnectTimeout",
+    "ReadTimeout", "RemoteProtocolError"
+}
+
+
+class TokenBucket:
+    """
+    Token bucket con reservas.
+
+    reserve() descuenta enseguida y devuelve cuánto hay que esperar hasta
+    que el saldo vuelva a ser positivo; el saldo puede quedar negativo. Así
+    quien llega primero sale primero, y nadie tiene que esperar con el lock
+    tomado.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0  # por segundo
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> Tuple[float, float]:
+        """
+        Reserva amount.
+
+        Returns:
+            (segundos a esperar, cantidad descontada); lo descontado es lo
+            que se debe devolver con refund()
+        """
+        self._refill(now)
+        # Una petición más grande que la capacidad nunca cabría: se limita
+        deducted = min(amount, self.capacity)
+        self.level -= deducted
+        return (-self.level / self.rate if self.level < 0 else 0.0), deducted
+
+    def refund(self, amount: float, now: float):
+        """Devuelve (o cobra, si amount < 0) tokens de una reserva"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Presupuesto de peticiones y tokens por minuto de un proveedor.
+
+    - requests_per_minute / tokens_per_minute: 0 o None = sin límite
+    """
+
+    def __init__(self, name: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.throttled = 0  # Respuestas 429 recibidas
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> Tuple[float, int]:
+        now = time.monotonic()
+        reserved = 0
+        with self._lock:
+            wait = max(self.paused_until - now, 0.0)
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, now)[0])
+            if self.tokens is not None and tokens:
+                tokens_wait, reserved = self.tokens.reserve(tokens, now)
+                wait = max(wait, tokens_wait)
+            if wait > 0:
+                self.waits += 1
+                self.waited_seconds += wait
+        return wait, int(reserved)
+
+    def acquire(self, tokens: int = 0) -> Tuple[float, int]:
+        """
+        Reserva una petición de ~tokens tokens y bloquea lo necesario.
+
+        Returns:
+            (segundos esperados, tokens reservados); los reservados pueden
+            ser menos que tokens y son los que se ajustan con record_usage()
+        """
+        wait, reserved = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait, reserved
+
+    async def aacquire(self, tokens: int = 0) -> Tuple[float, int]:
+        """Versión async de acquire(): espera sin bloquear el event loop"""
+        wait, reserved = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait, reserved
+
+    def record_usage(self, reserved: int, used: int):
+        """
+        Ajusta una reserva de tokens con el uso real informado por el
+        proveedor (reserved: lo que devolvió acquire())
+        """
+        if self.tokens is None or not reserved:
+            return
+        with self._lock:
+            self.tokens.refund(reserved - used, time.monotonic())
+
+    def pause(self, seconds: float):
+        """Detiene las llamadas al proveedor durante seconds (retry-after)"""
+        with self._lock:
+            self.throttled += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests_per_minute": self.requests.capacity if self.requests else None,
+                "tokens_per_minute": self.tokens.capacity if self.tokens else None,
+                "waits": self.waits,
+                "waited_seconds": round(self.waited_seconds, 3),
+                "throttled": self.throttled
+            }
+
+
+_LIMITERS: Dict[str, RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    """Limiter compartido de un proveedor (límites de Settings.RATE_LIMITS)"""
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(name)
+        if limiter is None:
+            limits = Settings.RATE_LIMITS["providers"].get(name, {})
+            limiter = _LIMITERS[name] = RateLimiter(
+                name, limits.get("requests_per_minute"), limits.get("tokens_per_minute")
+            )
+        return limiter
+
+
+def get_rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """Esperas y 429 recibidos por proveedor"""
+    with _LIMITERS_LOCK:
+        limiters = list(_LIMITERS.values())
+    return {limiter.name: limiter.get_stats() for limiter in limiters}
+
+
+# ----------------------------------------------------------------------
+# Reintentos
+# ----------------------------------------------------------------------
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)  # google.api_core
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True si el error es transitorio (límite de tasa, sobrecarga, red)"""
+    status = _status_code(error)
+    if status is not None:
+        return status in _RETRYABLE_STATUS or status >= 500
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in _CONNECTION_ERRORS for cls in type(error).__mro__)
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Segundos indicados por el proveedor en retry-after-ms / retry-after"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(float(value) / 1000, 0.0)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            # Formato fecha HTTP
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Cuántas veces y cuánto esperar entre reintentos.
+
+    - max_retries: reintentos después del primer intento
+    - base_delay / max_delay: backoff exponencial con jitter completo
+      (espera aleatoria entre 0 y base_delay * 2^intento, hasta max_delay)
+    - max_retry_after: un retry-after mayor que esto no se espera (el error
+      se propaga)
+    """
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 max_retry_after: float = 300.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        config = Settings.RATE_LIMITS
+        return cls(config["max_retries"], config["base_delay"], config["max_delay"], config["max_retry_after"])
+
+    def delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """
+        Espera antes del reintento número attempt (desde 1), o None si el
+        error no se debe reintentar.
+        """
+        if attempt > self.max_retries or not is_retryable(error):
+            return None
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            # Un poco de jitter para que los que esperaban no vuelvan juntos
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+def call_with_retry(
+    call: Callable[[], T],
+    limiter: Optional[RateLimiter] = None,
+    tokens: int = 0,
+    policy: Optional[RetryPolicy] = None,
+    on_retry: Optional[RetryCallback] = None,
+    on_wait: Optional[WaitCallback] = None,
+    usage: Optional[UsageFunction] = None
+) -> T:
+    """
+    Ejecuta call() respetando el limiter y reintentando los errores transitorios.
+
+    Cada intento reserva su petición y sus tokens en el limiter (los tokens
+    de un intento fallido se devuelven). Con usage, la reserva del intento
+    que salió bien se ajusta con el uso real de la respuesta. Un 429 pausa
+    el limiter entero, no solo este llamado.
+    """
+    policy = policy or RetryPolicy.from_settings()
+    attempt = 0
+    while True:
+        reserved = _acquire(limiter, tokens, on_wait)
+        try:
+            result = call()
+        except Exception as e:
+            attempt += 1
+            delay = _on_failure(limiter, reserved, policy, attempt, e, on_retry)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        _record_usage(limiter, reserved, usage, result)
+        return result
+
+
+async def acall_with_retry(
+    call: Callable[[], Awaitable[T]],
+    limiter: Optional[RateLimiter] = None,
+    tokens: int = 0,
+    policy: Optional[RetryPolicy] = None,
+    on_retry: Optional[RetryCallback] = None,
+    on_wait: Optional[WaitCallback] = None,
+    usage: Optional[UsageFunction] = None
+) -> T:
+    """Versión async de call_with_retry(): call devuelve una corrutina nueva en cada intento"""
+    policy = policy or RetryPolicy.from_settings()
+    attempt = 0
+    while True:
+        reserved = 0
+        if limiter is not None:
+            wait, reserved = await limiter.aacquire(tokens)
+            if wait and on_wait is not None:
+                on_wait(wait)
+        try:
+            result = await call()
+        except Exception as e:
+            attempt += 1
+            delay = _on_failure(limiter, reserved, policy, attempt, e, on_retry)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        _record_usage(limiter, reserved, usage, result)
+        return result
+
+
+def iter_with_retry(
+    make_iter: Callable[[], Iterator[T]],
+    limiter: Optional[RateLimiter] = None,
+    tokens: int = 0,
+    policy: Optional[RetryPolicy] = None,
+    on_retry: Optional[RetryCallback] = None,
+    on_wait: Optional[WaitCallback] = None,
+    usage: Optional[UsageFunction] = None
+) -> Iterator[T]:
+    """
+    Como call_with_retry() para un stream.
+
+    Solo se reintenta si el error llega antes del primer elemento: después
+    quien consume ya recibió parte de la respuesta y el error se propaga.
+    usage se aplica a cada elemento; el que informa uso ajusta la reserva.
+    """
+    policy = policy or RetryPolicy.from_settings()
+    attempt = 0
+    while True:
+        reserved = _acquire(limiter, tokens, on_wait)
+        items = make_iter()
+        try:
+            first = next(items)
+        except StopIteration:
+            return
+        except Exception as e:
+            attempt += 1
+            delay = _on_failure(limiter, reserved, policy, attempt, e, on_retry)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        _record_usage(limiter, reserved, usage, first)
+        yield first
+        for item in items:
+            _record_usage(limiter, reserved, usage, item)
+            yield item
+        return
+
+
+def _acquire(limiter: Optional[RateLimiter], tokens: int, on_wait: Optional[WaitCallback]) -> int:
+    """Reserva en el limiter; devuelve los tokens reservados"""
+    if limiter is None:
+        return 0
+    wait, reserved = limiter.acquire(tokens)
+    if wait and on_wait is not None:
+        on_wait(wait)
+    return reserved
+
+
+def _record_usage(limiter: Optional[RateLimiter], reserved: int, usage: Optional[UsageFunction], result: Any):
+    if limiter is None or not reserved or usage is None:
+        return
+    used = usage(result)
+    if used is not None:
+        limiter.record_usage(reserved, used)
+
+
+def _on_failure(
+    limiter: Optional[RateLimiter],
+    reserved: int,
+    policy: RetryPolicy,
+    attempt: int,
+    error: BaseException,
+    on_retry: Optional[RetryCallback]
+) -> Optional[float]:
+    """Registra un intento fallido; devuelve la espera antes de reintentar o None"""
+    if limiter is not None:
+        # El proveedor no cobra los tokens de una petición rechazada
+        limiter.record_usage(reserved, 0)
+    delay = policy.delay(attempt, error)
+    if delay is None:
+        return None
+    if limiter is not None and _status_code(error) == 429:
+        # Las demás llamadas al proveedor también esperan
+        limiter.pause(delay)
+    if on_retry is not None:
+        on_retry(attempt, delay, error)
+    return delay
@@ -0,0 +1,172 @@
+"""
+Caché en disco de respuestas del modelo
+
+Guarda la respuesta normalizada de cada llamada bajo un hash de la petición
+(proveedor, modelo, mensajes, tools, temperatura, max_tokens y demás
+parámetros). Volver a ejecutar el mismo paso de un pipeline devuelve la
+respuesta guardada en milisegundos y sin costo. Usa SQLite (sin
+dependencias), con expiración por TTL y desalojo LRU al superar el máximo
+de entradas. Se activa con Settings.RESPONSE_CACHE.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from ..config.settings import Settings
+
+
+class ResponseCache:
+    """
+    Caché de respuestas en SQLite.
+
+    - max_entries: al superarlo se eliminan las menos usadas recientemente
+    - ttl_seconds: antigüedad máxima de una respuesta (None = sin vencimiento)
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]],
+        temperature: float,
+        max_tokens: int,
+        **kwargs
+    ) -> str:
+        """Hash sha256 de todo lo que determina la respuesta"""
+        payload = json.dumps(
+            {
+                "provider": provider,
+                "model": model,
+                "messages": messages,
+                "tools": tools,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "kwargs": kwargs
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Respuesta guardada, o None si no existe o venció"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count -= 1
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        return json.loads(response)
+
+    def set(self, key: str, response: Dict[str, Any]):
+        """Guarda una respuesta (y desaloja las menos usadas si sobran)"""
+        now = time.time()
+        data = json.dumps(response, ensure_ascii=False, default=str)
+        with self._lock:
+            existed = self._conn.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, data, now, now)
+            )
+            if not existed:
+                self._count += 1
+
+            if self._count > self.max_entries:
+                # Desalojar un 10% extra para no hacerlo en cada inserción
+                excess = self._count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                    (excess,)
+                )
+                self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        """Elimina todas las respuestas guardadas"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._count = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Entradas y tasa de aciertos"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            "path": self.path
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Caché compartida del proceso
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Caché global si está habilitada en Settings.RESPONSE_CACHE, si no None"""
+    global _cache
+    config = Settings.RESPONSE_CACHE
+    if not config["enabled"]:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                path=config["path"],
+                max_entries=config["max_entries"],
+                ttl_seconds=config["ttl_seconds"]
+            )
+    return _cache
@@ -0,0 +1,163 @@
+"""
+Resumen incremental del contexto eliminado
+
+Cuando el ContextManager recorta mensajes antiguos, en lugar de perderlos
+se agregan a un resumen acumulado. El resumen se genera en segundo plano
+(fuera del turno del agente) con el mismo modelo del agente, y los
+resultados se cachean por contenido para no volver a resumir el mismo
+tramo (forks, conversaciones restauradas).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .api_client import MultiAPIClient
+    from .context_manager import Message
+    from .tokenizers import Tokenizer
+
+
+SUMMARY_PROMPT = """Eres el componente de memoria de un agente de programación.
+Actualiza el resumen de la conversación incorporando los mensajes nuevos.
+
+Conserva solo lo que el agente necesitará más adelante:
+- Objetivo del usuario y decisiones tomadas
+- Archivos leídos o modificados (rutas) y lo relevante de su contenido
+- Resultados de búsquedas y comandos (qué se encontró y dónde)
+- Errores encontrados y cómo se resolvieron
+- Tareas pendientes
+
+Sé conciso, usa viñetas y no inventes nada que no esté en los mensajes.
+Responde solo con el resumen actualizado."""
+
+# Resúmenes ya generados: sha256(modelo, resumen previo, mensajes) -> resumen
+_CACHE: "OrderedDict[str, str]" = OrderedDict()
+_CACHE_SIZE = 128
+_CACHE_LOCK = threading.Lock()
+
+# Un solo pool para todos los agentes: resumir nunca compite con los turnos
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarizer")
+
+
+class RollingSummarizer:
+    """
+    Resumen acumulado de los mensajes eliminados de un contexto.
+
+    add() encola mensajes y vuelve enseguida; un hilo en segundo plano los
+    va incorporando al resumen. Si llegan más mensajes mientras se resume,
+    se incorporan en la siguiente pasada (nunca hay dos pasadas a la vez
+    para el mismo resumen). Si una pasada falla (el cliente ya reintentó
+    los errores transitorios), sus mensajes vuelven al inicio de la cola y
+    se resumen junto con los del próximo recorte.
+    """
+
+    def __init__(
+        self,
+        api_client: "MultiAPIClient",
+        tokenizer: "Tokenizer",
+        max_summary_tokens: int = 1000,
+        max_message_tokens: int = 1000
+    ):
+        self.api_client = api_client
+        self.tokenizer = tokenizer
+        self.max_summary_tokens = max_summary_tokens
+        self.max_message_tokens = max_message_tokens
+
+        self.summary = ""
+        self.version = 0  # Cambia cada vez que se actualiza el resumen
+        self._buffer: List["Message"] = []
+        self._running = False
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def add(self, messages: List["Message"]):
+        """Encola mensajes eliminados para incorporarlos al resumen"""
+        if not messages:
+            return
+        with self._lock:
+            self._buffer.extend(messages)
+            if self._running:
+                return
+            self._running = True
+            self._idle.clear()
+        _EXECUTOR.submit(self._drain)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que no queden mensajes por resumir"""
+        return self._idle.wait(timeout)
+
+    def reset(self):
+        """Descarta el resumen (los pases en curso se ignoran)"""
+        self.restore("")
+
+    def restore(self, summary: str):
+        """Reemplaza el resumen, ej: el de una conversación guardada (los pases en curso se ignoran)"""
+        with self._lock:
+            self.summary = summary
+            self._buffer = []
+            self.version += 1
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                if not batch:
+                    self._running = False
+                    self._idle.set()
+                    return
+                previous, version = self.summary, self.version
+
+            try:
+                updated = self._summarize(previous, batch)
+            except Exception as e:
+                print(f"⚠️ No se pudo resumir el contexto (se reintentará en el próximo recorte): {e}")
+                with self._lock:
+                    # Salvo reset(), el tramo no se pierde: queda delante de lo nuevo
+                    if self.version == version:
+                        self._buffer[:0] = batch
+                    self._running = False
+                    self._idle.set()
+                return
+
+            with self._lock:
+                # Si hubo reset() mientras se resumía, el resultado ya no aplica
+                if self.version == version:
+                    self.summary = updated
+                    self.version += 1
+
+    def _summarize(self, previous: str, messages: List["Message"]) -> str:
+        transcript = "\n\n".join(
+            f"[{msg.role}]\n{self.tokenizer.truncate(msg.content, self.max_message_tokens)}"
+            for msg in messages
+        )
+
+        key = hashlib.sha256(
+            "\x00".join([self.api_client.model, previous, transcript]).encode("utf-8")
+        ).hexdigest()
+        with _CACHE_LOCK:
+            if key in _CACHE:
+                _CACHE.move_to_end(key)
+                return _CACHE[key]
+
+        prompt = (
+            f"Resumen actual:\n{previous or '(vacío)'}\n\n"
+            f"Mensajes nuevos:\n{transcript}"
+        )
+        response = self.api_client.chat(
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.0,
+            max_tokens=self.max_summary_tokens
+        )
+        summary = response["content"].strip()
+
+        with _CACHE_LOCK:
+            _CACHE[key] = summary
+            while len(_CACHE) > _CACHE_SIZE:
+                _CACHE.popitem(last=False)
+        return summary
@@ -0,0 +1,139 @@
+"""
+Conteo de tokens por proveedor
+
+Cada proveedor tiene su tokenizer. Si tiktoken está instalado se usa para
+los modelos compatibles con OpenAI (cuenta exacta para OpenAI, muy cercana
+para DeepSeek); para el resto se usa una estimación por caracteres ajustada
+al proveedor. Se pueden registrar tokenizers propios con register_tokenizer().
+"""
+import math
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Tuple
+
+# tiktoken es opcional
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+
+# Tokens extra por mensaje (rol y separadores del formato de chat)
+MESSAGE_OVERHEAD = 4
+
+
+class Tokenizer(ABC):
+    """Interfaz de los tokenizers"""
+
+    name = "base"
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Cantidad de tokens de un texto"""
+        pass
+
+    @abstractmethod
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Recorta un texto a ~max_tokens conservando el inicio y el final.
+
+        Se conservan 2/3 del presupuesto al inicio y 1/3 al final, con un
+        marcador en el medio que indica cuánto se omitió.
+        """
+        pass
+
+    @staticmethod
+    def _marker(omitted: int) -> str:
+        return f"\n\n[... {omitted} tokens omitidos ...]\n\n"
+
+
+class HeuristicTokenizer(Tokenizer):
+    """Estimación por caracteres (sin dependencias)"""
+
+    def __init__(self, chars_per_token: float = 4.0):
+        self.chars_per_token = chars_per_token
+        self.name = f"heuristic/{chars_per_token:g}"
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        total = self.count(text)
+        if total <= max_tokens:
+            return text
+
+        marker = self._marker(total - max_tokens)
+        keep_chars = max(int((max_tokens - self.count(marker)) * self.chars_per_token), 0)
+        head = keep_chars * 2 // 3
+        tail = keep_chars - head
+        return text[:head] + marker + (text[-tail:] if tail else "")
+
+
+class TiktokenTokenizer(Tokenizer):
+    """Tokenizer exacto de tiktoken"""
+
+    def __init__(self, model: str = "", encoding_name: str = "cl100k_base"):
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding(encoding_name)
+        self.name = f"tiktoken/{self.encoding.name}"
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+
+        marker = self._marker(len(tokens) - max_tokens)
+        keep = max(max_tokens - self.count(marker), 0)
+        head = keep * 2 // 3
+        tail = keep - head
+        return (
+            self.encoding.decode(tokens[:head])
+            + marker
+            + (self.encoding.decode(tokens[-tail:]) if tail else "")
+        )
+
+
+def _openai_tokenizer(model: str) -> Tokenizer:
+    if HAS_TIKTOKEN:
+        try:
+            return TiktokenTokenizer(model)
+        except Exception:
+            # tiktoken descarga el encoding la primera vez; sin red se estima
+            pass
+    return HeuristicTokenizer(4.0)
+
+
+# Fábricas por proveedor: model -> Tokenizer
+_FACTORIES: Dict[str, Callable[[str], Tokenizer]] = {
+    "openai": _openai_tokenizer,
+    "deepseek": _openai_tokenizer,
+    # Claude y Gemini no publican tokenizer local: sus tokens rinden algo
+    # menos de 4 caracteres en código y texto en español
+    "anthropic": lambda model: HeuristicTokenizer(3.5),
+    "google": lambda model: HeuristicTokenizer(4.0),
+}
+
+_CACHE: Dict[Tuple[str, str], Tokenizer] = {}
+
+
+def register_tokenizer(provider: str, factory: Callable[[str], Tokenizer]):
+    """Registra (o reemplaza) el tokenizer de un proveedor"""
+    _FACTORIES[provider] = factory
+    for key in [k for k in _CACHE if k[0] == provider]:
+        del _CACHE[key]
+
+
+def get_tokenizer(provider: str, model: str = "") -> Tokenizer:
+    """Tokenizer (compartido) para un proveedor y modelo"""
+    key = (provider, model)
+    tokenizer = _CACHE.get(key)
+    if tokenizer is None:
+        factory = _FACTORIES.get(provider)
+        tokenizer = factory(model) if factory else HeuristicTokenizer(4.0)
+        _CACHE[key] = tokenizer
+    return tokenizer
@@ -0,0 +1,200 @@
+"""
+Planificador de ejecución de herramientas
+
+Ejecuta las llamadas a herramientas de un mismo turno en un pool acotado de
+hilos. Las herramientas de solo lectura (read_file, grep, glob...) corren en
+paralelo; las que declaran side_effects (write_file, edit_file, bash) actúan
+como barrera: esperan a todas las anteriores y las siguientes esperan a que
+terminen. Los resultados se devuelven en el orden de las llamadas.
+
+Cada llamada corre en una copia del contexto de quien la envió, así los
+spans de las herramientas (core/tracing.py) cuelgan del span del agente.
+"""
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+from ..tools.base_tool import ToolRegistry
+from ..config.settings import Settings
+
+
+class _Call:
+    """Llamada enviada al pool"""
+
+    def __init__(self, tool_call: Any, timeout: Optional[float], side_effects: bool):
+        self.tool_call = tool_call
+        self.timeout = timeout
+        self.side_effects = side_effects
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.future = None
+        self.result = None
+        self.done = False
+
+
+class ToolBatch:
+    """
+    Llamadas a herramientas de un turno.
+
+    submit() se puede llamar a medida que llegan las llamadas (streaming);
+    results() espera a todas y las devuelve en orden.
+    """
+
+    def __init__(self, scheduler: "ToolScheduler", execute: Callable[[Any], Optional[Dict[str, str]]]):
+        self._scheduler = scheduler
+        self._execute = execute
+        self._calls: List[_Call] = []
+        self._barrier: Optional[_Call] = None
+
+    def submit(self, tool_call: Any):
+        """Envía una llamada respetando las barreras de side effects"""
+        side_effects = self._scheduler.has_side_effects(tool_call)
+
+        if side_effects:
+            # Una escritura espera a todo lo anterior
+            for call in self._calls:
+                self._wait(call)
+        elif self._barrier is not None:
+            # Una lectura espera a la última escritura (y a lo anterior a ella)
+            self._wait(self._barrier)
+
+        call = _Call(tool_call, self._scheduler.get_timeout(tool_call), side_effects)
+        context = contextvars.copy_context()
+        call.future = self._scheduler.executor.submit(context.run, self._run, call)
+        self._calls.append(call)
+        if side_effects:
+            self._barrier = call
+
+    def done(self) -> bool:
+        """True si todas las llamadas terminaron (o vencieron)"""
+        now = time.monotonic()
+        return all(
+            call.done
+            or call.future.done()
+            or (call.timeout is not None and now > (call.started_at or call.submitted_at) + call.timeout)
+            for call in self._calls
+        )
+
+    def results(self) -> List[Optional[Dict[str, str]]]:
+        """Resultados de todas las llamadas, en orden"""
+        return [self._wait(call) for call in self._calls]
+
+    def _run(self, call: _Call):
+        call.started_at = time.monotonic()
+        return self._execute(call.tool_call)
+
+    def _wait(self, call: _Call) -> Optional[Dict[str, str]]:
+        """
+        Espera una llamada con su timeout.
+
+        El timeout cuenta desde que empieza a ejecutarse; si ni siquiera
+        empezó dentro del timeout (pool ocupado) también se da por vencida.
+        Sin timeout (None) se espera lo que tarde.
+        """
+        if call.done:
+            return call.result
+
+        try:
+            if call.timeout is None:
+                call.result = call.future.result()
+                call.done = True
+                return call.result
+            remaining = call.submitted_at + call.timeout - time.monotonic()
+            try:
+                call.result = call.future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                if call.started_at is None:
+                    call.future.cancel()
+                    raise
+                remaining = call.started_at + call.timeout - time.monotonic()
+                call.result = call.future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            # El hilo no se puede interrumpir: sigue corriendo, pero el
+            # agente continúa con un error
+            call.result = self._error_result(
+                call.tool_call,
+                f"Error: La herramienta excedió el timeout de {call.timeout:g} segundos"
+            )
+        except Exception as e:
+            call.result = self._error_result(call.tool_call, f"Error: {str(e)}")
+
+        call.done = True
+        return call.result
+
+    @staticmethod
+    def _error_result(tool_call: Any, message: str) -> Optional[Dict[str, str]]:
+        if not isinstance(tool_call, dict) or not tool_call.get("name"):
+            return None
+        return {
+            "tool_call_id": tool_call.get("id", "unknown"),
+            "tool_name": tool_call["name"],
+            "result": message
+        }
+
+
+class ToolScheduler:
+    """
+    Pool acotado para ejecutar herramientas de un agente.
+
+    Configuración en Settings.TOOL_EXECUTION:
+    - max_workers: hilos del pool
+    - default_timeout: segundos por llamada si la herramienta no define timeout
+      (una herramienta con timeout = None no tiene límite)
+    """
+
+    def __init__(
+        self,
+        tool_registry: ToolRegistry,
+        max_workers: Optional[int] = None,
+        default_timeout: Optional[float] = None
+    ):
+        config = Settings.TOOL_EXECUTION
+        self.tool_registry = tool_registry
+        self.max_workers = max_workers or config["max_workers"]
+        self.default_timeout = default_timeout or config["default_timeout"]
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+
+    def has_side_effects(self, tool_call: Any) -> bool:
+        """True si la herramienta modifica el sistema (se serializa)"""
+        if not isinstance(tool_call, dict):
+            return False
+        tool = self.tool_registry.get(tool_call.get("name"))
+        return bool(tool and tool.side_effects)
+
+    def get_timeout(self, tool_call: Any) -> Optional[float]:
+        """Timeout de una llamada: el de la herramienta, el default o None (sin límite)"""
+        if isinstance(tool_call, dict):
+            tool = self.tool_registry.get(tool_call.get("name"))
+            if tool:
+                timeout = tool.get_timeout(tool_call.get("arguments") or {})
+                if timeout is None or timeout > 0:
+                    return timeout
+        return self.default_timeout
+
+    def batch(self, execute: Callable[[Any], Optional[Dict[str, str]]]) -> ToolBatch:
+        """Nuevo lote de llamadas de un turno"""
+        return ToolBatch(self, execute)
+
+    def run(
+        self,
+        tool_calls: List[Any],
+        execute: Callable[[Any], Optional[Dict[str, str]]]
+    ) -> List[Optional[Dict[str, str]]]:
+        """
+        Ejecuta las llamadas de un turno.
+
+        Args:
+            tool_calls: Llamadas tal como vienen en la respuesta del modelo
+            execute: Función que ejecuta una llamada y devuelve su resultado
+
+        Returns:
+            Resultados en el mismo orden que tool_calls
+        """
+        batch = self.batch(execute)
+        for tool_call in tool_calls:
+            batch.submit(tool_call)
+        return batch.results()
+
+    def shutdown(self):
+        """Libera los hilos del pool"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,421 @@
+"""
+Trazas e histogramas de latencia del ciclo de los agentes
+
+Cada llamada al modelo, a una herramienta y cada delegación abre un span
+con su duración y atributos (tokens, tamaños de la petición y del
+resultado, aciertos de caché...). El span activo se guarda en una
+contextvar, así que los spans que se abren dentro de otro quedan
+enlazados como hijos: una delegación cuelga de la herramienta que la
+lanzó y las llamadas del agente delegado cuelgan de la delegación. Los
+hilos del ToolScheduler y las tareas de asyncio heredan el contexto de
+quien las lanzó.
+
+Al terminar, cada span alimenta un histograma de latencia por nombre
+(Tracer.get_stats()) y, si Settings.TRACING["export_path"] está
+configurado, se escribe en un archivo JSONL: un span por línea, o un
+documento OTLP/JSON por línea con export_format = "otlp" (el formato del
+file exporter de OpenTelemetry).
+"""
+import atexit
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from ..config.settings import Settings
+
+
+# Tipos de span
+MODEL = "model"
+TOOL = "tool"
+DELEGATION = "delegation"
+AGENT = "agent"
+
+_CURRENT_SPAN: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+# Atributos numéricos que se acumulan por nombre de span en get_stats()
+_SUMMED_ATTRIBUTES = ("input_tokens", "output_tokens", "cache_read_input_tokens")
+
+
+class Span:
+    """Operación medida: nombre, tipo, duración, atributos y span padre"""
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.duration_ns: Optional[int] = None
+        self._start_perf = time.perf_counter_ns()
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return self.duration_ns / 1e6 if self.duration_ns is not None else None
+
+    def elapsed_ms(self) -> float:
+        """Milisegundos desde que se abrió el span"""
+        return round((time.perf_counter_ns() - self._start_perf) / 1e6, 3)
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def set_error(self, error: Any):
+        """Marca el span como fallido (excepción o mensaje)"""
+        self.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": self.start_ns / 1e9,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ns is not None else None,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Span que no registra nada (trazas desactivadas)"""
+
+    trace_id = span_id = parent_id = error = duration_ns = duration_ms = None
+
+    def elapsed_ms(self) -> float:
+        return 0.0
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def set_error(self, error: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class LatencyHistogram:
+    """
+    Histograma de latencias con buckets exponenciales.
+
+    Cada bucket es un 19% (2^(1/4)) más ancho que el anterior, desde 0.1 ms,
+    así que los percentiles tienen ese error relativo con memoria fija.
+    """
+
+    BASE_MS = 0.1
+    BUCKETS_PER_DOUBLING = 4
+    MAX_BUCKET = 120  # 0.1 ms * 2^30: unas 30 horas
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+        self.buckets: Dict[int, int] = {}
+
+    def record(self, ms: float):
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+        index = 0
+        if ms > self.BASE_MS:
+            index = min(math.ceil(math.log2(ms / self.BASE_MS) * self.BUCKETS_PER_DOUBLING), self.MAX_BUCKET)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def percentile(self, p: float) -> float:
+        """Latencia (ms) bajo la que cae el p% de las muestras"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                upper = self.BASE_MS * 2 ** (index / self.BUCKETS_PER_DOUBLING)
+                return min(max(upper, self.min_ms), self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "min_ms": round(self.min_ms, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p90_ms": round(self.percentile(90), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "total_ms": round(self.total_ms, 3)
+        }
+
+
+class SpanExporter:
+    """
+    Escribe spans terminados en un archivo, uno por línea.
+
+    Los spans se acumulan y se escriben de a flush_every (y al salir del
+    proceso), para no hacer una escritura por cada herramienta.
+    """
+
+    def __init__(self, path: str, format: str = "jsonl", flush_every: int = 20):
+        if format not in ("jsonl", "otlp"):
+            raise ValueError(f"Formato de exportación no soportado: {format}")
+        self.path = path
+        self.format = format
+        self.flush_every = flush_every
+        self._pending: List[Span] = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span: Span):
+        with self._lock:
+            self._pending.append(span)
+            if len(self._pending) < self.flush_every:
+                return
+            pending, self._pending = self._pending, []
+            self._write(pending)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if pending:
+                self._write(pending)
+
+    def _write(self, spans: List[Span]):
+        if self.format == "otlp":
+            lines = [json.dumps(_to_otlp(spans), ensure_ascii=False, default=str)]
+        else:
+            lines = [json.dumps(span.to_dict(), ensure_ascii=False, default=str) for span in spans]
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    """Spans en formato OTLP/JSON (ExportTraceServiceRequest)"""
+    otlp_spans = []
+    for span in spans:
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 3 if span.kind == MODEL else 1,  # CLIENT / INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.start_ns + (span.duration_ns or 0)),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in {"span.kind": span.kind, **span.attributes}.items()
+                if value is not None
+            ],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        otlp_spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": "multi_agent_system"}}
+            ]},
+            "scopeSpans": [{"scope": {"name": "multi_agent_system.tracing"}, "spans": otlp_spans}]
+        }]
+    }
+
+
+class Tracer:
+    """
+    Crea spans, agrega sus latencias y los exporta.
+
+    - enabled: si es False, span() devuelve un span que no registra nada
+    - exporter: destino de los spans terminados (opcional)
+    - keep_recent: spans terminados que se conservan en memoria
+    """
+
+    def __init__(self, enabled: bool = True, exporter: Optional[SpanExporter] = None, keep_recent: int = 1000):
+        self.enabled = enabled
+        self.exporter = exporter
+        self._recent: "deque[Span]" = deque(maxlen=keep_recent)
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _CURRENT_SPAN.get()
+
+    def start_span(
+        self,
+        name: str,
+        kind: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Span] = None
+    ):
+        """
+        Abre un span sin activarlo (hijo de parent o del span activo).
+
+        Para operaciones que no caben en un bloque with, como un stream que
+        se consume de a poco; se cierra con end_span().
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(name, kind, parent or _CURRENT_SPAN.get(), dict(attributes or {}))
+
+    def end_span(self, span, error: Any = None):
+        """Cierra un span: lo agrega a las estadísticas y lo exporta"""
+        if not isinstance(span, Span) or span.duration_ns is not None:
+            return
+        span.duration_ns = time.perf_counter_ns() - span._start_perf
+        if error is not None:
+            span.set_error(error)
+
+        with self._lock:
+            self._recent.append(span)
+            stats = self._stats.get(span.name)
+            if stats is None:
+                stats = self._stats[span.name] = {
+                    "kind": span.kind, "histogram": LatencyHistogram(), "errors": 0, "sums": {}
+                }
+            stats["histogram"].record(span.duration_ms)
+            if span.error:
+                stats["errors"] += 1
+            for key in _SUMMED_ATTRIBUTES:
+                value = span.attributes.get(key)
+                if isinstance(value, (int, float)):
+                    stats["sums"][key] = stats["sums"].get(key, 0) + value
+
+        if self.exporter is not None:
+            try:
+                self.exporter.export(span)
+            except OSError:
+                pass
+
+    @contextmanager
+    def activate(self, span) -> Iterator[Any]:
+        """Hace de span el span activo dentro del bloque (sin cerrarlo)"""
+        if not isinstance(span, Span):
+            yield span
+            return
+        token = _CURRENT_SPAN.set(span)
+        try:
+            yield span
+        finally:
+            _CURRENT_SPAN.reset(token)
+
+    @contextmanager
+    def span(self, name: str, kind: str, **attributes) -> Iterator[Any]:
+        """
+        Abre un span, lo activa durante el bloque y lo cierra al salir.
+
+        Una excepción que atraviesa el bloque marca el span como fallido:
+
+            with tracer.span(f"tool {name}", TOOL, tool=name) as span:
+                result = tool.execute(**kwargs)
+                span.set_attribute("result_chars", len(result))
+        """
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        span = self.start_span(name, kind, attributes)
+        token = _CURRENT_SPAN.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            _CURRENT_SPAN.reset(token)
+            self.end_span(span)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Latencias (p50/p90/p99...), errores y tokens por nombre de span"""
+        with self._lock:
+            return {
+                name: {
+                    "kind": stats["kind"],
+                    **stats["histogram"].summary(),
+                    "errors": stats["errors"],
+                    **stats["sums"]
+                }
+                for name, stats in self._stats.items()
+            }
+
+    def get_recent_spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Últimos spans terminados (de una traza, si se indica)"""
+        with self._lock:
+            spans = list(self._recent)
+        return [span.to_dict() for span in spans if trace_id is None or span.trace_id == trace_id]
+
+    def format_stats(self) -> str:
+        """Tabla de latencias ordenada por tiempo total"""
+        stats = sorted(self.get_stats().items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        if not stats:
+            return "(sin spans registrados)"
+        lines = [f"{'span':<44} {'n':>6} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'total s':>9} {'err':>4}"]
+        for name, s in stats:
+            lines.append(
+                f"{name[:44]:<44} {s['count']:>6} {s['p50_ms']:>10.1f} {s['p90_ms']:>10.1f} "
+                f"{s['p99_ms']:>10.1f} {s['total_ms'] / 1000:>9.2f} {s['errors']:>4}"
+            )
+        return "\n".join(lines)
+
+    def reset(self):
+        """Descarta estadísticas y spans recientes"""
+        with self._lock:
+            self._recent.clear()
+            self._stats.clear()
+
+    def flush(self):
+        """Escribe los spans pendientes de exportar"""
+        if self.exporter is not None:
+            try:
+                self.exporter.flush()
+            except OSError:
+                pass
+
+
+def _create_tracer() -> Tracer:
+    config = Settings.TRACING
+    exporter = None
+    if config["enabled"] and config["export_path"]:
+        exporter = SpanExporter(config["export_path"], config["export_format"], config["flush_every"])
+    return Tracer(config["enabled"], exporter, config["keep_recent"])
+
+
+_tracer = _create_tracer()
+atexit.register(_tracer.flush)
+
+
+def get_tracer() -> Tracer:
+    """Tracer compartido del proceso"""
+    return _tracer
@@ -9,6 +9,8 @@ Demuestra características avanzadas como:
 """
 import sys
 import os
+import asyncio
+import time
 
 # Agregar el directorio padre (turnosMedical) al path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -121,7 +123,7 @@ def example_context_management():
 
 
 def example_parallel_agents():
-    """Ejemplo: Ejecutar múltiples agentes en paralelo (simulado)"""
+    """Ejemplo: Ejecutar múltiples agentes en paralelo"""
     print("\n" + "="*60)
     print("EJEMPLO AVANZADO 3: Múltiples Agentes")
     print("="*60 + "\n")
@@ -134,15 +136,24 @@ def example_parallel_agents():
     # research_agent = ResearchAgent(model="claude-sonnet-4-5-20250929")
 
     # Tarea para cada agente
-    print("🔄 Ejecutando tareas en paralelo (simulado)...\n")
+    print("🔄 Ejecutando tareas en paralelo...\n")
 
-    # Agente de código
-    print("Code Agent trabajando...")
-    code_result = code_agent.chat("Busca todos los archivos .py en el proyecto")
+    async def run_both():
+        return await asyncio.gather(
+            code_agent.achat("Busca todos los archivos .py en el proyecto"),
+            research_agent.achat("Analiza la estructura del proyecto")
+        )
+
+    # Tiempo total ≈ el del agente más lento, no la suma
+    start = time.perf_counter()
+    code_result, research_result = asyncio.run(run_both())
+    print(f"⏱️  Ambos agentes terminaron en {time.perf_counter() - start:.1f}s")
 
-    # Agente de investigación
-    print("Research Agent trabajando...")
-    research_result = research_agent.chat("Analiza la estructura del proyecto")
+    # Desde el orquestador, la herramienta delegate_parallel hace lo mismo:
+    # el modelo puede delegar varias subtareas independientes a la vez
+    # orchestrator.register_agent("code", code_agent)
+    # orchestrator.register_agent("research", research_agent)
+    # orchestrator.chat("Busca los .py y, en paralelo, analiza la estructura")
 
     print("\n📊 Resultados:")
     print(f"\n[CODE AGENT]\n{code_result}\n")
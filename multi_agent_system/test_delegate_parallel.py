@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests de delegate_parallel (core/orchestrator.py: DelegateParallelTool)
+
+Verifica que los resultados salen en el orden pedido y que, cuando una
+subtarea falla, las demás no empiezan herramientas nuevas.
+
+Uso: python -m pytest multi_agent_system/test_delegate_parallel.py
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import pytest
+
+from multi_agent_system.core import base_agent
+from multi_agent_system.core.base_agent import BaseAgent
+from multi_agent_system.core.orchestrator import Orchestrator
+from multi_agent_system.tools.base_tool import BaseTool
+
+
+class _FakeClient:
+    """En lugar de MultiAPIClient: los agentes no llaman al modelo ni necesitan los SDKs"""
+
+    def __init__(self, provider, model, **kwargs):
+        self.provider = provider
+        self.model = model
+
+
+@pytest.fixture(autouse=True)
+def fake_client(monkeypatch):
+    monkeypatch.setattr(base_agent, "MultiAPIClient", _FakeClient)
+
+
+class _StepTool(BaseTool):
+    """Herramienta con side effects que tarda `seconds` y registra su paso"""
+
+    side_effects = True
+
+    def __init__(self, log):
+        super().__init__(name="step", description="step")
+        self.log = log
+
+    def execute(self, label: str, seconds: float = 0.2) -> str:
+        time.sleep(seconds)
+        self.log.append(label)
+        return label
+
+    def get_schema(self):
+        return {"type": "object", "properties": {}}
+
+
+class _FakeAgent(BaseAgent):
+    """
+    Sin modelo: "falla" lanza un error; cualquier otra tarea ejecuta cinco
+    pasos en una sola ronda de herramientas (se serializan por side effects).
+    """
+
+    def get_capabilities(self):
+        return []
+
+    async def achat(self, message: str) -> str:
+        if "falla" in message:
+            await asyncio.sleep(0.3)
+            raise RuntimeError("boom")
+        calls = [
+            {"id": f"call_{i}", "name": "step", "arguments": {"label": f"{message}-{i}"}}
+            for i in range(5)
+        ]
+        results = await asyncio.to_thread(self.tool_scheduler.run, calls, self._execute_tool_call)
+        return ", ".join(result["result"] for result in results)
+
+
+def _orchestrator(log):
+    orchestrator = Orchestrator(model="gpt-4o")
+    tool = _StepTool(log)
+    orchestrator.register_agent("code", _FakeAgent("Code", "gpt-4o", "s", tools=[tool]))
+    orchestrator.register_agent("research", _FakeAgent("Research", "gpt-4o", "s", tools=[tool]))
+    return orchestrator.tool_registry.get("delegate_parallel")
+
+
+def test_results_in_requested_order():
+    log = []
+    delegate = _orchestrator(log)
+
+    output = delegate.execute(tasks=[
+        {"agent_type": "code", "task": "a"},
+        {"agent_type": "research", "task": "b"},
+    ])
+
+    assert output.index("[1] code: a") < output.index("[2] research: b")
+    assert "a-0, a-1, a-2, a-3, a-4" in output
+    assert sorted(log) == [f"{label}-{i}" for label in "ab" for i in range(5)]
+
+
+def test_failure_stops_tools_of_other_subtasks():
+    log = []
+    delegate = _orchestrator(log)
+
+    output = delegate.execute(tasks=[
+        {"agent_type": "code", "task": "lento"},
+        {"agent_type": "research", "task": "falla"},
+    ])
+
+    assert output.startswith("Error: La subtarea 2 falló")
+    assert "(cancelada)" in output
+    # El paso en curso al cancelar termina; los siguientes no empiezan
+    time.sleep(1.2)
+    assert 1 <= len(log) <= 2, log
+
+
+def test_fork_does_not_share_cancel_event():
+    agent = _FakeAgent("Code", "gpt-4o", "s", tools=[_StepTool([])])
+    fork = agent.fork()
+
+    assert agent.cancel_event is None
+    assert fork.cancel_event is None
+    assert fork.context is not agent.context
+
+
+def test_close_fork_shuts_down_its_pool():
+    agent = _FakeAgent("Code", "gpt-4o", "s", tools=[_StepTool([])])
+    fork = agent.fork()
+    assert fork.tool_scheduler is not agent.tool_scheduler
+
+    fork.close_fork()
+
+    with pytest.raises(RuntimeError):
+        fork.tool_scheduler.executor.submit(time.sleep, 0)
+    agent.tool_scheduler.executor.submit(time.sleep, 0).result()
+
+
+def test_delegation_tools_have_no_timeout():
+    orchestrator = Orchestrator(model="gpt-4o")
+    scheduler = orchestrator.tool_scheduler
+
+    for name in ("delegate_to_agent", "delegate_parallel"):
+        assert scheduler.get_timeout({"name": name, "arguments": {}}) is None
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests de EditFileTool (tools/file_tools.py)
+
+Verifica ediciones en lote que cruzan el borde entre bloques, que una
+edición sin coincidencias no toca el archivo y que editar a través de un
+symlink modifica el destino y conserva el enlace.
+
+Uso: python -m pytest multi_agent_system/test_edit_file.py
+"""
+import sys
+import os
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import pytest
+
+from multi_agent_system.config.settings import Settings
+from multi_agent_system.tools.file_tools import EditFileTool
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Bloques diminutos para que casi todas las coincidencias crucen un borde
+    monkeypatch.setitem(Settings.FILE_EDIT, "chunk_size", 4)
+
+
+def test_batch_edits_across_chunk_boundaries(tmp_path, small_chunks):
+    path = tmp_path / "a.py"
+    original = "alpha = 1\nbeta = 2\nalpha_beta = alpha + beta\n" * 3
+    path.write_text(original)
+
+    edits = [
+        {"old_text": "alpha_beta", "new_text": "gamma"},
+        {"old_text": "alpha", "new_text": "a"},
+        {"old_text": "beta = 2\n", "new_text": "b = 2\n"},
+    ]
+    result = EditFileTool().execute(file_path=str(path), edits=edits)
+
+    expected = "a = 1\nb = 2\ngamma = a + beta\n" * 3
+    assert path.read_text() == expected
+    assert "12 ocurrencia(s)" in result
+    # Posiciones en el texto original
+    assert "línea 3 (offset 19)" in result
+    assert "línea 2 (offset 10)" in result
+
+
+def test_batch_edits_match_single_pass(tmp_path, small_chunks):
+    # En cada posición gana la primera edición; el texto nuevo no se re-edita
+    path = tmp_path / "a.txt"
+    path.write_text("abcabc\nxyz")
+
+    EditFileTool().execute(file_path=str(path), edits=[
+        {"old_text": "abc", "new_text": "xyz"},
+        {"old_text": "xyz", "new_text": "abc"},
+    ])
+
+    assert path.read_text() == "xyzxyz\nabc"
+
+
+def test_multiline_old_text_across_chunks(tmp_path, small_chunks):
+    path = tmp_path / "a.txt"
+    path.write_text("uno\ndos\ntres\ncuatro\n")
+
+    result = EditFileTool().execute(file_path=str(path), old_text="dos\ntres\n", new_text="")
+
+    assert path.read_text() == "uno\ncuatro\n"
+    assert "línea 2 (offset 4)" in result
+
+
+@pytest.mark.parametrize("edits", [
+    [{"old_text": "no existe", "new_text": "x"}],
+    [{"old_text": "uno", "new_text": "1"}, {"old_text": "no existe", "new_text": "x"}],
+])
+def test_no_match_leaves_file_untouched(tmp_path, small_chunks, edits):
+    path = tmp_path / "a.txt"
+    path.write_text("uno\ndos\n")
+    before = os.stat(path)
+
+    result = EditFileTool().execute(file_path=str(path), edits=edits)
+
+    assert result.startswith("Error")
+    assert path.read_text() == "uno\ndos\n"
+    assert os.stat(path).st_ino == before.st_ino
+    assert os.stat(path).st_mtime_ns == before.st_mtime_ns
+    # Sin temporales huérfanos
+    assert sorted(os.listdir(tmp_path)) == ["a.txt"]
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="sin soporte de symlinks")
+def test_edit_through_symlink_keeps_link(tmp_path):
+    real_dir = tmp_path / "real"
+    real_dir.mkdir()
+    target = real_dir / "a.txt"
+    target.write_text("uno\n")
+    os.chmod(target, 0o640)
+    link = tmp_path / "link.txt"
+    os.symlink(target, link)
+
+    result = EditFileTool().execute(file_path=str(link), old_text="uno", new_text="dos")
+
+    assert "editado exitosamente" in result
+    assert os.path.islink(link)
+    assert os.path.realpath(link) == str(target)
+    assert target.read_text() == "dos\n"
+    assert os.stat(target).st_mode & 0o777 == 0o640
+    # El temporal se crea junto al destino y no queda ninguno
+    assert sorted(os.listdir(real_dir)) == ["a.txt"]
+    assert sorted(os.listdir(tmp_path)) == ["link.txt", "real"]
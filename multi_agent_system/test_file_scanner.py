@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests del escaneo de archivos (tools/file_scanner.py)
+
+Verifica que los archivos grandes (mmap) dan las mismas coincidencias que
+los pequeños aunque tengan texto no ASCII.
+
+Uso: python -m pytest multi_agent_system/test_file_scanner.py
+"""
+import sys
+import os
+import re
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import pytest
+
+from multi_agent_system.config.settings import Settings
+from multi_agent_system.tools.file_scanner import SNIFF_BYTES, _bytes_regex, search_files
+
+
+TEXT = "función = 1\nañoß = 2\nplain = 3\nKelvin: K\nſ\n"
+
+
+@pytest.mark.parametrize("pattern,flags", [
+    (r"\w+ = \d", 0),
+    (r"\bn\b|plain", 0),
+    (r"a.o", 0),
+    (r"a[^x]o", 0),
+    (r"\S+ = 2", 0),
+    (r"k", re.IGNORECASE),
+    (r"S$", re.IGNORECASE),
+    (r"plain", 0),
+])
+def test_mmap_path_matches_decoded_path(tmp_path, monkeypatch, pattern, flags):
+    small = tmp_path / "small.txt"
+    small.write_text(TEXT, encoding="utf-8")
+    large = tmp_path / "large.txt"
+    # Relleno sin coincidencias para superar el umbral de mmap
+    large.write_text("#" * (SNIFF_BYTES * 2) + "\n" + TEXT, encoding="utf-8")
+    monkeypatch.setitem(Settings.SEARCH, "mmap_threshold", SNIFF_BYTES)
+
+    regex = re.compile(pattern, flags)
+    expected = [line.split(": ", 1)[1] for line in search_files([str(small)], regex)]
+    found = [line.split(": ", 1)[1] for line in search_files([str(large)], regex)]
+
+    assert found == expected
+    assert expected
+
+
+def test_bytes_regex_only_for_exact_patterns():
+    assert _bytes_regex(re.compile(r"def foo\(")) is not None
+    assert _bytes_regex(re.compile(r"^import (os|sys)$", re.MULTILINE)) is not None
+    for pattern in (r"\w+", r"\bfoo", r"\d", r"\s", r"a.b", r"[ab]", r"fóo"):
+        assert _bytes_regex(re.compile(pattern)) is None, pattern
+    assert _bytes_regex(re.compile("foo", re.IGNORECASE)) is None
+    assert _bytes_regex(re.compile("(?i)foo")) is None
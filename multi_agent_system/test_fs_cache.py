@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests de la caché compartida del árbol de directorios (tools/fs_cache.py)
+
+Verifica que glob y find devuelven lo mismo que un recorrido sin caché,
+sin omitir directorios, y que un listado cacheado se vuelve a leer cuando
+cambia el mtime de su directorio.
+
+Uso: python -m pytest multi_agent_system/test_fs_cache.py
+"""
+import sys
+import os
+import glob
+import time
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import pytest
+
+from multi_agent_system.tools import fs_cache
+from multi_agent_system.tools.file_tools import ListDirectoryTool
+from multi_agent_system.tools.fs_cache import DirectoryCache, iter_find, iter_glob
+from multi_agent_system.tools.search_tools import FindFileTool, GlobTool
+
+FILES = [
+    "a.py",
+    "src/b.py",
+    "images/logo.png",
+    "images/c.py",
+    "node_modules/pkg/index.py",
+    ".hidden/d.py",
+]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for relative in FILES:
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    return tmp_path
+
+
+def test_glob_matches_stdlib(tree):
+    for pattern in ("**/*.py", "*.py", "*/*.py", "**/*", "images/*"):
+        full = os.path.join(str(tree), pattern)
+        expected = sorted(f for f in glob.glob(full, recursive=True) if os.path.isfile(f))
+        assert sorted(iter_glob(full)) == expected, pattern
+
+
+def test_tools_do_not_skip_excluded_dirs(tree):
+    output = GlobTool().execute(pattern="**/*.py", path=str(tree))
+    assert os.path.join("images", "c.py") in output
+    assert os.path.join("node_modules", "pkg", "index.py") in output
+
+    output = FindFileTool().execute(filename="*.py", path=str(tree))
+    assert os.path.join("images", "c.py") in output
+    assert os.path.join("node_modules", "pkg", "index.py") in output
+
+
+def test_exclude_dirs_is_opt_in(tree):
+    found = set(iter_find(str(tree), "*.py", exclude_dirs=("node_modules",)))
+    assert str(tree / "images" / "c.py") in found
+    assert str(tree / "node_modules" / "pkg" / "index.py") not in found
+
+
+# ----------------------------------------------------------------------
+# Invalidación por mtime
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def cache(tree, monkeypatch):
+    cache = DirectoryCache()
+    monkeypatch.setattr(fs_cache, "_cache", cache)
+    # mtimes viejos: los listados no caen en la ventana de mtime reciente
+    # y solo se vuelven a leer si el mtime cambia
+    old = time.time() - 60
+    for dirpath, _, _ in os.walk(tree):
+        os.utime(dirpath, (old, old))
+    return cache
+
+
+def _restore_old_mtime(path, before):
+    # Un mtime distinto del cacheado pero también viejo: solo la comparación
+    # de mtime detecta el cambio
+    mtime = before + 1
+    os.utime(path, (mtime, mtime))
+
+
+def test_unchanged_tree_is_served_from_cache(tree, cache):
+    pattern = os.path.join(str(tree), "**", "*.py")
+    globbed = sorted(iter_glob(pattern))
+    found = sorted(iter_find(str(tree), "*.py"))
+    misses = cache.misses
+
+    assert sorted(iter_glob(pattern)) == globbed
+    assert sorted(iter_find(str(tree), "*.py")) == found
+    assert cache.misses == misses
+    assert cache.hits > 0
+
+
+def test_added_file_is_seen(tree, cache):
+    glob_tool, find_tool, ls_tool = GlobTool(), FindFileTool(), ListDirectoryTool()
+    src = tree / "src"
+    assert str(src / "new.py") not in glob_tool.execute(pattern="**/*.py", path=str(tree))
+    assert str(src / "new.py") not in find_tool.execute(filename="new.py", path=str(tree))
+    assert "[FILE] new.py" not in ls_tool.execute(directory_path=str(src))
+    misses = cache.misses
+
+    before = os.stat(src).st_mtime
+    (src / "new.py").write_text("x")
+    _restore_old_mtime(src, before)
+
+    assert str(src / "new.py") in glob_tool.execute(pattern="**/*.py", path=str(tree))
+    assert str(src / "new.py") in find_tool.execute(filename="new.py", path=str(tree))
+    assert "[FILE] new.py" in ls_tool.execute(directory_path=str(src))
+    # Solo se volvió a listar el directorio que cambió
+    assert cache.misses == misses + 1
+
+
+def test_removed_file_disappears(tree, cache):
+    glob_tool, find_tool, ls_tool = GlobTool(), FindFileTool(), ListDirectoryTool()
+    images = tree / "images"
+    assert str(images / "c.py") in glob_tool.execute(pattern="**/*.py", path=str(tree))
+    assert str(images / "c.py") in find_tool.execute(filename="c.py", path=str(tree))
+    assert "[FILE] c.py" in ls_tool.execute(directory_path=str(images))
+
+    before = os.stat(images).st_mtime
+    (images / "c.py").unlink()
+    _restore_old_mtime(images, before)
+
+    assert str(images / "c.py") not in glob_tool.execute(pattern="**/*.py", path=str(tree))
+    assert str(images / "c.py") not in find_tool.execute(filename="c.py", path=str(tree))
+    assert "[FILE] c.py" not in ls_tool.execute(directory_path=str(images))
+
+
+def test_added_directory_is_walked(tree, cache):
+    assert list(iter_find(str(tree), "e.py")) == []
+
+    before = os.stat(tree / "src").st_mtime
+    (tree / "src" / "pkg").mkdir()
+    (tree / "src" / "pkg" / "e.py").write_text("x")
+    _restore_old_mtime(tree / "src", before)
+
+    assert list(iter_find(str(tree), "e.py")) == [str(tree / "src" / "pkg" / "e.py")]
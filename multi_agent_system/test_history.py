@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Tests del historial persistente (core/context_manager.py: ConversationHistory)
+
+Verifica que una conversación restaurada empieza siempre en un mensaje del
+usuario, nunca en una respuesta del asistente ni en resultados de
+herramientas huérfanos, que el resumen de lo recortado se guarda y se
+restaura, y que la base de datos vive dentro del paquete.
+
+Uso: python -m pytest multi_agent_system/test_history.py
+"""
+import sys
+import os
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import pytest
+
+from multi_agent_system.config.settings import PACKAGE_DIR, Settings
+from multi_agent_system.core.context_manager import (
+    ContextManager, ConversationHistory, SUMMARY_HEADER, TOOL_RESULTS_HEADER
+)
+from multi_agent_system.core.summarizer import RollingSummarizer
+from multi_agent_system.core.tokenizers import HeuristicTokenizer
+
+
+def _text(label):
+    # ~100 tokens por mensaje con el tokenizer heurístico
+    return label + " " + "x" * (400 - len(label) - 1)
+
+
+def _tool_results(label):
+    return f"{TOOL_RESULTS_HEADER}\nTool: read_file\nResult: " + _text(label)
+
+
+def _save(history, turns):
+    context = ContextManager(max_tokens=1_000_000)
+    for role, content in turns:
+        context.add_message(role, content)
+    history.save_conversation(context, name="test")
+    return [content for _, content in turns]
+
+
+@pytest.fixture
+def history():
+    history = ConversationHistory(":memory:", page_size=3)
+    yield history
+    history.close()
+
+
+def test_restore_starts_at_user_turn(history):
+    contents = _save(history, [
+        ("user", _text("pregunta 1")),
+        ("assistant", _text("llamada 1")),
+        ("user", _tool_results("resultado 1")),
+        ("assistant", _text("llamada 2")),
+        ("user", _tool_results("resultado 2")),
+        ("assistant", _text("respuesta 1")),
+        ("user", _text("pregunta 2")),
+        ("assistant", _text("llamada 3")),
+        ("user", _tool_results("resultado 3")),
+        ("assistant", _text("respuesta 2")),
+    ])
+
+    # Caben ~4 mensajes: la lectura por páginas trae resultados huérfanos
+    context = history.load_conversation(0, ContextManager(max_tokens=700))
+
+    restored = [msg.content for msg in context.messages]
+    assert restored == contents[6:]
+    assert context.messages[0].is_user_turn()
+
+
+def test_restore_reads_back_to_a_user_turn(history):
+    # Un bucle de herramientas largo: el único turno del usuario queda fuera
+    # del presupuesto, pero se lee igual para no empezar en un huérfano
+    turns = [("user", _text("pregunta"))]
+    for i in range(4):
+        turns.append(("assistant", _text(f"llamada {i}")))
+        turns.append(("user", _tool_results(f"resultado {i}")))
+    contents = _save(history, turns)
+
+    context = history.load_conversation(0, ContextManager(max_tokens=1400))
+
+    assert [msg.content for msg in context.messages] == contents
+    assert context.messages[0].role == "user"
+    assert context.messages[0].is_user_turn()
+
+
+def test_restore_everything_when_it_fits(history):
+    contents = _save(history, [
+        ("user", "hola"),
+        ("assistant", "hola, ¿en qué ayudo?"),
+        ("user", "lee a.py"),
+        ("assistant", "llamo a read_file"),
+        ("user", f"{TOOL_RESULTS_HEADER}\nTool: read_file\nResult: print(1)"),
+        ("assistant", "listo"),
+    ])
+
+    context = history.load_conversation(0)
+
+    assert [msg.content for msg in context.messages] == contents
+
+
+def test_optimize_does_not_start_with_tool_results():
+    context = ContextManager(max_tokens=700)
+    for role, content in [
+        ("user", _text("pregunta 1")),
+        ("assistant", _text("llamada")),
+        ("user", _tool_results("resultado")),
+        ("assistant", _text("respuesta")),
+        ("user", _text("pregunta 2")),
+        ("assistant", _text("respuesta 2")),
+    ]:
+        context.add_message(role, content)
+
+    assert context.messages[0].is_user_turn()
+
+
+class _FakeClient:
+    """El "resumen" es el resumen previo más los mensajes nuevos"""
+
+    model = "fake"
+
+    def chat(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        previous = prompt.split("Resumen actual:\n", 1)[1].split("\n\nMensajes nuevos:", 1)[0]
+        new = prompt.split("Mensajes nuevos:\n", 1)[1]
+        return {"content": new if previous == "(vacío)" else f"{previous}\n{new}"}
+
+
+def _summarized_context():
+    return ContextManager(
+        max_tokens=700,
+        summarizer=RollingSummarizer(_FakeClient(), HeuristicTokenizer())
+    )
+
+
+def test_summary_survives_save_and_load(history):
+    context = _summarized_context()
+    for role, content in [
+        ("user", _text("pregunta 1")),
+        ("assistant", _text("respuesta 1")),
+        ("user", _text("pregunta 2")),
+        ("assistant", _text("respuesta 2")),
+        ("user", _text("pregunta 3")),
+        ("assistant", _text("respuesta 3")),
+    ]:
+        context.add_message(role, content)
+    history.save_conversation(context, name="test")
+
+    # Lo recortado solo sobrevive en el resumen
+    saved = context.summary_text
+    assert "pregunta 1" in saved
+    assert "pregunta 1" not in [msg.content for msg in context.messages]
+
+    restored = history.load_conversation(0, _summarized_context())
+
+    assert restored.summary_text == saved
+    assert restored.summarizer.summary == saved
+    assert restored.get_messages(include_system=False)[0]["content"] == f"{SUMMARY_HEADER}\n{saved}"
+    # Los mensajes ocupan lo que deja el resumen: restaurar no recorta
+    assert restored.used_tokens <= restored.max_tokens * restored.trigger_ratio
+    assert restored.messages[0].is_user_turn()
+
+    # El próximo recorte se agrega al resumen restaurado
+    restored.add_message("user", _text("pregunta 4"))
+    restored.add_message("assistant", _text("respuesta 4"))
+    assert restored.summarizer.wait(5)
+    assert restored.summary_text.startswith(saved)
+
+
+def test_summary_without_summarizer(history):
+    context = ContextManager()
+    context.restore_summary("resumen viejo")
+    context.add_message("user", "hola")
+    history.save_conversation(context)
+
+    restored = history.load_conversation(0)
+
+    assert restored.summary_text == "resumen viejo"
+    assert [msg.content for msg in restored.messages] == ["hola"]
+    restored.clear()
+    assert restored.summary is None
+
+
+def test_history_path_is_inside_package():
+    if os.getenv("HISTORY_PATH"):
+        pytest.skip("HISTORY_PATH definido en el entorno")
+    path = Settings.HISTORY["path"]
+    assert os.path.isabs(path)
+    assert os.path.dirname(os.path.dirname(path)) == PACKAGE_DIR
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests del rate limiting (core/rate_limiter.py)
+
+Verifica que las reservas de tokens se devuelven y ajustan contra lo que
+realmente se descontó, también cuando la estimación supera la capacidad.
+
+Uso: python -m pytest multi_agent_system/test_rate_limiter.py
+"""
+import sys
+import os
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import pytest
+
+from multi_agent_system.core.rate_limiter import (
+    RateLimiter, RetryPolicy, TokenBucket, call_with_retry, iter_with_retry
+)
+
+
+class _Transient(Exception):
+    status_code = 503
+
+
+def _policy():
+    return RetryPolicy(max_retries=1, base_delay=0, max_delay=0)
+
+
+def _limiter(capacity=1000):
+    limiter = RateLimiter("test", tokens_per_minute=capacity)
+    # Sin recarga durante el test
+    limiter.tokens.rate = 1e-9
+    return limiter
+
+
+def test_reserve_returns_amount_deducted():
+    bucket = TokenBucket(per_minute=100)
+
+    wait, deducted = bucket.reserve(250, now=bucket.updated)
+
+    assert deducted == 100
+    assert wait == 0
+    bucket.refund(deducted, now=bucket.updated)
+    assert bucket.level == 100
+
+
+def test_oversized_failure_refunds_what_was_deducted():
+    limiter = _limiter(capacity=1000)
+
+    def call():
+        # Otra llamada concurrente reserva mientras esta está en curso
+        limiter.tokens.reserve(300, limiter.tokens.updated)
+        raise _Transient("overloaded")
+
+    with pytest.raises(_Transient):
+        call_with_retry(call, limiter, tokens=5000, policy=RetryPolicy(max_retries=0))
+
+    # Solo se devuelve lo descontado: la reserva ajena sigue en pie
+    assert limiter.tokens.level == pytest.approx(700)
+
+
+def test_usage_adjusts_against_reserved_amount():
+    limiter = _limiter(capacity=1000)
+
+    result = call_with_retry(
+        lambda: {"used": 300}, limiter, tokens=5000, policy=_policy(),
+        usage=lambda response: response["used"]
+    )
+
+    assert result == {"used": 300}
+    assert limiter.tokens.level == pytest.approx(700)
+
+
+def test_stream_usage_from_final_event():
+    limiter = _limiter(capacity=1000)
+
+    def events():
+        yield {"type": "text", "used": None}
+        yield {"type": "stop", "used": 200}
+
+    consumed = list(iter_with_retry(
+        events, limiter, tokens=400, policy=_policy(), usage=lambda event: event["used"]
+    ))
+
+    assert len(consumed) == 2
+    assert limiter.tokens.level == pytest.approx(800)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests de ReadFileTool (tools/file_tools.py, tools/line_index.py)
+
+Verifica las lecturas por rango de líneas (offset/limit) al principio, en
+medio y al final del archivo, el corte en max_bytes y que el índice de
+líneas se reutiliza mientras el archivo no cambia y se reconstruye cuando
+cambia.
+
+Uso: python -m pytest multi_agent_system/test_read_file.py
+"""
+import sys
+import os
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import pytest
+
+from multi_agent_system.config.settings import Settings
+from multi_agent_system.tools import line_index
+from multi_agent_system.tools.file_tools import ReadFileTool
+from multi_agent_system.tools.line_index import get_line_index
+
+
+def _lines(count, start=1):
+    return "".join(f"line {i}\n" for i in range(start, start + count))
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes(monkeypatch):
+    monkeypatch.setattr(line_index, "_INDEXES", line_index.OrderedDict())
+
+
+@pytest.fixture(params=[False, True], ids=["read", "mmap"])
+def ten_lines(request, tmp_path, monkeypatch):
+    if request.param:
+        monkeypatch.setitem(Settings.FILE_READ, "mmap_threshold", 0)
+    path = tmp_path / "a.txt"
+    path.write_text(_lines(10))
+    return str(path)
+
+
+def _read(path, **kwargs):
+    return ReadFileTool().execute(file_path=path, **kwargs)
+
+
+def test_whole_file(ten_lines):
+    assert _read(ten_lines) == f"Contenido de {ten_lines}:\n\n{_lines(10)}"
+
+
+def test_range_in_the_middle(ten_lines):
+    result = _read(ten_lines, offset=3, limit=2)
+
+    assert result.startswith(f"Contenido de {ten_lines} (líneas 3-4 de 10):\n\nline 3\nline 4\n")
+    assert result.endswith("[Rango parcial: quedan 6 líneas; usa offset=5 para continuar]")
+
+
+def test_limit_past_the_end(ten_lines):
+    result = _read(ten_lines, offset=9, limit=5)
+
+    assert result == f"Contenido de {ten_lines} (líneas 9-10 de 10):\n\nline 9\nline 10\n"
+
+
+def test_last_line_without_newline(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("uno\ndos\ntres")
+
+    result = _read(str(path), offset=3)
+
+    assert result == f"Contenido de {path} (líneas 3-3 de 3):\n\ntres"
+
+
+def test_offset_past_the_end(ten_lines):
+    assert _read(ten_lines, offset=11) == f"Error: El archivo '{ten_lines}' tiene 10 líneas (offset=11)"
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_text("")
+
+    assert _read(str(path)) == f"Contenido de {path}:\n\n"
+
+
+def test_byte_cap_cuts_at_last_whole_line(ten_lines, monkeypatch):
+    # "line 1\n" y "line 2\n" ocupan 14 bytes; la tercera ya no entra
+    monkeypatch.setitem(Settings.FILE_READ, "max_bytes", 20)
+
+    result = _read(ten_lines)
+
+    assert result.startswith(f"Contenido de {ten_lines} (líneas 1-2 de 10):\n\nline 1\nline 2\n\n\n")
+    assert result.endswith("[Truncado: quedan 8 líneas; usa offset=3 para continuar]")
+
+
+def test_byte_cap_inside_a_range(ten_lines, monkeypatch):
+    monkeypatch.setitem(Settings.FILE_READ, "max_bytes", 20)
+
+    result = _read(ten_lines, offset=9, limit=2)
+
+    # El rango entra completo: no se trunca
+    assert result == f"Contenido de {ten_lines} (líneas 9-10 de 10):\n\nline 9\nline 10\n"
+
+
+def test_byte_cap_cuts_a_long_line(ten_lines, monkeypatch):
+    monkeypatch.setitem(Settings.FILE_READ, "max_bytes", 4)
+
+    result = _read(ten_lines, offset=2)
+
+    assert result.startswith(f"Contenido de {ten_lines} (líneas 2-2 de 10):\n\nline\n\n")
+    assert "la línea 2 se cortó en 4 bytes" in result
+    assert "usa offset=3 para continuar" in result
+
+
+def test_index_reused_while_unchanged(ten_lines):
+    _read(ten_lines, offset=2, limit=1)
+    index = get_line_index(ten_lines)
+
+    _read(ten_lines, offset=5, limit=1)
+
+    assert get_line_index(ten_lines) is index
+
+
+def test_index_rebuilt_after_append(ten_lines):
+    _read(ten_lines)
+    index = get_line_index(ten_lines)
+
+    with open(ten_lines, "a") as f:
+        f.write(_lines(2, start=11))
+
+    result = _read(ten_lines, offset=11)
+
+    assert result == f"Contenido de {ten_lines} (líneas 11-12 de 12):\n\nline 11\nline 12\n"
+    assert get_line_index(ten_lines) is not index
+
+
+def test_index_rebuilt_after_same_size_rewrite(ten_lines):
+    _read(ten_lines, offset=2, limit=1)
+    # Mismo tamaño y cantidad de líneas, pero los saltos en otro lugar
+    with open(ten_lines, "w") as f:
+        f.write(_lines(10).replace("line 1\n", "line 1 ").replace("line 5", "li\ne 5"))
+    st = os.stat(ten_lines)
+    os.utime(ten_lines, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    result = _read(ten_lines, offset=4, limit=2)
+
+    assert result.startswith(f"Contenido de {ten_lines} (líneas 4-5 de 10):\n\nli\ne 5\n\n\n")
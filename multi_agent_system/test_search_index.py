@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Tests del índice de trigramas (tools/search_index.py)
+
+Verifica los trigramas que se extraen de una regex y que el índice nunca
+descarta un archivo que un escaneo completo encontraría.
+
+Uso: python -m pytest multi_agent_system/test_search_index.py
+"""
+import sys
+import os
+import re
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import pytest
+
+from multi_agent_system.config.settings import Settings
+from multi_agent_system.tools import search_index
+from multi_agent_system.tools.file_scanner import search_files, walk_files
+from multi_agent_system.tools.search_index import get_search_index, required_trigrams, trigrams
+
+
+# ----------------------------------------------------------------------
+# required_trigrams
+# ----------------------------------------------------------------------
+
+def test_literal():
+    assert required_trigrams("hello") == {"hel", "ell", "llo"}
+    assert required_trigrams("ab") == set()
+
+
+def test_casefold():
+    assert required_trigrams("HeLLo") == required_trigrams("hello")
+    assert required_trigrams("Straße") == trigrams("strasse")
+
+
+def test_alternation_is_not_required():
+    assert required_trigrams("foo|bar") == set()
+    # Solo lo que rodea a la alternativa es obligatorio
+    assert required_trigrams("abc(def|ghi)jkl") == {"abc", "jkl"}
+
+
+def test_repeats():
+    # Al menos una vez: su contenido es obligatorio, pero no cruza el borde
+    assert required_trigrams("ab(cde)+fg") == {"cde"}
+    assert required_trigrams("x(abc)*y") == set()
+    assert required_trigrams("abc?d") == set()
+    assert required_trigrams("x{0,2}abcd") == {"abc", "bcd"}
+    assert required_trigrams("(abc){2,}") == {"abc"}
+
+
+def test_groups_continue_the_sequence():
+    assert required_trigrams("(abc)(def)") == trigrams("abcdef")
+    assert required_trigrams("(?:ab)c") == {"abc"}
+    assert required_trigrams(r"^abc\b") == {"abc"}
+
+
+def test_classes_cut_the_sequence():
+    assert required_trigrams("a.bcd") == {"bcd"}
+    assert required_trigrams(r"ab\wcd") == set()
+    assert required_trigrams("ab[xy]cde") == {"cde"}
+
+
+def test_invalid_regex():
+    assert required_trigrams("(abc") == set()
+
+
+# ----------------------------------------------------------------------
+# Índice
+# ----------------------------------------------------------------------
+
+FILES = {
+    "a.py": "def hello_world():\n    return 'Hello'\n",
+    "b.txt": "Straße und STRASSE\nfoo bar baz\n",
+    "sub/c.py": "class Foo:\n    pass\nabcabc\n",
+    "sub/deep/d.md": "año nuevo\n\tHELLO again\n",
+    ".hidden/e.py": "hello hidden\n",
+}
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    for relative, text in FILES.items():
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    # UTF-8 inválido, binario y un archivo demasiado grande para indexar
+    (tmp_path / "invalid.txt").write_bytes(b"hel\xfflo world\n")
+    (tmp_path / "binary.bin").write_bytes(b"hello\0world")
+    (tmp_path / "big.txt").write_text("x" * 200 + "\nneedle in big\n")
+
+    monkeypatch.setitem(Settings.SEARCH, "workspace_root", str(tmp_path))
+    monkeypatch.setitem(Settings.SEARCH, "max_indexed_file_size", 100)
+    monkeypatch.setitem(Settings.SEARCH, "index", True)
+    monkeypatch.setattr(search_index, "_INDEXES", {})
+    return tmp_path
+
+
+def _ready_index(path):
+    index = get_search_index(str(path))
+    assert index is not None
+    assert index.ready.wait(10)
+    return index
+
+
+PATTERNS = [
+    ("hello", 0),
+    ("hello", re.IGNORECASE),
+    ("straße", re.IGNORECASE),
+    ("STRASSE", 0),
+    ("class \\w+:", 0),
+    ("(abc)+", 0),
+    ("foo|needle", 0),
+    ("needle", 0),
+    ("año", 0),
+    ("hel�lo", 0),
+    ("^\\s+HELLO", 0),
+    ("nothing here", 0),
+]
+
+
+@pytest.mark.parametrize("pattern,flags", PATTERNS)
+def test_candidates_never_miss_matches(workspace, pattern, flags):
+    index = _ready_index(workspace)
+    regex = re.compile(pattern, flags)
+
+    all_files = [path for path, _ in walk_files(str(workspace))]
+    candidates = index.candidates(str(workspace), "*", pattern)
+
+    assert set(candidates) <= set(all_files)
+    assert search_files(candidates, regex, 1000) == search_files(all_files, regex, 1000)
+
+
+def test_candidates_filter_files(workspace):
+    index = _ready_index(workspace)
+
+    candidates = index.candidates(str(workspace), "*", "class Foo")
+
+    assert str(workspace / "sub" / "c.py") in candidates
+    assert str(workspace / "a.py") not in candidates
+    assert str(workspace / "binary.bin") not in candidates
+    # Demasiado grande para indexar: siempre candidato
+    assert str(workspace / "big.txt") in candidates
+
+
+def test_changed_file_is_always_a_candidate(workspace):
+    index = _ready_index(workspace)
+    path = workspace / "a.py"
+    path.write_text("zebra crossing\n")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert str(path) in index.candidates(str(workspace), "*", "zebra")
+
+
+def test_index_covers_only_the_workspace(workspace):
+    index = _ready_index(workspace)
+
+    assert index.root == str(workspace)
+    assert get_search_index(str(workspace / "sub")) is index
+    assert get_search_index(str(workspace.parent)) is None
+    assert get_search_index(os.sep) is None
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests de las sesiones de shell persistentes (tools/shell_session.py, bash_tool.py)
+
+Verifica que la limpieza del pool nunca cierra una sesión en uso y que un
+fork del agente tiene su propia sesión.
+
+Uso: python -m pytest multi_agent_system/test_shell_session.py
+"""
+import sys
+import os
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import pytest
+
+from multi_agent_system.config.settings import Settings
+from multi_agent_system.core import base_agent
+from multi_agent_system.core.base_agent import BaseAgent
+from multi_agent_system.tools import shell_session
+from multi_agent_system.tools.bash_tool import BashTool
+from multi_agent_system.tools.file_tools import ReadFileTool
+from multi_agent_system.tools.shell_session import (
+    acquire_session, close_session, persistent_shell_available, release_session
+)
+
+pytestmark = pytest.mark.skipif(not persistent_shell_available(), reason="requiere bash")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(shell_session, "_SESSIONS", {})
+    yield shell_session._SESSIONS
+    shell_session._close_all()
+
+
+def test_sweep_skips_sessions_in_use(pool, monkeypatch):
+    monkeypatch.setitem(Settings.BASH, "idle_timeout", 0)
+    busy = acquire_session("busy")
+
+    # Otra adquisición barre las inactivas: "busy" sigue en uso
+    acquire_session("other")
+    assert pool.get("busy") is busy
+    assert busy.alive
+
+    release_session(busy)
+    release_session(pool["other"])
+    acquire_session("third")
+    assert "busy" not in pool
+    assert not busy.alive
+
+
+def test_max_sessions_skips_sessions_in_use(pool, monkeypatch):
+    monkeypatch.setitem(Settings.BASH, "max_sessions", 1)
+    busy = acquire_session("busy")
+
+    acquire_session("other")
+
+    assert pool.get("busy") is busy and busy.alive
+
+
+def test_release_after_close_is_harmless(pool):
+    session = acquire_session("a")
+    close_session("a")
+    release_session(session)
+    assert "a" not in pool
+
+
+class _Agent(BaseAgent):
+    def get_capabilities(self):
+        return []
+
+
+class _FakeClient:
+    """En lugar de MultiAPIClient: el agente no llama al modelo ni necesita los SDKs"""
+
+    def __init__(self, provider, model, **kwargs):
+        self.provider = provider
+        self.model = model
+
+
+def test_fork_gets_its_own_bash_session(pool, tmp_path, monkeypatch):
+    monkeypatch.setattr(base_agent, "MultiAPIClient", _FakeClient)
+    read_file = ReadFileTool()
+    agent = _Agent("Code", "gpt-4o", "s", tools=[BashTool(), read_file])
+    fork = agent.fork()
+
+    parent_bash = agent.tool_registry.get("bash")
+    fork_bash = fork.tool_registry.get("bash")
+    assert fork_bash is not parent_bash
+    assert fork_bash.session_id != parent_bash.session_id
+    # Las herramientas sin estado y la caché de resultados se comparten
+    assert fork.tool_registry.get("read_file") is read_file
+    assert fork.tool_registry.result_cache is agent.tool_registry.result_cache
+    assert agent.tool_registry.get("bash") is parent_bash
+
+    parent_bash.execute(command="cd /")
+    fork_bash.execute(command=f"cd {tmp_path}")
+    assert "STDOUT:\n/\n" in parent_bash.execute(command="pwd")
+    assert str(tmp_path) in fork_bash.execute(command="pwd")
+
+    fork.close_fork()
+    assert fork_bash.session_id not in pool
+    assert parent_bash.session_id in pool
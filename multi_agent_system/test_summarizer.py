@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests del resumen incremental (core/summarizer.py)
+
+Verifica que los mensajes de una pasada fallida no se pierden: se resumen
+con el próximo recorte, antes que los mensajes nuevos.
+
+Uso: python -m pytest multi_agent_system/test_summarizer.py
+"""
+import sys
+import os
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from multi_agent_system.core.context_manager import Message
+from multi_agent_system.core.summarizer import RollingSummarizer
+from multi_agent_system.core.tokenizers import HeuristicTokenizer
+
+
+class _FakeClient:
+    """Falla las primeras `failures` llamadas; después devuelve el prompt"""
+
+    def __init__(self, failures):
+        self.model = "fake"
+        self.failures = failures
+        self.prompts = []
+
+    def chat(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("overloaded")
+        return {"content": prompt.split("Mensajes nuevos:\n", 1)[1]}
+
+
+def _messages(*texts):
+    return [Message(role="user", content=text) for text in texts]
+
+
+def test_failed_batch_is_kept_for_next_trigger():
+    client = _FakeClient(failures=1)
+    summarizer = RollingSummarizer(client, HeuristicTokenizer())
+
+    summarizer.add(_messages("tramo uno"))
+    assert summarizer.wait(5)
+    assert summarizer.summary == ""
+
+    summarizer.add(_messages("tramo dos"))
+    assert summarizer.wait(5)
+
+    # La segunda pasada incluye el tramo fallido, en orden
+    assert "tramo uno" in summarizer.summary
+    assert summarizer.summary.index("tramo uno") < summarizer.summary.index("tramo dos")
+    assert len(client.prompts) == 2
+
+
+def test_reset_discards_failed_batch():
+    client = _FakeClient(failures=1)
+    summarizer = RollingSummarizer(client, HeuristicTokenizer())
+
+    summarizer.add(_messages("viejo"))
+    assert summarizer.wait(5)
+    summarizer.reset()
+    summarizer.add(_messages("nuevo"))
+    assert summarizer.wait(5)
+
+    assert "nuevo" in summarizer.summary
+    assert "viejo" not in summarizer.summary
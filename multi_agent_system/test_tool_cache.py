@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests de la caché de resultados de herramientas (tools/result_cache.py)
+
+Verifica que un cambio externo en un archivo invalida el resultado cacheado
+y que las búsquedas sobre un árbol nunca devuelven resultados viejos.
+
+Uso: python -m pytest multi_agent_system/test_tool_cache.py
+"""
+import sys
+import os
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from multi_agent_system.tools.base_tool import ToolRegistry
+from multi_agent_system.tools.file_tools import ReadFileTool, WriteFileTool, ListDirectoryTool
+from multi_agent_system.tools.search_tools import GrepTool
+
+
+def _registry(*tools):
+    registry = ToolRegistry()
+    for tool in tools:
+        registry.register(tool)
+    assert registry.result_cache is not None, "TOOL_CACHE desactivada"
+    return registry
+
+
+def _bump_mtime(path):
+    # Garantiza un mtime distinto aunque el sistema de archivos tenga poca resolución
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_read_file_hit_then_miss_after_external_edit(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("uno\n")
+    registry = _registry(ReadFileTool())
+
+    first = registry.execute("read_file", file_path=str(path))
+    second = registry.execute("read_file", file_path=str(path))
+    assert second == first
+    stats = registry.get_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+    # Edición fuera del registro (otro proceso, el usuario...)
+    path.write_text("dos\n")
+    _bump_mtime(path)
+
+    third = registry.execute("read_file", file_path=str(path))
+    assert "dos" in third and "uno" not in third
+    assert registry.get_cache_stats()["misses"] == 2
+
+
+def test_read_file_same_size_edit_is_a_miss(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("aaaa\n")
+    registry = _registry(ReadFileTool())
+
+    registry.execute("read_file", file_path=str(path))
+    path.write_text("bbbb\n")
+    _bump_mtime(path)
+
+    assert "bbbb" in registry.execute("read_file", file_path=str(path))
+
+
+def test_write_file_invalidates_read(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("uno\n")
+    registry = _registry(ReadFileTool(), WriteFileTool())
+
+    registry.execute("read_file", file_path=str(path))
+    registry.execute("write_file", file_path=str(path), content="dos\n")
+
+    assert "dos" in registry.execute("read_file", file_path=str(path))
+    assert registry.get_cache_stats()["invalidations"] >= 1
+
+
+def test_grep_sees_edit_in_subdirectory(tmp_path):
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    target = sub / "a.py"
+    target.write_text("foo = 1\n")
+    registry = _registry(GrepTool())
+
+    assert "a.py" not in registry.execute("grep", pattern="bar", path=str(tmp_path))
+
+    # El mtime de la raíz no cambia al editar un archivo de un subdirectorio
+    target.write_text("bar = 1\n")
+
+    assert "a.py" in registry.execute("grep", pattern="bar", path=str(tmp_path))
+
+
+def test_list_directory_sees_new_file(tmp_path):
+    (tmp_path / "viejo.txt").write_text("x\n")
+    registry = _registry(ListDirectoryTool())
+
+    registry.execute("list_directory", directory_path=str(tmp_path))
+    (tmp_path / "nuevo.txt").write_text("x\n")
+
+    assert "nuevo.txt" in registry.execute("list_directory", directory_path=str(tmp_path))
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Tests del planificador de herramientas (core/tool_scheduler.py)
+
+Verifica que las lecturas corren en paralelo, que las herramientas con
+side_effects actúan como barrera, los timeouts por llamada y que los
+resultados salen en el orden de las llamadas.
+
+Uso: python -m pytest multi_agent_system/test_tool_scheduler.py
+"""
+import sys
+import os
+import time
+
+# Fix para imports - agregar directorio padre al path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import pytest
+
+from multi_agent_system.core.tool_scheduler import ToolScheduler
+from multi_agent_system.tools.base_tool import DEFAULT_TIMEOUT, BaseTool, ToolRegistry
+
+
+class _SleepTool(BaseTool):
+    """Duerme `seconds` y registra cuándo empezó y terminó"""
+
+    def __init__(self, name, log, side_effects=False, timeout=DEFAULT_TIMEOUT):
+        super().__init__(name=name, description=name)
+        self.side_effects = side_effects
+        self.timeout = timeout
+        self._log = log
+
+    def execute(self, label: str, seconds: float = 0.0) -> str:
+        self._log.append(("start", label, time.monotonic()))
+        time.sleep(seconds)
+        self._log.append(("end", label, time.monotonic()))
+        return f"{self.name}:{label}"
+
+    def get_schema(self):
+        return {"type": "object", "properties": {}}
+
+
+@pytest.fixture
+def log():
+    return []
+
+
+@pytest.fixture
+def scheduler(log):
+    registry = ToolRegistry()
+    registry.result_cache = None
+    registry.register(_SleepTool("read", log))
+    registry.register(_SleepTool("write", log, side_effects=True))
+    registry.register(_SleepTool("slow", log, timeout=0.2))
+    scheduler = ToolScheduler(registry, max_workers=4, default_timeout=5)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def _call(number, name, label, seconds=0.0):
+    return {"id": f"call_{number}", "name": name, "arguments": {"label": label, "seconds": seconds}}
+
+
+def _execute(scheduler):
+    def execute(tool_call):
+        result = scheduler.tool_registry.execute(tool_call["name"], **tool_call["arguments"])
+        return {"tool_call_id": tool_call["id"], "tool_name": tool_call["name"], "result": result}
+    return execute
+
+
+def _times(log, label):
+    start = next(t for kind, name, t in log if kind == "start" and name == label)
+    end = next(t for kind, name, t in log if kind == "end" and name == label)
+    return start, end
+
+
+def test_results_keep_call_order(scheduler):
+    # La primera llamada es la más lenta: igual sale primera
+    calls = [_call(i, "read", f"r{i}", seconds=0.05 * (4 - i)) for i in range(4)]
+
+    results = scheduler.run(calls, _execute(scheduler))
+
+    assert [r["tool_call_id"] for r in results] == [c["id"] for c in calls]
+    assert [r["result"] for r in results] == [f"read:r{i}" for i in range(4)]
+
+
+def test_reads_run_in_parallel(scheduler):
+    calls = [_call(i, "read", f"r{i}", seconds=0.2) for i in range(4)]
+
+    started = time.monotonic()
+    scheduler.run(calls, _execute(scheduler))
+
+    assert time.monotonic() - started < 0.6
+
+
+def test_side_effects_are_a_barrier(scheduler, log):
+    calls = [
+        _call(0, "read", "r0", seconds=0.15),
+        _call(1, "read", "r1", seconds=0.1),
+        _call(2, "write", "w2", seconds=0.1),
+        _call(3, "read", "r3"),
+        _call(4, "write", "w4"),
+    ]
+
+    results = scheduler.run(calls, _execute(scheduler))
+
+    assert [r["result"] for r in results] == ["read:r0", "read:r1", "write:w2", "read:r3", "write:w4"]
+    w2_start, w2_end = _times(log, "w2")
+    # La escritura espera a todas las lecturas anteriores...
+    assert w2_start >= _times(log, "r0")[1]
+    assert w2_start >= _times(log, "r1")[1]
+    # ...y las llamadas siguientes esperan a que termine
+    assert _times(log, "r3")[0] >= w2_end
+    assert _times(log, "w4")[0] >= _times(log, "r3")[1]
+
+
+def test_per_call_timeout(scheduler):
+    calls = [
+        _call(0, "slow", "s0", seconds=1.0),
+        _call(1, "read", "r1", seconds=0.3),
+    ]
+
+    started = time.monotonic()
+    results = scheduler.run(calls, _execute(scheduler))
+    elapsed = time.monotonic() - started
+
+    # Solo vence la herramienta con timeout propio; la otra usa el default
+    assert results[0]["tool_call_id"] == "call_0"
+    assert "timeout de 0.2 segundos" in results[0]["result"]
+    assert results[1]["result"] == "read:r1"
+    assert elapsed < 0.9
+
+
+def test_timeout_counts_from_start(log):
+    # Con un solo hilo, la segunda llamada espera en cola más que su timeout
+    registry = ToolRegistry()
+    registry.result_cache = None
+    registry.register(_SleepTool("slow", log, timeout=0.5))
+    scheduler = ToolScheduler(registry, max_workers=1, default_timeout=5)
+    try:
+        calls = [_call(0, "slow", "s0", seconds=0.3), _call(1, "slow", "s1", seconds=0.3)]
+        results = scheduler.run(calls, _execute(scheduler))
+    finally:
+        scheduler.shutdown()
+
+    assert [r["result"] for r in results] == ["slow:s0", "slow:s1"]
+
+
+def test_no_timeout_waits_past_default(log):
+    registry = ToolRegistry()
+    registry.result_cache = None
+    registry.register(_SleepTool("delegate", log, side_effects=True, timeout=None))
+    registry.register(_SleepTool("read", log))
+    scheduler = ToolScheduler(registry, max_workers=2, default_timeout=0.2)
+    try:
+        assert scheduler.get_timeout(_call(0, "delegate", "d0")) is None
+        batch = scheduler.batch(_execute(scheduler))
+        batch.submit(_call(0, "delegate", "d0", seconds=0.5))
+        time.sleep(0.3)
+        assert not batch.done()
+        # La lectura siguiente espera a que la barrera termine de verdad
+        batch.submit(_call(1, "read", "r1"))
+        results = batch.results()
+    finally:
+        scheduler.shutdown()
+
+    assert [r["result"] for r in results] == ["delegate:d0", "read:r1"]
+    assert _times(log, "r1")[0] >= _times(log, "d0")[1]
+
+
+def test_execute_errors_become_results(scheduler):
+    def execute(tool_call):
+        if tool_call["id"] == "call_1":
+            raise RuntimeError("boom")
+        return _execute(scheduler)(tool_call)
+
+    calls = [_call(0, "read", "r0"), _call(1, "read", "r1"), _call(2, "read", "r2")]
+    results = scheduler.run(calls, execute)
+
+    assert results[0]["result"] == "read:r0"
+    assert results[1] == {"tool_call_id": "call_1", "tool_name": "read", "result": "Error: boom"}
+    assert results[2]["result"] == "read:r2"
+
+
+def test_streaming_batch(scheduler):
+    # Las llamadas se envían a medida que llegan; la primera ya corre
+    batch = scheduler.batch(_execute(scheduler))
+    batch.submit(_call(0, "read", "r0", seconds=0.2))
+    assert not batch.done()
+    batch.submit(_call(1, "read", "r1"))
+
+    assert [r["result"] for r in batch.results()] == ["read:r0", "read:r1"]
+    assert batch.done()
@@ -1,13 +1,37 @@
 """
 Clase base para herramientas (tools)
 """
-from typing import Dict, Any, Callable, Optional
+from typing import Dict, Any, Callable, List, Optional
 from abc import ABC, abstractmethod
+from ..config.settings import Settings
+from ..core.tracing import TOOL, get_tracer
+from .result_cache import ToolResultCache
+
+# Valor de BaseTool.timeout que usa el default de Settings.TOOL_EXECUTION
+DEFAULT_TIMEOUT = -1.0
 
 
 class BaseTool(ABC):
     """Clase base para todas las herramientas"""
 
+    # True si la herramienta modifica archivos o el sistema: el planificador
+    # no la ejecuta en paralelo con otras llamadas del mismo turno
+    side_effects: bool = False
+
+    # Segundos máximos por llamada (DEFAULT_TIMEOUT = Settings.TOOL_EXECUTION,
+    # None = sin límite: el planificador espera lo que tarde)
+    timeout: Optional[float] = DEFAULT_TIMEOUT
+
+    # True si execute() acepta on_output(stream, línea) para reportar
+    # progreso mientras corre (ver BaseAgent.stream)
+    streams_output: bool = False
+
+    # True si el resultado depende solo de los argumentos y de los archivos
+    # de get_dependencies(): ToolRegistry lo cachea (ver result_cache.py).
+    # Esas rutas se deben conocer antes de ejecutar: una búsqueda sobre un
+    # árbol depende de cada archivo y subdirectorio, no solo de la raíz
+    cacheable: bool = False
+
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
@@ -32,6 +56,34 @@ class BaseTool(ABC):
         """
         pass
 
+    def get_timeout(self, arguments: Dict[str, Any]) -> Optional[float]:
+        """Timeout de una llamada concreta (por defecto, self.timeout)"""
+        return self.timeout
+
+    def get_dependencies(self, arguments: Dict[str, Any]) -> List[str]:
+        """Archivos o directorios que lee una llamada (herramientas cacheables)"""
+        return []
+
+    def get_touched_paths(self, arguments: Dict[str, Any]) -> Optional[List[str]]:
+        """
+        Rutas que modifica una llamada (herramientas con side_effects).
+
+        None (el default) significa que puede tocar cualquier cosa: se
+        invalida toda la caché de resultados.
+        """
+        return None
+
+    def fork(self) -> "BaseTool":
+        """
+        Instancia para un fork del agente (BaseAgent.fork). Por defecto la
+        misma: solo se copian las herramientas con estado por agente.
+        """
+        return self
+
+    def close(self):
+        """Libera los recursos propios de la herramienta (por defecto ninguno)"""
+        pass
+
     def to_anthropic_format(self) -> Dict[str, Any]:
         """Convierte la herramienta a formato Anthropic"""
         schema = self.get_schema()
@@ -67,10 +119,17 @@ class ToolRegistry:
 
     def __init__(self):
         self._tools: Dict[str, BaseTool] = {}
+        self._schemas: Dict[str, list] = {}  # format -> schemas
+
+        config = Settings.TOOL_CACHE
+        self.result_cache: Optional[ToolResultCache] = None
+        if config["enabled"]:
+            self.result_cache = ToolResultCache(config["max_entries"], config["ttl_seconds"])
 
     def register(self, tool: BaseTool):
         """Registra una herramienta"""
         self._tools[tool.name] = tool
+        self._schemas.clear()
 
     def get(self, name: str) -> Optional[BaseTool]:
         """Obtiene una herramienta por nombre"""
@@ -84,26 +143,81 @@ class ToolRegistry:
         """
         Obtiene los schemas de todas las herramientas.
 
+        Se generan una vez por formato y se reutilizan hasta el próximo
+        register(); la lista devuelta es de solo lectura.
+
         Args:
             format: "anthropic" o "openai"
 
         Returns:
             Lista de schemas
         """
+        schemas = self._schemas.get(format)
+        if schemas is not None:
+            return schemas
+
         schemas = []
         for tool in self._tools.values():
             if format == "anthropic":
                 schemas.append(tool.to_anthropic_format())
             elif format == "openai":
                 schemas.append(tool.to_openai_format())
+        self._schemas[format] = schemas
         return schemas
 
     def execute(self, name: str, **kwargs) -> Any:
-        """Ejecuta una herramienta por nombre"""
+        """
+        Ejecuta una herramienta por nombre.
+
+        Los resultados de las herramientas cacheables se reutilizan mientras
+        no cambien sus dependencias; las herramientas con side_effects
+        invalidan los resultados afectados. Cada llamada se registra como
+        un span (ver core/tracing.py).
+        """
         tool = self.get(name)
         if not tool:
             raise ValueError(f"Tool '{name}' no encontrada")
-        return tool.execute(**kwargs)
+
+        args_chars = sum(len(str(value)) for value in kwargs.values() if not callable(value))
+        with get_tracer().span(f"tool {name}", TOOL, tool=name, args_chars=args_chars) as span:
+            result = self._execute(tool, name, kwargs, span)
+            if isinstance(result, str):
+                span.set_attribute("result_chars", len(result))
+                if result.startswith("Error"):
+                    span.set_error(result.split("\n", 1)[0][:200])
+            return result
+
+    def _execute(self, tool: BaseTool, name: str, kwargs: Dict[str, Any], span) -> Any:
+        """Ejecuta una herramienta a través de la caché de resultados"""
+        cache = self.result_cache
+        if cache is None:
+            return tool.execute(**kwargs)
+
+        if tool.side_effects:
+            try:
+                return tool.execute(**kwargs)
+            finally:
+                cache.invalidate(tool.get_touched_paths(kwargs))
+
+        key = cache.make_key(name, kwargs) if tool.cacheable else None
+        if key is None:
+            return tool.execute(**kwargs)
+
+        hit, result = cache.get(key)
+        span.set_attribute("cache_hit", hit)
+        if hit:
+            return result
+
+        snapshot = cache.snapshot(tool.get_dependencies(kwargs))
+        result = tool.execute(**kwargs)
+        # Los errores (archivo inexistente, regex inválida...) no se cachean
+        if not (isinstance(result, str) and result.startswith("Error")):
+            cache.set(key, result, snapshot)
+        return result
+
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Estadísticas de la caché de resultados (None si está desactivada)"""
+        return self.result_cache.get_stats() if self.result_cache else None
 
 
 # Registro global de herramientas
@@ -1,57 +1,105 @@
 """
 Herramienta para ejecutar comandos bash
 """
-import subprocess
-from typing import Dict, Any
+import copy
+import uuid
+from typing import Dict, Any, Optional
 from .base_tool import BaseTool
+from ..config.settings import Settings
+from .shell_session import (
+    OutputCallback, acquire_session, close_session, persistent_shell_available,
+    release_session, run_oneshot
+)
 
 
 class BashTool(BaseTool):
-    """Herramienta para ejecutar comandos bash"""
+    """
+    Herramienta para ejecutar comandos bash.
+
+    Cada instancia (un agente, o un fork de un agente) usa su propia sesión
+    de shell persistente: cd, variables y funciones se conservan entre
+    comandos. Sin bash (ej:
+    Windows) o con Settings.BASH["persistent"] desactivado, cada comando
+    corre en un proceso nuevo. En ambos casos la salida se lee a medida que
+    llega y solo se conserva el final de cada stream.
+    """
+
+    side_effects = True
+    streams_output = True
 
     def __init__(self):
         super().__init__(
             name="bash",
-            description="Ejecuta un comando bash en el sistema. Retorna stdout y stderr."
+            description=(
+                "Ejecuta un comando bash en el sistema. Retorna stdout y stderr. "
+                "La sesión es persistente: cd y variables exportadas se conservan entre comandos."
+            )
         )
+        self.session_id = uuid.uuid4().hex
 
-    def execute(self, command: str, timeout: int = 30, cwd: str = None) -> str:
+    def execute(
+        self,
+        command: str,
+        timeout: int = 30,
+        cwd: str = None,
+        on_output: Optional[OutputCallback] = None
+    ) -> str:
         """
         Ejecuta un comando bash.
 
         Args:
             command: Comando a ejecutar
             timeout: Tiempo máximo de ejecución en segundos
-            cwd: Directorio de trabajo (opcional)
+            cwd: Directorio de trabajo solo para este comando (opcional)
+            on_output: Callback (stream, línea) para seguir la salida en vivo
 
         Returns:
             Output del comando
         """
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                cwd=cwd
-            )
+            max_bytes = Settings.BASH["max_output_bytes"]
+            if persistent_shell_available():
+                session = acquire_session(self.session_id)
+                try:
+                    with session.lock:
+                        result = session.run(command, timeout, cwd, on_output, max_bytes)
+                finally:
+                    release_session(session)
+            else:
+                result = run_oneshot(command, timeout, cwd, on_output, max_bytes)
 
             output = []
+            if result.timed_out:
+                output.append(f"Error: El comando excedió el timeout de {timeout} segundos")
             if result.stdout:
                 output.append(f"STDOUT:\n{result.stdout}")
             if result.stderr:
                 output.append(f"STDERR:\n{result.stderr}")
 
-            output.append(f"\nExit code: {result.returncode}")
+            if result.exit_code is not None:
+                output.append(f"\nExit code: {result.exit_code}")
+            if result.session_lost and persistent_shell_available():
+                output.append("(La sesión de shell terminó; el próximo comando usará una nueva)")
 
             return "\n".join(output) if output else "Comando ejecutado sin output"
 
-        except subprocess.TimeoutExpired:
-            return f"Error: El comando excedió el timeout de {timeout} segundos"
         except Exception as e:
             return f"Error al ejecutar comando: {str(e)}"
 
+    def fork(self) -> "BashTool":
+        """Copia con sesión propia: un fork no hereda ni pisa el cd del agente"""
+        clone = copy.copy(self)
+        clone.session_id = uuid.uuid4().hex
+        return clone
+
+    def close(self):
+        """Cierra la sesión de shell de esta herramienta"""
+        close_session(self.session_id)
+
+    def get_timeout(self, arguments: Dict[str, Any]) -> float:
+        """El comando tiene su propio timeout; se deja margen para el output"""
+        return arguments.get("timeout", 30) + 5
+
     def get_schema(self) -> Dict[str, Any]:
         return {
             "type": "object",
@@ -67,7 +115,7 @@ class BashTool(BaseTool):
                 },
                 "cwd": {
                     "type": "string",
-                    "description": "Directorio de trabajo (opcional)"
+                    "description": "Directorio de trabajo solo para este comando (opcional)"
                 }
             },
             "required": ["command"]
@@ -0,0 +1,368 @@
+"""
+Recorrido y escaneo de archivos para las herramientas de búsqueda
+
+- walk_files(): recorre el árbol una sola vez con os.scandir, respetando los
+  .gitignore y la lista de exclusión de Settings.SEARCH["exclude_dirs"]
+- search_files(): busca una regex en varios archivos con un pool de hilos,
+  saltando binarios y leyendo los archivos grandes con mmap. Los resultados
+  salen en el orden de los archivos y se cortan en max_results.
+"""
+import fnmatch
+import mmap
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Pattern, Tuple
+from ..config.settings import Settings
+
+
+# Bytes que se inspeccionan para decidir si un archivo es binario
+SNIFF_BYTES = 8192
+
+
+def looks_binary(data: bytes) -> bool:
+    """True si el inicio de un archivo parece binario (contiene NUL)"""
+    return b"\0" in data[:SNIFF_BYTES]
+
+
+def compile_file_pattern(file_pattern: str) -> Optional[Pattern]:
+    """Regex precompilada de un patrón fnmatch (None si acepta todo)"""
+    if file_pattern in ("", "*"):
+        return None
+    return re.compile(fnmatch.translate(file_pattern))
+
+
+# ----------------------------------------------------------------------
+# .gitignore
+# ----------------------------------------------------------------------
+
+def _gitignore_regex(pattern: str) -> str:
+    """Traduce un patrón de .gitignore a regex sobre rutas relativas (con /)"""
+    anchored = "/" in pattern.rstrip("/")
+    pattern = pattern.strip("/")
+
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            parts.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                parts.append(re.escape(pattern[i]))
+                i += 1
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+
+    prefix = "" if anchored else "(?:.*/)?"
+    return prefix + "".join(parts) + r"\Z"
+
+
+class GitIgnore:
+    """Reglas de un archivo .gitignore (relativas a su directorio)"""
+
+    def __init__(self, base: str, lines: Iterable[str]):
+        self.base = base
+        self.rules: List[Tuple[Pattern, bool, bool]] = []  # (regex, negada, solo dirs)
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            line = line.rstrip(" ")
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            if line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            try:
+                self.rules.append((re.compile(_gitignore_regex(line)), negated, dir_only))
+            except re.error:
+                continue
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["GitIgnore"]:
+        """Reglas del .gitignore de un directorio, o None si no tiene"""
+        try:
+            with open(os.path.join(directory, ".gitignore"), "r", encoding="utf-8", errors="replace") as f:
+                ignore = cls(directory, f)
+        except OSError:
+            return None
+        return ignore if ignore.rules else None
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """
+        True si path queda ignorado, False si una regla "!" lo reincluye,
+        None si ninguna regla aplica (la última que coincide gana).
+        """
+        relative = os.path.relpath(path, self.base).replace(os.sep, "/")
+        result = None
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative):
+                result = not negated
+        return result
+
+
+def _is_ignored(path: str, is_dir: bool, ignores: Tuple[GitIgnore, ...]) -> bool:
+    # Los .gitignore más profundos tienen prioridad sobre los de arriba
+    for ignore in reversed(ignores):
+        result = ignore.match(path, is_dir)
+        if result is not None:
+            return result
+    return False
+
+
+# ----------------------------------------------------------------------
+# Recorrido
+# ----------------------------------------------------------------------
+
+def walk_files(root: str, file_pattern: str = "*") -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    Archivos bajo root que coinciden con file_pattern, con su stat.
+
+    Recorre con os.scandir (una llamada por directorio), en orden
+    alfabético, sin seguir enlaces a directorios. Omite los directorios de
+    Settings.SEARCH["exclude_dirs"] y, si respect_gitignore está activo, lo
+    que ignoren los .gitignore encontrados en el camino.
+    """
+    config = Settings.SEARCH
+    exclude_dirs = set(config["exclude_dirs"])
+    respect_gitignore = config["respect_gitignore"]
+    name_regex = compile_file_pattern(file_pattern)
+
+    stack: List[Tuple[str, Tuple[GitIgnore, ...]]] = [(root, ())]
+    while stack:
+        directory, ignores = stack.pop()
+        if respect_gitignore:
+            ignore = GitIgnore.load(directory)
+            if ignore is not None:
+                ignores = ignores + (ignore,)
+
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if is_dir:
+                    if entry.name in exclude_dirs:
+                        continue
+                    if ignores and _is_ignored(entry.path, True, ignores):
+                        continue
+                    subdirs.append(entry.path)
+                    continue
+
+                if name_regex is not None and not name_regex.match(entry.name):
+                    continue
+                if ignores and _is_ignored(entry.path, False, ignores):
+                    continue
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            yield entry.path, st
+
+        # Los archivos de un directorio van antes que sus subdirectorios
+        for subdir in reversed(subdirs):
+            stack.append((subdir, ignores))
+
+
+# ----------------------------------------------------------------------
+# Escaneo
+# ----------------------------------------------------------------------
+
+def _search_buffer(buffer, regex: Pattern, newline, max_matches: int) -> List[Tuple[int, str]]:
+    """
+    Busca la regex línea por línea sobre un buffer completo (str o bytes).
+
+    En lugar de partir el buffer en líneas, busca desde el inicio de cada
+    línea candidata y confirma la coincidencia dentro de esa línea.
+    """
+    matches: List[Tuple[int, str]] = []
+    line_num = 1
+    counted_to = 0
+    pos = 0
+    size = len(buffer)
+
+    while pos < size and len(matches) < max_matches:
+        found = regex.search(buffer, pos)
+        if found is None:
+            break
+
+        start = buffer.rfind(newline, 0, found.start()) + 1
+        if start < pos:
+            start = pos
+        if start >= size:
+            # Coincidencia vacía después del último salto de línea
+            break
+        end = buffer.find(newline, start)
+        end = size if end == -1 else end + 1
+        line = buffer[start:end]  # Incluye el salto de línea, como al iterar un archivo
+
+        if found.end() <= end or regex.search(line):
+            line_num += buffer[counted_to:start].count(newline)
+            counted_to = start
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", errors="replace")
+            matches.append((line_num, line.rstrip()))
+        pos = end
+
+    return matches
+
+
+def search_file(
+    file_path: str,
+    regex: Pattern,
+    bytes_regex: Optional[Pattern],
+    max_matches: int
+) -> List[Tuple[int, str]]:
+    """
+    Coincidencias (número de línea, texto) de la regex en un archivo.
+
+    Los binarios devuelven una lista vacía. Los archivos de más de
+    Settings.SEARCH["mmap_threshold"] bytes se mapean en memoria y, si hay
+    bytes_regex (ver _bytes_regex), se buscan sin decodificarlos.
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+        if looks_binary(head):
+            return []
+
+        size = os.fstat(f.fileno()).st_size
+        if len(head) < SNIFF_BYTES or size <= Settings.SEARCH["mmap_threshold"]:
+            text = (head + f.read()).decode("utf-8", errors="replace")
+            return _search_buffer(text, regex, "\n", max_matches)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if bytes_regex is not None:
+                return _search_buffer(mapped, bytes_regex, b"\n", max_matches)
+            text = mapped[:].decode("utf-8", errors="replace")
+        return _search_buffer(text, regex, "\n", max_matches)
+
+
+# Escapes de clase cuyo significado cambia sobre bytes (solo ASCII)
+_CLASS_ESCAPES = frozenset("wWbBdDsS")
+
+
+def _has_char_classes(pattern: str) -> bool:
+    """True si el patrón usa ".", "[...]" o escapes de clase (\\w, \\d, \\s, \\b...)"""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            if pattern[i + 1:i + 2] in _CLASS_ESCAPES:
+                return True
+            i += 2
+            continue
+        if char in ".[":
+            return True
+        i += 1
+    return False
+
+
+def _bytes_regex(regex: Pattern) -> Optional[Pattern]:
+    """
+    Versión bytes de la regex, solo cuando coincide exactamente con lo
+    mismo que la versión str: patrón ASCII, sin clases de caracteres y sin
+    IGNORECASE. Sobre bytes, \\w, \\d, \\s y \\b solo reconocen ASCII, "." y
+    "[^...]" consumen un byte y no un carácter, y IGNORECASE no pliega
+    mayúsculas Unicode (K del símbolo Kelvin, "ſ"). En esos casos se
+    decodifica el archivo.
+    """
+    pattern = regex.pattern
+    if not pattern.isascii() or regex.flags & re.IGNORECASE or _has_char_classes(pattern):
+        return None
+    flags = regex.flags & (re.MULTILINE | re.DOTALL | re.VERBOSE)
+    try:
+        return re.compile(pattern.encode("ascii"), flags)
+    except re.error:
+        return None
+
+
+# Pool compartido de escaneo
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=Settings.SEARCH["workers"], thread_name_prefix="file-scan"
+            )
+    return _EXECUTOR
+
+
+def search_files(files: Iterable[str], regex: Pattern, max_results: int = 100) -> List[str]:
+    """
+    Busca la regex en varios archivos en paralelo.
+
+    Returns:
+        Líneas "archivo:línea: texto" en el orden de files, como máximo
+        max_results. Los archivos que no se pueden leer se omiten.
+    """
+    # ^ y $ deben anclar en cada línea al buscar sobre el archivo completo
+    regex = re.compile(regex.pattern, regex.flags | re.MULTILINE)
+    bytes_regex = _bytes_regex(regex)
+    executor = _get_executor()
+    window = Settings.SEARCH["workers"] * 4
+
+    results: List[str] = []
+    pending = []
+    files = iter(files)
+
+    def submit_next() -> bool:
+        file_path = next(files, None)
+        if file_path is None:
+            return False
+        pending.append((file_path, executor.submit(search_file, file_path, regex, bytes_regex, max_results)))
+        return True
+
+    while len(pending) < window and submit_next():
+        pass
+
+    # Se consumen en orden; siempre hay hasta `window` archivos en vuelo
+    while pending and len(results) < max_results:
+        file_path, future = pending.pop(0)
+        try:
+            matches = future.result()
+        except (OSError, ValueError):
+            matches = []
+        submit_next()
+        for line_num, line in matches:
+            results.append(f"{file_path}:{line_num}: {line}")
+            if len(results) >= max_results:
+                break
+
+    for _, future in pending:
+        future.cancel()
+    return results
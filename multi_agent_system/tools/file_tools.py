@@ -1,33 +1,148 @@
 """
 Herramientas para operaciones con archivos
 """
+import bisect
 import os
-from typing import Dict, Any
+import re
+import shutil
+import tempfile
+from typing import Dict, Any, List, Optional
 from .base_tool import BaseTool
+from ..config.settings import Settings
+from .file_scanner import looks_binary
+from .fs_cache import get_directory_cache
+from .line_index import get_line_index, read_bytes
 
 
 class ReadFileTool(BaseTool):
-    """Herramienta para leer archivos"""
+    """
+    Herramienta para leer archivos.
+
+    Lee por rangos de líneas (offset/limit) usando un índice de líneas
+    cacheado por archivo, y nunca devuelve más de
+    Settings.FILE_READ["max_bytes"]: si el rango no entra, se corta en la
+    última línea completa y se indica desde dónde continuar.
+    """
+
+    cacheable = True
 
     def __init__(self):
         super().__init__(
             name="read_file",
-            description="Lee el contenido de un archivo. Retorna el contenido completo del archivo."
+            description=(
+                "Lee el contenido de un archivo. Para archivos grandes usa offset y limit "
+                "para leer un rango de líneas; si la salida se trunca, indica cómo continuar."
+            )
         )
 
-    def execute(self, file_path: str, encoding: str = "utf-8") -> str:
-        """Lee un archivo y retorna su contenido"""
+    def execute(
+        self,
+        file_path: str,
+        encoding: str = "utf-8",
+        offset: int = 1,
+        limit: Optional[int] = None
+    ) -> str:
+        """
+        Lee un archivo (o un rango de sus líneas) y retorna su contenido.
+
+        Args:
+            file_path: Ruta del archivo
+            encoding: Encoding del archivo
+            offset: Primera línea a leer (empieza en 1)
+            limit: Cantidad máxima de líneas (None = hasta el final)
+        """
         try:
             if not os.path.exists(file_path):
                 return f"Error: El archivo '{file_path}' no existe"
 
-            with open(file_path, 'r', encoding=encoding) as f:
-                content = f.read()
+            if "\n".encode(encoding) != b"\n":
+                # Encodings como UTF-16 no se pueden indexar por bytes
+                return self._read_text(file_path, encoding, offset, limit)
+
+            index = get_line_index(file_path)
+            total = index.line_count
+            if total == 0:
+                return f"Contenido de {file_path}:\n\n"
+
+            first = max(int(offset), 1)
+            if first > total:
+                return f"Error: El archivo '{file_path}' tiene {total} líneas (offset={first})"
+            last = total if limit is None else min(first + max(int(limit), 1) - 1, total)
+
+            start, end = index.byte_range(first, last)
+            max_bytes = Settings.FILE_READ["max_bytes"]
+            truncated = end - start > max_bytes
+            cut_line = False
+            if truncated:
+                # Cortar en la última línea completa que entra en max_bytes
+                fits = bisect.bisect_right(index.offsets, start + max_bytes, first) - 1
+                if fits >= first:
+                    last = fits
+                    start, end = index.byte_range(first, last)
+                else:
+                    # Ni siquiera la primera línea entra: se corta la línea
+                    last = first
+                    end = start + max_bytes
+                    cut_line = True
+
+            data = read_bytes(file_path, start, end)
+            if first == 1 and looks_binary(data):
+                return f"Error: '{file_path}' parece un archivo binario"
+            content = data.decode(encoding, errors="ignore" if cut_line else "strict")
+
+            if first == 1 and last == total and not truncated:
+                return f"Contenido de {file_path}:\n\n{content}"
+            return self._format_range(file_path, content, first, last, total, truncated, cut_line)
 
-            return f"Contenido de {file_path}:\n\n{content}"
         except Exception as e:
             return f"Error al leer archivo: {str(e)}"
 
+    def _read_text(self, file_path: str, encoding: str, offset: int, limit: Optional[int]) -> str:
+        """Lectura sin índice para encodings que no usan b"\\n" como salto de línea"""
+        with open(file_path, 'r', encoding=encoding) as f:
+            lines = f.read().splitlines(keepends=True)
+
+        total = len(lines)
+        first = max(int(offset), 1)
+        last = total if limit is None else min(first + max(int(limit), 1) - 1, total)
+        content = "".join(lines[first - 1:last])
+
+        max_chars = Settings.FILE_READ["max_bytes"]
+        cut_line = len(content) > max_chars
+        if cut_line:
+            content = content[:max_chars]
+            last = first + content.count("\n")
+
+        if first == 1 and last >= total and not cut_line:
+            return f"Contenido de {file_path}:\n\n{content}"
+        return self._format_range(file_path, content, first, min(last, total), total, cut_line, cut_line)
+
+    @staticmethod
+    def _format_range(
+        file_path: str,
+        content: str,
+        first: int,
+        last: int,
+        total: int,
+        truncated: bool,
+        cut_line: bool
+    ) -> str:
+        """Contenido de un rango, con una nota final si quedan líneas o se truncó"""
+        header = f"Contenido de {file_path} (líneas {first}-{last} de {total}):\n\n"
+        notes = []
+        if cut_line:
+            notes.append(f"la línea {last} se cortó en {Settings.FILE_READ['max_bytes']} bytes")
+        if last < total:
+            notes.append(f"quedan {total - last} líneas; usa offset={last + 1} para continuar")
+        if not notes:
+            return header + content
+
+        label = "Truncado" if truncated else "Rango parcial"
+        return header + content + f"\n\n[{label}: {'; '.join(notes)}]"
+
+    def get_dependencies(self, arguments: Dict[str, Any]) -> List[str]:
+        return [arguments["file_path"]] if arguments.get("file_path") else []
+
     def get_schema(self) -> Dict[str, Any]:
         return {
             "type": "object",
@@ -40,6 +155,15 @@ class ReadFileTool(BaseTool):
                     "type": "string",
                     "description": "Encoding del archivo (default: utf-8)",
                     "default": "utf-8"
+                },
+                "offset": {
+                    "type": "integer",
+                    "description": "Primera línea a leer, empezando en 1 (default: 1)",
+                    "default": 1
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Cantidad máxima de líneas a leer (default: hasta el final)"
                 }
             },
             "required": ["file_path"]
@@ -49,6 +173,8 @@ class ReadFileTool(BaseTool):
 class WriteFileTool(BaseTool):
     """Herramienta para escribir archivos"""
 
+    side_effects = True
+
     def __init__(self):
         super().__init__(
             name="write_file",
@@ -70,6 +196,9 @@ class WriteFileTool(BaseTool):
         except Exception as e:
             return f"Error al escribir archivo: {str(e)}"
 
+    def get_touched_paths(self, arguments: Dict[str, Any]) -> Optional[List[str]]:
+        return [arguments["file_path"]] if arguments.get("file_path") else None
+
     def get_schema(self) -> Dict[str, Any]:
         return {
             "type": "object",
@@ -93,40 +222,164 @@ class WriteFileTool(BaseTool):
 
 
 class EditFileTool(BaseTool):
-    """Herramienta para editar archivos (búsqueda y reemplazo)"""
+    """
+    Herramienta para editar archivos (búsqueda y reemplazo).
+
+    Acepta un lote de ediciones que se aplican en una sola pasada sobre el
+    texto original: en cada posición gana la primera edición de la lista que
+    coincide. El archivo se procesa por bloques (nunca se cargan varias
+    copias completas en memoria) y se escribe en un archivo temporal que
+    reemplaza al original con os.replace, así que un fallo a mitad de camino
+    nunca deja el archivo a medio escribir. Si alguna edición no encuentra
+    su texto, el archivo no se modifica.
+    """
+
+    side_effects = True
+
+    # Ocurrencias por edición que se detallan en el resultado
+    MAX_REPORTED = 10
 
     def __init__(self):
         super().__init__(
             name="edit_file",
-            description="Edita un archivo reemplazando texto específico. Busca old_text y lo reemplaza con new_text."
+            description=(
+                "Edita un archivo reemplazando texto específico. Busca old_text y lo reemplaza "
+                "con new_text; para varios cambios en el mismo archivo usa edits (se aplican "
+                "todos en una sola escritura)."
+            )
         )
 
-    def execute(self, file_path: str, old_text: str, new_text: str, encoding: str = "utf-8") -> str:
-        """Edita un archivo reemplazando texto"""
+    def execute(
+        self,
+        file_path: str,
+        old_text: Optional[str] = None,
+        new_text: Optional[str] = None,
+        encoding: str = "utf-8",
+        edits: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        """
+        Edita un archivo reemplazando texto.
+
+        Args:
+            file_path: Ruta del archivo
+            old_text: Texto a reemplazar (edición única)
+            new_text: Texto nuevo (edición única)
+            encoding: Encoding del archivo
+            edits: Lista de {"old_text", "new_text"} aplicadas en orden
+
+        Returns:
+            Resultado con las ocurrencias (línea y offset) de cada edición
+        """
         try:
             if not os.path.exists(file_path):
                 return f"Error: El archivo '{file_path}' no existe"
 
-            # Leer archivo
-            with open(file_path, 'r', encoding=encoding) as f:
-                content = f.read()
-
-            # Verificar que el texto exista
-            if old_text not in content:
+            if edits is None:
+                if old_text is None or new_text is None:
+                    return "Error: Se requiere old_text y new_text, o una lista de edits"
+                edits = [{"old_text": old_text, "new_text": new_text}]
+            if not edits:
+                return "Error: La lista de edits está vacía"
+            for number, edit in enumerate(edits, 1):
+                if not edit.get("old_text") or edit.get("new_text") is None:
+                    return f"Error: La edición {number} requiere old_text (no vacío) y new_text"
+
+            matches = self._rewrite(file_path, edits, encoding)
+            if matches is None:
                 return f"Error: No se encontró el texto a reemplazar en '{file_path}'"
+            if isinstance(matches, int):
+                return f"Error: No se encontró el texto de la edición {matches} en '{file_path}'"
+
+            total = sum(len(found) for found in matches)
+            lines = [f"Archivo '{file_path}' editado exitosamente. {total} ocurrencia(s) reemplazada(s)."]
+            for number, found in enumerate(matches, 1):
+                locations = ", ".join(
+                    f"línea {line} (offset {offset})" for line, offset in found[:self.MAX_REPORTED]
+                )
+                if len(found) > self.MAX_REPORTED:
+                    locations += f", ... (+{len(found) - self.MAX_REPORTED})"
+                lines.append(f"  - Edición {number}: {len(found)} ocurrencia(s): {locations}")
+            return "\n".join(lines)
 
-            # Reemplazar
-            new_content = content.replace(old_text, new_text)
-            occurrences = content.count(old_text)
-
-            # Escribir archivo
-            with open(file_path, 'w', encoding=encoding) as f:
-                f.write(new_content)
-
-            return f"Archivo '{file_path}' editado exitosamente. {occurrences} ocurrencia(s) reemplazada(s)."
         except Exception as e:
             return f"Error al editar archivo: {str(e)}"
 
+    def _rewrite(self, file_path: str, edits: List[Dict[str, str]], encoding: str):
+        """
+        Aplica las ediciones escribiendo a un temporal y reemplaza el archivo.
+
+        Returns:
+            Por edición, la lista de (línea, offset) de sus ocurrencias en el
+            texto original; o el número de la primera edición sin
+            ocurrencias (None si es la única), sin tocar el archivo.
+        """
+        olds = [edit["old_text"] for edit in edits]
+        news = [edit["new_text"] for edit in edits]
+        # Alternativas en el orden de la lista: a igual posición gana la primera
+        regex = re.compile("|".join(f"({re.escape(old)})" for old in olds))
+        lookahead = max(len(old) for old in olds) - 1
+        chunk_size = Settings.FILE_EDIT["chunk_size"]
+
+        matches: List[List] = [[] for _ in edits]
+        # Si file_path es un symlink se reemplaza su destino, no el enlace
+        file_path = os.path.realpath(file_path)
+        directory = os.path.dirname(file_path)
+        fd, tmp_path = tempfile.mkstemp(prefix=".edit-", suffix=".tmp", dir=directory)
+        try:
+            with open(file_path, "r", encoding=encoding) as src, \
+                    os.fdopen(fd, "w", encoding=encoding) as dst:
+                buffer = ""
+                offset = 0  # Caracteres del original ya procesados (antes de buffer)
+                line = 1    # Línea del original en la que empieza buffer
+                eof = False
+
+                while not eof:
+                    chunk = src.read(chunk_size)
+                    eof = not chunk
+                    buffer += chunk
+
+                    # Solo es seguro decidir coincidencias que no puedan
+                    # depender del bloque siguiente
+                    safe = len(buffer) if eof else max(len(buffer) - lookahead, 0)
+                    pos = 0
+                    out = []
+                    for found in regex.finditer(buffer):
+                        if found.start() >= safe:
+                            break
+                        line += buffer.count("\n", pos, found.start())
+                        index = found.lastindex - 1
+                        matches[index].append((line, offset + found.start()))
+                        out.append(buffer[pos:found.start()])
+                        out.append(news[index])
+                        line += olds[index].count("\n")
+                        pos = found.end()
+
+                    keep_from = max(pos, safe)
+                    line += buffer.count("\n", pos, keep_from)
+                    out.append(buffer[pos:keep_from])
+                    dst.write("".join(out))
+                    offset += keep_from
+                    buffer = buffer[keep_from:]
+
+                dst.flush()
+                os.fsync(dst.fileno())
+
+            for number, found in enumerate(matches, 1):
+                if not found:
+                    os.unlink(tmp_path)
+                    return None if len(edits) == 1 else number
+
+            shutil.copymode(file_path, tmp_path)
+            os.replace(tmp_path, file_path)
+            return matches
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def get_touched_paths(self, arguments: Dict[str, Any]) -> Optional[List[str]]:
+        return [arguments["file_path"]] if arguments.get("file_path") else None
+
     def get_schema(self) -> Dict[str, Any]:
         return {
             "type": "object",
@@ -143,13 +396,25 @@ class EditFileTool(BaseTool):
                     "type": "string",
                     "description": "Texto nuevo con el que reemplazar"
                 },
+                "edits": {
+                    "type": "array",
+                    "description": "Varias ediciones aplicadas en una sola pasada (en lugar de old_text/new_text)",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "old_text": {"type": "string"},
+                            "new_text": {"type": "string"}
+                        },
+                        "required": ["old_text", "new_text"]
+                    }
+                },
                 "encoding": {
                     "type": "string",
                     "description": "Encoding del archivo (default: utf-8)",
                     "default": "utf-8"
                 }
             },
-            "required": ["file_path", "old_text", "new_text"]
+            "required": ["file_path"]
         }
 
 
@@ -171,16 +436,16 @@ class ListDirectoryTool(BaseTool):
             if not os.path.isdir(directory_path):
                 return f"Error: '{directory_path}' no es un directorio"
 
-            items = os.listdir(directory_path)
+            entries = get_directory_cache().list_dir(directory_path)
             result = [f"Contenido de '{directory_path}':\n"]
 
-            for item in sorted(items):
-                full_path = os.path.join(directory_path, item)
-                if os.path.isdir(full_path):
-                    result.append(f"  [DIR]  {item}/")
+            for entry in entries:
+                if entry.is_dir:
+                    result.append(f"  [DIR]  {entry.name}/")
                 else:
-                    size = os.path.getsize(full_path)
-                    result.append(f"  [FILE] {item} ({size} bytes)")
+                    # El tamaño no se cachea: cambia sin cambiar el directorio
+                    size = os.path.getsize(os.path.join(directory_path, entry.name))
+                    result.append(f"  [FILE] {entry.name} ({size} bytes)")
 
             return "\n".join(result)
         except Exception as e:
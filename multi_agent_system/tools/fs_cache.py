@@ -0,0 +1,236 @@
+"""
+Caché compartida del árbol de directorios
+
+GlobTool, FindFileTool y ListDirectoryTool listan directorios a través de
+esta caché: cada listado se guarda junto con el mtime del directorio y se
+reutiliza mientras no cambie (crear, borrar o renombrar una entrada cambia
+el mtime del directorio que la contiene). Así, repetir un glob sobre el
+mismo árbol cuesta un stat por directorio en lugar de un listado completo.
+
+Los recorridos son generadores: quien los consume puede detenerse en
+max_results sin recorrer el resto del árbol.
+"""
+import fnmatch
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, NamedTuple, Pattern, Tuple
+
+
+class Entry(NamedTuple):
+    """Entrada de un directorio"""
+    name: str
+    is_dir: bool
+
+
+# Un listado cuyo mtime está a menos de esto del momento en que se leyó se
+# vuelve a leer (filesystems con mtime de baja resolución)
+_RACY_NS = 2_000_000_000
+
+
+class DirectoryCache:
+    """
+    Listados de directorios validados por mtime, con desalojo LRU.
+
+    - max_dirs: máximo de directorios en caché
+    """
+
+    def __init__(self, max_dirs: int = 50_000):
+        self.max_dirs = max_dirs
+        self.hits = 0
+        self.misses = 0
+        self._listings: "OrderedDict[str, Tuple[int, int, List[Entry]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def list_dir(self, path: str) -> List[Entry]:
+        """
+        Entradas de un directorio, ordenadas por nombre.
+
+        La lista devuelta es compartida: no se debe modificar.
+        Lanza OSError si el directorio no existe o no se puede leer.
+        """
+        key = os.path.abspath(path)
+        mtime_ns = os.stat(key).st_mtime_ns
+
+        with self._lock:
+            cached = self._listings.get(key)
+            if cached is not None and cached[0] == mtime_ns and cached[1] - mtime_ns > _RACY_NS:
+                self._listings.move_to_end(key)
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+
+        listed_at = time.time_ns()
+        with os.scandir(key) as it:
+            entries = []
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                entries.append(Entry(entry.name, is_dir))
+        entries.sort()
+
+        with self._lock:
+            self._listings[key] = (mtime_ns, listed_at, entries)
+            self._listings.move_to_end(key)
+            while len(self._listings) > self.max_dirs:
+                self._listings.popitem(last=False)
+        return entries
+
+    def walk(self, root: str, exclude_dirs: Tuple[str, ...] = ()) -> Iterator[Tuple[str, List[Entry]]]:
+        """
+        Recorre el árbol en profundidad (como os.walk, de forma perezosa).
+
+        No entra en enlaces simbólicos a directorios ni en exclude_dirs.
+        """
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = self.list_dir(directory)
+            except OSError:
+                continue
+            yield directory, entries
+
+            subdirs = [
+                os.path.join(directory, entry.name)
+                for entry in entries
+                if entry.is_dir and entry.name not in exclude_dirs
+            ]
+            for subdir in reversed(subdirs):
+                if not os.path.islink(subdir):
+                    stack.append(subdir)
+
+    def clear(self):
+        """Descarta todos los listados"""
+        with self._lock:
+            self._listings.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Directorios en caché y tasa de aciertos"""
+        lookups = self.hits + self.misses
+        return {
+            "directories": len(self._listings),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0
+        }
+
+
+_cache = DirectoryCache()
+
+
+def get_directory_cache() -> DirectoryCache:
+    """Caché compartida del proceso"""
+    return _cache
+
+
+# ----------------------------------------------------------------------
+# Patrones
+# ----------------------------------------------------------------------
+
+_MAGIC = re.compile(r"[*?[]")
+
+
+@lru_cache(maxsize=512)
+def compile_pattern(pattern: str) -> Pattern:
+    """Regex precompilada de un patrón fnmatch (se compila una vez por patrón)"""
+    return re.compile(fnmatch.translate(pattern))
+
+
+def has_magic(pattern: str) -> bool:
+    return _MAGIC.search(pattern) is not None
+
+
+def iter_glob(pattern: str, exclude_dirs: Tuple[str, ...] = ()) -> Iterator[str]:
+    """
+    Archivos que coinciden con un patrón glob (con ** recursivo).
+
+    Sigue las reglas de glob.glob(recursive=True): los comodines no
+    coinciden con nombres que empiezan con "." salvo que el patrón lo haga.
+    Las rutas se devuelven con el mismo prefijo que el patrón. Por defecto
+    no se excluye nada; exclude_dirs es para quien lo pida explícitamente.
+    """
+    parts = pattern.replace(os.sep, "/").split("/")
+
+    # La parte sin comodines del patrón es el directorio base
+    first_magic = next((i for i, part in enumerate(parts) if has_magic(part)), None)
+    if first_magic is None:
+        if os.path.isfile(pattern):
+            yield pattern
+        return
+
+    base = "/".join(parts[:first_magic])
+    if not base and first_magic > 0:
+        base = "/"  # Patrón absoluto
+    segments = parts[first_magic:]
+    yield from _glob(get_directory_cache(), base, segments, exclude_dirs)
+
+
+def _glob(cache: DirectoryCache, directory: str, segments: List[str], exclude_dirs) -> Iterator[str]:
+    segment, rest = segments[0], segments[1:]
+
+    if not has_magic(segment):
+        # Componente literal: no hace falta listar
+        path = _join(directory, segment)
+        if rest:
+            if os.path.isdir(path):
+                yield from _glob(cache, path, rest, exclude_dirs)
+        elif os.path.isfile(path):
+            yield path
+        return
+
+    try:
+        entries = cache.list_dir(directory or ".")
+    except OSError:
+        return
+
+    if segment == "**":
+        if rest:
+            # Cero directorios...
+            yield from _glob(cache, directory, rest, exclude_dirs)
+        else:
+            # "**" al final: todos los archivos del subárbol
+            for entry in entries:
+                if not entry.is_dir and not entry.name.startswith("."):
+                    yield _join(directory, entry.name)
+        # ...o uno más (y se sigue aplicando **)
+        for entry in entries:
+            if entry.is_dir and not entry.name.startswith(".") and entry.name not in exclude_dirs:
+                subdir = _join(directory, entry.name)
+                if not os.path.islink(subdir):
+                    yield from _glob(cache, subdir, segments, exclude_dirs)
+        return
+
+    regex = compile_pattern(segment)
+    match_hidden = segment.startswith(".")
+    for entry in entries:
+        if entry.name.startswith(".") and not match_hidden:
+            continue
+        if not regex.match(entry.name):
+            continue
+        if rest:
+            if entry.is_dir and entry.name not in exclude_dirs:
+                yield from _glob(cache, _join(directory, entry.name), rest, exclude_dirs)
+        elif not entry.is_dir:
+            yield _join(directory, entry.name)
+
+
+def _join(directory: str, name: str) -> str:
+    return os.path.join(directory, name) if directory else name
+
+
+def iter_find(root: str, pattern: str, exclude_dirs: Tuple[str, ...] = ()) -> Iterator[str]:
+    """Archivos bajo root cuyo nombre coincide con pattern (fnmatch)"""
+    regex = compile_pattern(pattern) if has_magic(pattern) else None
+    cache = get_directory_cache()
+    for dirpath, entries in cache.walk(root, exclude_dirs):
+        for entry in entries:
+            if entry.is_dir:
+                continue
+            if regex.match(entry.name) if regex is not None else entry.name == pattern:
+                yield os.path.join(dirpath, entry.name)
@@ -0,0 +1,88 @@
+"""
+Índice de líneas de archivos para lecturas por rango
+
+Guarda el offset en bytes del inicio de cada línea, de modo que leer las
+líneas N..M de un archivo es un seek directo en lugar de recorrerlo desde el
+principio. Los archivos grandes se indexan a través de mmap sin cargarlos en
+memoria. Los índices se cachean por archivo y se invalidan cuando cambian su
+mtime o su tamaño.
+"""
+import mmap
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Tuple
+from ..config.settings import Settings
+
+
+_NEWLINE = re.compile(b"\n")
+
+
+class LineIndex:
+    """Offsets de inicio de línea de un archivo"""
+
+    def __init__(self, path: str, mtime_ns: int, size: int, offsets: array):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.offsets = offsets  # offsets[i] = byte donde empieza la línea i+1
+
+    @property
+    def line_count(self) -> int:
+        return len(self.offsets)
+
+    def byte_range(self, first: int, last: int) -> Tuple[int, int]:
+        """Bytes [inicio, fin) de las líneas first..last (1-based, inclusive)"""
+        start = self.offsets[first - 1]
+        end = self.offsets[last] if last < len(self.offsets) else self.size
+        return start, end
+
+    @classmethod
+    def build(cls, path: str) -> "LineIndex":
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            offsets = array("Q")
+            if st.st_size:
+                offsets.append(0)
+                if st.st_size > Settings.FILE_READ["mmap_threshold"]:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        offsets.extend(m.end() for m in _NEWLINE.finditer(data))
+                else:
+                    offsets.extend(m.end() for m in _NEWLINE.finditer(f.read()))
+                # Un salto de línea final no abre una línea nueva
+                if offsets[-1] == st.st_size:
+                    offsets.pop()
+        return cls(path, st.st_mtime_ns, st.st_size, offsets)
+
+
+_INDEXES: "OrderedDict[str, LineIndex]" = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def get_line_index(path: str) -> LineIndex:
+    """Índice de líneas de un archivo (reutilizado mientras no cambie)"""
+    key = os.path.abspath(path)
+    st = os.stat(key)
+
+    with _LOCK:
+        index = _INDEXES.get(key)
+        if index is not None and (index.mtime_ns, index.size) == (st.st_mtime_ns, st.st_size):
+            _INDEXES.move_to_end(key)
+            return index
+
+    index = LineIndex.build(key)
+    with _LOCK:
+        _INDEXES[key] = index
+        _INDEXES.move_to_end(key)
+        while len(_INDEXES) > Settings.FILE_READ["index_cache_size"]:
+            _INDEXES.popitem(last=False)
+    return index
+
+
+def read_bytes(path: str, start: int, end: int) -> bytes:
+    """Bytes [start, end) de un archivo"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
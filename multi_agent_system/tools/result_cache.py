@@ -0,0 +1,167 @@
+"""
+Caché de resultados de herramientas
+
+Las herramientas de solo lectura (cacheable = True, hoy read_file) guardan
+su resultado por (herramienta, argumentos). Cada entrada recuerda el mtime
+y el tamaño de los archivos de los que depende (BaseTool.get_dependencies)
+y se descarta cuando cambian. Además:
+
+- Una herramienta con side_effects invalida las entradas que dependen de
+  las rutas que toca (BaseTool.get_touched_paths), o todas si no puede
+  decir cuáles (bash, delegación).
+- Las entradas vencen a los ttl_seconds (por si un cambio conserva mtime y
+  tamaño); la validez no depende del TTL sino del fingerprint.
+
+grep, glob, find_file y list_directory no son cacheables: su resultado
+depende de todos los archivos y subdirectorios que recorren, y editar un
+archivo dentro de un subdirectorio no cambia el mtime de la raíz.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# (ruta absoluta, mtime_ns, tamaño); (ruta, None, None) si no existe
+_Fingerprint = Tuple[str, Optional[int], Optional[int]]
+
+
+def _fingerprint(paths: List[str]) -> Tuple[_Fingerprint, ...]:
+    result = []
+    for path in paths:
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+            result.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            result.append((path, None, None))
+    return tuple(result)
+
+
+def _is_related(a: str, b: str) -> bool:
+    """True si a y b son la misma ruta o una contiene a la otra"""
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+class ToolResultCache:
+    """
+    Resultados de herramientas en memoria, con desalojo LRU.
+
+    - max_entries: máximo de resultados guardados
+    - ttl_seconds: antigüedad máxima de un resultado
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0  # Cambia en cada invalidate()
+        self._by_tool: Dict[str, Dict[str, int]] = {}
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, float, Tuple[_Fingerprint, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(name: str, arguments: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """Clave de una llamada (None si los argumentos no son serializables)"""
+        try:
+            return name, json.dumps(arguments, sort_keys=True, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, key: Tuple[str, str]) -> Tuple[bool, Any]:
+        """(True, resultado) si hay un resultado vigente, si no (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+
+        hit = False
+        if entry is not None:
+            result, created_at, fingerprint = entry
+            if time.monotonic() - created_at <= self.ttl_seconds and \
+                    _fingerprint([path for path, _, _ in fingerprint]) == fingerprint:
+                hit = True
+
+        with self._lock:
+            stats = self._by_tool.setdefault(key[0], {"hits": 0, "misses": 0})
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                stats["hits"] += 1
+                return True, entry[0]
+            if entry is not None:
+                self._entries.pop(key, None)
+            self.misses += 1
+            stats["misses"] += 1
+            return False, None
+
+    def snapshot(self, dependencies: List[str]) -> Tuple[int, Tuple[_Fingerprint, ...]]:
+        """
+        Estado de las dependencias antes de ejecutar la herramienta.
+
+        Tomarlo antes (y no después) garantiza que un cambio durante la
+        ejecución deje la entrada inválida en lugar de guardar un resultado
+        viejo como vigente.
+        """
+        with self._lock:
+            generation = self._generation
+        return generation, _fingerprint(dependencies)
+
+    def set(self, key: Tuple[str, str], result: Any, snapshot: Tuple[int, Tuple[_Fingerprint, ...]]):
+        """Guarda un resultado con el estado de sus dependencias (ver snapshot)"""
+        generation, fingerprint = snapshot
+        entry = (result, time.monotonic(), fingerprint)
+        with self._lock:
+            if generation != self._generation:
+                # Hubo una invalidación mientras se ejecutaba
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, paths: Optional[List[str]] = None):
+        """
+        Descarta los resultados que dependen de paths (o todos si es None).
+
+        Un resultado depende de una ruta si alguna de sus dependencias es esa
+        ruta, la contiene (ej: un grep sobre el directorio) o está dentro.
+        """
+        with self._lock:
+            self._generation += 1
+            if paths is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                touched = [os.path.abspath(path) for path in paths]
+                stale = [
+                    key for key, (_, _, fingerprint) in self._entries.items()
+                    if any(_is_related(dep, path) for dep, _, _ in fingerprint for path in touched)
+                ]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+            self.invalidations += removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Entradas, aciertos e invalidaciones (en total y por herramienta)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            by_tool = {
+                name: {
+                    **stats,
+                    "hit_rate": round(stats["hits"] / (stats["hits"] + stats["misses"]) * 100, 2)
+                    if stats["hits"] + stats["misses"] else 0.0
+                }
+                for name, stats in self._by_tool.items()
+            }
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "by_tool": by_tool
+            }
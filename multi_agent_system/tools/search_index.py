@@ -0,0 +1,338 @@
+"""
+Índice de trigramas del workspace para GrepTool
+
+Un índice para el workspace (Settings.SEARCH["workspace_root"], por defecto
+el directorio actual), construido en segundo plano. Para cada
+archivo guarda (mtime, tamaño) y un filtro de Bloom con los trigramas de su
+contenido (en casefold). Una búsqueda extrae de la regex los trigramas que
+toda coincidencia debe contener y solo escanea los archivos cuyo filtro los
+tiene todos; los archivos nuevos o modificados desde la indexación se
+escanean siempre y se reindexan en segundo plano. Las búsquedas fuera del
+workspace no usan índice.
+
+Mientras el índice se construye, si hay un binario `rg` (ripgrep) en el PATH
+se usa como alternativa.
+"""
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+from ..config.settings import Settings
+from .file_scanner import looks_binary, walk_files
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+# Repeticiones (POSSESSIVE_REPEAT existe desde Python 3.11)
+_REPEATS = tuple(
+    getattr(sre_parse, name)
+    for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+    if hasattr(sre_parse, name)
+)
+
+# Marca de archivo binario en el índice (nunca es candidato)
+BINARY = b""
+
+# Los archivos sin filtro (muy grandes o ilegibles) son siempre candidatos
+_Entry = Tuple[int, int, Optional[bytes]]  # (mtime_ns, tamaño, filtro)
+
+
+# ----------------------------------------------------------------------
+# Trigramas requeridos por una regex
+# ----------------------------------------------------------------------
+
+def _literal_runs(parsed, runs: List[str], current: List[str]):
+    """Acumula en runs las secuencias literales obligatorias del patrón"""
+    for op, av in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+        elif op is sre_parse.AT:
+            # Anclas (^, $, \b): no consumen caracteres, la secuencia sigue
+            continue
+        elif op is sre_parse.SUBPATTERN:
+            # Un grupo sin alternativas continúa la secuencia
+            _literal_runs(av[-1], runs, current)
+        elif op in _REPEATS:
+            _flush(runs, current)
+            low, _, item = av
+            if low >= 1:
+                inner: List[str] = []
+                _literal_runs(item, runs, inner)
+                _flush(runs, inner)
+        else:
+            # Clases, ".", alternativas, lookarounds...: cortan la secuencia
+            _flush(runs, current)
+
+
+def _flush(runs: List[str], current: List[str]):
+    if current:
+        runs.append("".join(current))
+        current.clear()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigramas de un texto (ya en casefold)"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def required_trigrams(pattern: str) -> Set[str]:
+    """
+    Trigramas que toda coincidencia de la regex contiene.
+
+    Se calculan en casefold, así que sirven igual para búsquedas sensibles
+    o no a mayúsculas. Un conjunto vacío significa que no se puede filtrar.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return set()
+
+    runs: List[str] = []
+    current: List[str] = []
+    _literal_runs(parsed, runs, current)
+    _flush(runs, current)
+
+    required: Set[str] = set()
+    for run in runs:
+        required |= trigrams(run.casefold())
+    return required
+
+
+# ----------------------------------------------------------------------
+# Filtro de Bloom por archivo
+# ----------------------------------------------------------------------
+
+def _make_bloom(grams: Set[str]) -> bytes:
+    """Filtro de Bloom (1 hash, ~8 bits por trigrama)"""
+    bits = 1 << max(13, (len(grams) * 8).bit_length())
+    mask = bits - 1
+    bloom = bytearray(bits >> 3)
+    for gram in grams:
+        h = hash(gram) & mask
+        bloom[h >> 3] |= 1 << (h & 7)
+    return bytes(bloom)
+
+
+def _bloom_contains(bloom: bytes, hashes: List[int]) -> bool:
+    mask = (len(bloom) << 3) - 1
+    for h in hashes:
+        h &= mask
+        if not bloom[h >> 3] >> (h & 7) & 1:
+            return False
+    return True
+
+
+# ----------------------------------------------------------------------
+# Índice
+# ----------------------------------------------------------------------
+
+# Un solo hilo para construir y actualizar índices: no compite con las tools
+_INDEXER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+
+
+class TrigramIndex:
+    """Índice de trigramas de los archivos bajo un directorio"""
+
+    def __init__(self, root: str, max_file_size: int):
+        self.root = root
+        self.max_file_size = max_file_size
+        self.ready = threading.Event()
+        self._files: Dict[str, _Entry] = {}
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Construye el índice en segundo plano"""
+        _INDEXER.submit(self._build)
+
+    def _build(self):
+        seen = set()
+        for file_path, st in walk_files(self.root):
+            seen.add(file_path)
+            entry = self._files.get(file_path)
+            if entry is None or entry[:2] != (st.st_mtime_ns, st.st_size):
+                self._index_file(file_path, st)
+
+        for file_path in [p for p in self._files if p not in seen]:
+            self._files.pop(file_path, None)
+        self.ready.set()
+
+    def _index_file(self, file_path: str, st: os.stat_result):
+        bloom: Optional[bytes] = None
+        if st.st_size <= self.max_file_size:
+            try:
+                with open(file_path, "rb") as f:
+                    data = f.read()
+                if looks_binary(data):
+                    bloom = BINARY
+                else:
+                    # Se decodifica igual que al escanear (file_scanner)
+                    bloom = _make_bloom(trigrams(data.decode("utf-8", errors="replace").casefold()))
+            except OSError:
+                bloom = None
+        self._files[file_path] = (st.st_mtime_ns, st.st_size, bloom)
+
+    def _reindex(self, paths: List[str]):
+        for file_path in paths:
+            try:
+                self._index_file(file_path, os.stat(file_path))
+            except OSError:
+                self._files.pop(file_path, None)
+        with self._lock:
+            self._pending.difference_update(paths)
+
+    def candidates(self, path: str, file_pattern: str, pattern: str) -> List[str]:
+        """
+        Archivos bajo path que pueden contener coincidencias de pattern.
+
+        Los archivos cambiados desde la indexación se devuelven siempre
+        (y se reindexan en segundo plano).
+        """
+        hashes = [hash(gram) for gram in required_trigrams(pattern)]
+        result = []
+        stale = []
+
+        for file_path, st in walk_files(path, file_pattern):
+            entry = self._files.get(file_path)
+            if entry is None or entry[:2] != (st.st_mtime_ns, st.st_size):
+                stale.append(file_path)
+                result.append(file_path)
+                continue
+
+            bloom = entry[2]
+            if bloom == BINARY:
+                continue
+            if bloom is None or not hashes or _bloom_contains(bloom, hashes):
+                result.append(file_path)
+
+        if stale:
+            with self._lock:
+                stale = [p for p in stale if p not in self._pending]
+                self._pending.update(stale)
+            if stale:
+                _INDEXER.submit(self._reindex, stale)
+
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        entries = list(self._files.values())
+        return {
+            "files": len(entries),
+            "binary": sum(1 for e in entries if e[2] == BINARY),
+            "unindexed": sum(1 for e in entries if e[2] is None),
+            "bloom_bytes": sum(len(e[2]) for e in entries if e[2])
+        }
+
+
+_INDEXES: Dict[str, TrigramIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_search_index(path: str) -> Optional[TrigramIndex]:
+    """
+    Índice del workspace si path está dentro de él (lo crea y empieza a
+    construirlo si no existe).
+
+    Returns:
+        El índice, o None si Settings.SEARCH["index"] está desactivado o
+        path queda fuera del workspace (no se indexan $HOME ni /)
+    """
+    config = Settings.SEARCH
+    if not config["index"]:
+        return None
+
+    workspace = os.path.abspath(config["workspace_root"] or os.getcwd())
+    root = os.path.abspath(path)
+    try:
+        if os.path.commonpath([workspace, root]) != workspace:
+            return None
+    except ValueError:  # Otra unidad en Windows
+        return None
+
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(workspace)
+        if index is not None:
+            return index
+        index = TrigramIndex(workspace, config["max_indexed_file_size"])
+        _INDEXES[workspace] = index
+    index.start()
+    return index
+
+
+# ----------------------------------------------------------------------
+# ripgrep
+# ----------------------------------------------------------------------
+
+def ripgrep_search(
+    pattern: str,
+    path: str,
+    file_pattern: str,
+    case_sensitive: bool,
+    max_results: int,
+    timeout: float = 30
+) -> Optional[List[str]]:
+    """
+    Busca con ripgrep si está instalado.
+
+    Returns:
+        Líneas "archivo:línea: texto", o None si rg no está disponible o
+        no acepta la regex (su sintaxis no cubre backreferences ni
+        lookarounds de Python)
+    """
+    if not Settings.SEARCH["use_ripgrep"]:
+        return None
+    rg = shutil.which("rg")
+    if not rg:
+        return None
+
+    # Los mismos archivos que walk_files (incluye ocultos; solo se respetan
+    # los .gitignore, y solo con respect_gitignore), en orden estable por ruta
+    command = [
+        rg, "--line-number", "--no-heading", "--null", "--color", "never",
+        "--no-messages", "--hidden", "--sort", "path", "--glob", file_pattern
+    ]
+    if Settings.SEARCH["respect_gitignore"]:
+        command += ["--no-ignore-dot", "--no-ignore-global", "--no-ignore-exclude", "--no-require-git"]
+    else:
+        command.append("--no-ignore")
+    for excluded in Settings.SEARCH["exclude_dirs"]:
+        command += ["--glob", f"!{excluded}/"]
+    if not case_sensitive:
+        command.append("--ignore-case")
+    command += ["-e", pattern, path]
+
+    results = []
+    try:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        return None
+
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        for raw in process.stdout:
+            file_path, _, rest = raw.rstrip(b"\r\n").partition(b"\0")
+            line_num, _, text = rest.partition(b":")
+            results.append(
+                f"{file_path.decode('utf-8', errors='replace')}:{line_num.decode()}: "
+                f"{text.decode('utf-8', errors='replace').rstrip()}"
+            )
+            if len(results) >= max_results:
+                process.kill()
+                break
+        process.wait()
+    finally:
+        timer.cancel()
+        process.stdout.close()
+
+    # 0 = hubo coincidencias, 1 = ninguna; otro código = error (regex inválida)
+    if len(results) < max_results and process.returncode not in (0, 1):
+        return None
+    return results
@@ -3,13 +3,22 @@ Herramientas para búsqueda de archivos y contenido
 """
 import os
 import re
-import glob as glob_module
+from itertools import islice
 from typing import Dict, Any, List
 from .base_tool import BaseTool
+from .file_scanner import search_files, walk_files
+from .fs_cache import iter_find, iter_glob
+from .search_index import get_search_index, ripgrep_search
 
 
 class GrepTool(BaseTool):
-    """Herramienta para buscar patrones en archivos"""
+    """
+    Herramienta para buscar patrones en archivos.
+
+    Con el índice de trigramas listo (ver search_index.py) solo escanea los
+    archivos que pueden contener coincidencias; mientras se construye usa
+    ripgrep si está instalado, y si no escanea todos los archivos.
+    """
 
     def __init__(self):
         super().__init__(
@@ -42,28 +51,20 @@ class GrepTool(BaseTool):
             flags = 0 if case_sensitive else re.IGNORECASE
             regex = re.compile(pattern, flags)
 
-            results = []
-            count = 0
-
-            # Buscar archivos
-            search_pattern = os.path.join(path, "**", file_pattern)
-            for file_path in glob_module.glob(search_pattern, recursive=True):
-                if not os.path.isfile(file_path):
-                    continue
-
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        for line_num, line in enumerate(f, 1):
-                            if regex.search(line):
-                                results.append(f"{file_path}:{line_num}: {line.rstrip()}")
-                                count += 1
-                                if count >= max_results:
-                                    break
-                except:
-                    continue
-
-                if count >= max_results:
-                    break
+            if os.path.isfile(path):
+                results = search_files([path], regex, max_results)
+            else:
+                index = get_search_index(path)
+                if index is not None and index.ready.is_set():
+                    results = search_files(
+                        index.candidates(path, file_pattern, pattern), regex, max_results
+                    )
+                else:
+                    # Índice en construcción (o desactivado): ripgrep o escaneo completo
+                    results = ripgrep_search(pattern, path, file_pattern, case_sensitive, max_results)
+                    if results is None:
+                        files = (file_path for file_path, _ in walk_files(path, file_pattern))
+                        results = search_files(files, regex, max_results)
 
             if not results:
                 return f"No se encontraron coincidencias para '{pattern}'"
@@ -130,17 +131,13 @@ class GlobTool(BaseTool):
         """
         try:
             search_pattern = os.path.join(path, pattern)
-            files = glob_module.glob(search_pattern, recursive=True)
 
-            # Filtrar solo archivos (no directorios)
-            files = [f for f in files if os.path.isfile(f)]
+            # Solo archivos (no directorios); el recorrido se detiene en max_results
+            files = list(islice(iter_glob(search_pattern), max_results))
 
             if not files:
                 return f"No se encontraron archivos que coincidan con '{pattern}'"
 
-            # Limitar resultados
-            files = files[:max_results]
-
             header = f"Encontrados {len(files)} archivo(s) que coinciden con '{pattern}':\n\n"
             file_list = "\n".join(sorted(files))
 
@@ -194,17 +191,7 @@ class FindFileTool(BaseTool):
             Lista de archivos encontrados
         """
         try:
-            results = []
-
-            for root, dirs, files in os.walk(path):
-                for file in files:
-                    if self._match_pattern(file, filename):
-                        full_path = os.path.join(root, file)
-                        results.append(full_path)
-                        if len(results) >= max_results:
-                            break
-                if len(results) >= max_results:
-                    break
+            results = list(islice(iter_find(path, filename), max_results))
 
             if not results:
                 return f"No se encontraron archivos con nombre '{filename}'"
@@ -215,14 +202,6 @@ class FindFileTool(BaseTool):
         except Exception as e:
             return f"Error en búsqueda: {str(e)}"
 
-    def _match_pattern(self, filename: str, pattern: str) -> bool:
-        """Compara nombre de archivo con patrón (soporta *)"""
-        if '*' in pattern:
-            regex_pattern = pattern.replace('*', '.*')
-            return bool(re.match(regex_pattern, filename))
-        else:
-            return filename == pattern
-
     def get_schema(self) -> Dict[str, Any]:
         return {
             "type": "object",
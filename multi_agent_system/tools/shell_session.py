@@ -0,0 +1,398 @@
+"""
+Sesiones de shell persistentes para BashTool
+
+Cada sesión es un proceso bash que vive entre comandos: el estado (cd,
+variables exportadas, funciones) se conserva y no se paga el arranque del
+shell en cada llamada. El fin de cada comando se detecta con un centinela
+que se imprime en stdout y stderr junto con el exit code y el directorio
+actual.
+
+La salida se lee en hilos a medida que llega: se puede seguir con un
+callback línea por línea y solo se retiene el final de cada stream (hasta
+max_output_bytes), así un comando que imprime megabytes no se acumula en
+memoria.
+
+Las sesiones viven en un pool global (Settings.BASH["max_sessions"]); las
+que pasan más de idle_timeout segundos sin uso se cierran.
+"""
+import atexit
+import codecs
+import os
+import queue
+import shlex
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+from ..config.settings import Settings
+
+
+# Callback de salida: (stream, línea) con stream "stdout" o "stderr"
+OutputCallback = Callable[[str, str], None]
+
+
+class TailBuffer:
+    """Conserva los últimos max_bytes bytes de un stream"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.data = bytearray()
+        self.dropped = 0
+
+    def append(self, chunk: bytes):
+        self.data += chunk
+        excess = len(self.data) - self.max_bytes
+        if excess > 0:
+            del self.data[:excess]
+            self.dropped += excess
+
+    def text(self, end: Optional[int] = None) -> str:
+        content = bytes(self.data[:end]).decode("utf-8", errors="replace")
+        if self.dropped:
+            return f"[... {self.dropped} bytes omitidos ...]\n{content}"
+        return content
+
+
+class _LineEmitter:
+    """Pasa al callback las líneas completas de un stream a medida que llegan"""
+
+    # Una "línea" más larga que esto se emite sin esperar el salto de línea
+    MAX_LINE = 4096
+
+    def __init__(self, stream: str, callback: Optional[OutputCallback], sentinel: Optional[str]):
+        self.stream = stream
+        self.callback = callback
+        self.sentinel = sentinel
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.partial = ""
+
+    def feed(self, chunk: bytes):
+        if self.callback is None:
+            return
+        self.partial += self.decoder.decode(chunk)
+        *lines, self.partial = self.partial.split("\n")
+        for line in lines:
+            self._emit(line)
+
+        if len(self.partial) > self.MAX_LINE:
+            if self.sentinel and self.sentinel in self.partial:
+                return
+            # Se retiene lo justo para no partir un centinela incompleto
+            keep = len(self.sentinel) - 1 if self.sentinel else 0
+            cut = len(self.partial) - keep
+            self._emit(self.partial[:cut])
+            self.partial = self.partial[cut:]
+
+    def flush(self):
+        if self.callback is not None and self.partial:
+            self._emit(self.partial)
+            self.partial = ""
+
+    def _emit(self, line: str):
+        if self.sentinel and self.sentinel in line:
+            # Línea del centinela: solo se emite lo que el comando dejó antes
+            line = line[:line.index(self.sentinel)]
+            if not line:
+                return
+        try:
+            self.callback(self.stream, line)
+        except Exception:
+            pass
+
+
+class CommandResult:
+    """Resultado de un comando"""
+
+    def __init__(self, stdout: str, stderr: str, exit_code: Optional[int], timed_out: bool = False,
+                 session_lost: bool = False):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_code = exit_code
+        self.timed_out = timed_out
+        self.session_lost = session_lost  # El shell terminó (exit, kill o timeout)
+
+
+def _start_readers(process: subprocess.Popen, output: "queue.Queue"):
+    """Hilos que leen stdout y stderr y encolan (stream, bytes); None al cerrar"""
+    def read(stream_name: str, pipe):
+        fd = pipe.fileno()
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                chunk = b""
+            if not chunk:
+                output.put((stream_name, None))
+                return
+            output.put((stream_name, chunk))
+
+    for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr)):
+        threading.Thread(target=read, args=(name, pipe), daemon=True, name=f"shell-{name}").start()
+
+
+def _collect(
+    output: "queue.Queue",
+    deadline: float,
+    max_bytes: int,
+    on_output: Optional[OutputCallback],
+    sentinel: Optional[str],
+    is_done: Callable[[Dict[str, TailBuffer]], bool]
+):
+    """
+    Lee la salida hasta que is_done() lo indique, ambos streams cierren o
+    venza el deadline.
+
+    Returns:
+        (buffers, cerrado, vencido)
+    """
+    buffers = {"stdout": TailBuffer(max_bytes), "stderr": TailBuffer(max_bytes)}
+    emitters = {name: _LineEmitter(name, on_output, sentinel) for name in buffers}
+    open_streams = {"stdout", "stderr"}
+
+    while open_streams:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            stream, chunk = output.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if chunk is None:
+            open_streams.discard(stream)
+            continue
+        buffers[stream].append(chunk)
+        emitters[stream].feed(chunk)
+        if is_done(buffers):
+            break
+
+    for emitter in emitters.values():
+        emitter.flush()
+    done = is_done(buffers)
+    return buffers, not open_streams and not done, not done and bool(open_streams)
+
+
+def _kill(process: subprocess.Popen):
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (OSError, ProcessLookupError):
+        pass
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        pass
+
+
+class ShellSession:
+    """Proceso bash persistente que ejecuta comandos de a uno"""
+
+    def __init__(self, cwd: Optional[str] = None):
+        self.cwd = cwd or os.getcwd()
+        self.sentinel = f"__AGENT_CMD_DONE_{uuid.uuid4().hex}__"
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self.users = 0  # Llamadas que la adquirieron (protegido por _POOL_LOCK)
+        self._output: "queue.Queue" = queue.Queue()
+        self.process = subprocess.Popen(
+            [shutil.which("bash") or "bash", "--noprofile", "--norc"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd,
+            start_new_session=True
+        )
+        _start_readers(self.process, self._output)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(
+        self,
+        command: str,
+        timeout: float,
+        cwd: Optional[str] = None,
+        on_output: Optional[OutputCallback] = None,
+        max_bytes: int = 30000
+    ) -> CommandResult:
+        """
+        Ejecuta un comando en la sesión.
+
+        Si vence el timeout, el shell (y todo lo que lanzó) se mata y la
+        sesión queda inutilizable; el pool abre otra en el último directorio.
+        """
+        sentinel = self.sentinel
+        # Con eval un error de sintaxis (ej: comillas sin cerrar) falla solo
+        # ese comando en lugar de tragarse el centinela. stdin es /dev/null:
+        # el comando no debe leer el pipe del shell.
+        body = f"eval {shlex.quote(command)} < /dev/null"
+        if cwd:
+            body = (
+                f"__agent_prev=\"$PWD\"; cd -- {shlex.quote(cwd)} && {body}; "
+                f"__agent_rc=$?; cd -- \"$__agent_prev\""
+            )
+        else:
+            body += "; __agent_rc=$?"
+        script = (
+            f"{body}\nprintf '%s:%d:%s\\n' '{sentinel}' \"$__agent_rc\" \"$PWD\"; "
+            f"printf '%s\\n' '{sentinel}' >&2\n"
+        )
+
+        self.last_used = time.monotonic()
+        try:
+            self.process.stdin.write(script.encode("utf-8"))
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return CommandResult("", "", self.process.poll(), session_lost=True)
+
+        marker = sentinel.encode("ascii")
+
+        def is_done(buffers: Dict[str, TailBuffer]) -> bool:
+            out, err = buffers["stdout"].data, buffers["stderr"].data
+            return (
+                out.endswith(b"\n") and marker in out[out.rfind(b"\n", 0, len(out) - 1) + 1:]
+                and err.endswith(marker + b"\n")
+            )
+
+        buffers, closed, timed_out = _collect(
+            self._output, time.monotonic() + timeout, max_bytes, on_output, sentinel, is_done
+        )
+        self.last_used = time.monotonic()
+
+        if timed_out or closed:
+            _kill(self.process)
+            return CommandResult(
+                buffers["stdout"].text(), buffers["stderr"].text(),
+                None if timed_out else self.process.returncode,
+                timed_out=timed_out, session_lost=True
+            )
+
+        out = buffers["stdout"].data
+        line_start = out.rfind(b"\n", 0, len(out) - 1) + 1
+        index = out.index(marker, line_start)
+        _, exit_code, pwd = out[index:-1].decode("utf-8", errors="replace").split(":", 2)
+        self.cwd = pwd or self.cwd
+
+        err = buffers["stderr"].data
+        return CommandResult(
+            buffers["stdout"].text(index),
+            buffers["stderr"].text(len(err) - len(marker) - 1),
+            int(exit_code)
+        )
+
+    def close(self):
+        if self.alive:
+            _kill(self.process)
+
+
+def run_oneshot(
+    command: str,
+    timeout: float,
+    cwd: Optional[str] = None,
+    on_output: Optional[OutputCallback] = None,
+    max_bytes: int = 30000
+) -> CommandResult:
+    """Ejecuta un comando en un proceso propio (sin sesión), con la misma lectura incremental"""
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        start_new_session=(os.name == "posix")
+    )
+    output: "queue.Queue" = queue.Queue()
+    _start_readers(process, output)
+    buffers, _, timed_out = _collect(
+        output, time.monotonic() + timeout, max_bytes, on_output, None, lambda buffers: False
+    )
+    if timed_out:
+        _kill(process)
+        return CommandResult(buffers["stdout"].text(), buffers["stderr"].text(), None, timed_out=True)
+
+    exit_code = None
+    try:
+        exit_code = process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        _kill(process)
+    return CommandResult(buffers["stdout"].text(), buffers["stderr"].text(), exit_code)
+
+
+# ----------------------------------------------------------------------
+# Pool de sesiones
+# ----------------------------------------------------------------------
+
+_SESSIONS: Dict[str, ShellSession] = {}
+_POOL_LOCK = threading.Lock()
+
+
+def persistent_shell_available() -> bool:
+    """Las sesiones persistentes requieren bash en un sistema POSIX"""
+    return Settings.BASH["persistent"] and os.name == "posix" and shutil.which("bash") is not None
+
+
+def acquire_session(session_id: str) -> ShellSession:
+    """
+    Sesión de un id (la crea o reemplaza si murió), marcada en uso.
+
+    Mientras está en uso ninguna limpieza la cierra; se libera con
+    release_session(). Cierra las sesiones inactivas y, si se supera
+    max_sessions, la que lleva más tiempo sin usarse.
+    """
+    config = Settings.BASH
+    now = time.monotonic()
+    closing = []
+    with _POOL_LOCK:
+        for other_id, other in list(_SESSIONS.items()):
+            if other_id != session_id and not other.users and (
+                now - other.last_used > config["idle_timeout"] or not other.alive
+            ):
+                closing.append(_SESSIONS.pop(other_id))
+
+        session = _SESSIONS.get(session_id)
+        if session is None or not session.alive:
+            cwd = session.cwd if session is not None and os.path.isdir(session.cwd) else None
+            session = ShellSession(cwd)
+            _SESSIONS[session_id] = session
+        session.users += 1
+
+        idle = sorted(
+            (s.last_used, sid) for sid, s in _SESSIONS.items()
+            if sid != session_id and not s.users
+        )
+        while len(_SESSIONS) > config["max_sessions"] and idle:
+            closing.append(_SESSIONS.pop(idle.pop(0)[1]))
+
+    for old in closing:
+        old.close()
+    return session
+
+
+def release_session(session: ShellSession):
+    """Libera una sesión obtenida con acquire_session()"""
+    with _POOL_LOCK:
+        session.users -= 1
+        session.last_used = time.monotonic()
+
+
+def close_session(session_id: str):
+    """Cierra la sesión de un id (si existe)"""
+    with _POOL_LOCK:
+        session = _SESSIONS.pop(session_id, None)
+    if session is not None:
+        session.close()
+
+
+@atexit.register
+def _close_all():
+    with _POOL_LOCK:
+        sessions = list(_SESSIONS.values())
+        _SESSIONS.clear()
+    for session in sessions:
+        session.close()